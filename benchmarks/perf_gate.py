@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+import instrumentation
+
+'''
+Performance regression gate: runs the fixed workload of workload.py over a checked-in corpus (corpora/<corpus>)
+several times, each in a fresh process with instrumentation enabled, and
+    * compares the wall time and peak memory of every stage (the min over the runs) to the stored baseline
+      (baselines/<corpus>.json), failing if one grew by more than the tolerances; and work counters (ex:
+      support_scans) must not grow at all
+    * compares the outputs of the workload (supports, clusters, MI values, the ids of every annotator query) to
+      the golden outputs (golden/<corpus>.json), MI values within a tolerance, failing on any difference
+and prints a per-stage diff. Run it before and after touching TransactionsManager, MutualInformationManager or
+the clustering code.
+
+A stage regresses if new > baseline * (1 + tolerance) + slack; tolerances are stored in the baseline file and can
+be overridden on the command line. Baselines depend on the machine: record one with --update-baseline on the
+machine the gate runs on. Golden outputs only change when results are meant to change: record them with
+--update-golden.
+
+Baseline format:
+    {"tolerances": {"wall_time": float, "wall_time_slack_s": float, "peak_memory": float,
+                    "peak_memory_slack_bytes": int, "mutual_information": float},
+     "stages": {stage name: {"calls": int, "wall_time_s": float, "peak_memory_bytes": int}},
+     "counters": {counter name: int}}
+
+Usage:
+    py benchmarks/perf_gate.py [--corpus small] [--runs 3] [--time-tolerance 0.5] [--memory-tolerance 0.2]
+        [--mutual-information-tolerance 1e-9] [--update-baseline] [--update-golden]
+'''
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKLOAD_FILENAME = os.path.join(BENCHMARKS_DIR, "workload.py")
+CORPORA_DIR = os.path.join(BENCHMARKS_DIR, "corpora")
+BASELINES_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+GOLDEN_DIR = os.path.join(BENCHMARKS_DIR, "golden")
+
+DEFAULT_TOLERANCES = {
+    "wall_time": 0.5,
+    # Stages of a small corpus take milliseconds, whose timings are mostly noise
+    "wall_time_slack_s": 0.05,
+    "peak_memory": 0.2,
+    "peak_memory_slack_bytes": 256 * 1024,
+    "mutual_information": 1e-9
+}
+# Mismatches printed per golden output comparison
+MAX_PRINTED_MISMATCHES = 20
+
+def run_workload(corpus_dir):
+    '''
+    Runs the workload once in a fresh process (so that memory peaks of a run don't depend on the previous runs)
+
+    @param corpus_dir: string   Corpus directory
+    @return (dict, dict), the instrumentation report and the outputs of the workload
+    '''
+    temp_dir = tempfile.mkdtemp()
+    report_filename = os.path.join(temp_dir, "report.json")
+    results_filename = os.path.join(temp_dir, "results.json")
+    env = dict(os.environ)
+    env[instrumentation.PROFILE_REPORT_ENV_VAR] = report_filename
+    env.pop(instrumentation.CPROFILE_DUMP_ENV_VAR, None)
+
+    process = subprocess.run([sys.executable, WORKLOAD_FILENAME, corpus_dir, os.path.join(temp_dir, "work"), \
+        results_filename], env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if process.returncode != 0:
+        print(process.stdout)
+        print("ERROR: the workload failed (exit code %d)" % process.returncode)
+        shutil.rmtree(temp_dir)
+        exit(1)
+
+    report = read_json(report_filename)
+    results = read_json(results_filename)
+    shutil.rmtree(temp_dir)
+    return report, results
+
+def aggregate_reports(reports):
+    '''
+    @param reports: list(dict)      Instrumentation reports of every run
+    @return (dict, dict), the stages (min wall time and peak memory over the runs) and the counters (max over the
+        runs) in the baseline format
+    '''
+    stages = {}
+    for report in reports:
+        for name, stage_stats in report["stages"].items():
+            if name not in stages:
+                stages[name] = {"calls": stage_stats["calls"], "wall_time_s": stage_stats["wall_time_s"], \
+                    "peak_memory_bytes": stage_stats["peak_memory_bytes"]}
+                continue
+            stages[name]["wall_time_s"] = min(stages[name]["wall_time_s"], stage_stats["wall_time_s"])
+            stages[name]["peak_memory_bytes"] = min(stages[name]["peak_memory_bytes"], stage_stats["peak_memory_bytes"])
+
+    counters = {}
+    for report in reports:
+        for name, count in report["counters"].items():
+            counters[name] = max(counters.get(name, 0), count)
+    return stages, counters
+
+def compare_stages(baseline, stages, counters, tolerances):
+    '''
+    Prints the per-stage diff against the baseline
+
+    @return list(string), the failures (regressed or missing stages, grown counters). Stages added since the
+        baseline are only printed
+    '''
+    failures = []
+
+    def get_change(base, new):
+        return "%+.1f%%" % (100 * (new - base) / base) if base else "n/a"
+
+    print("%-60s %10s %10s %8s %10s %10s %8s  %s" % ("stage", "base (s)", "new (s)", "change", "base (MB)", \
+        "new (MB)", "change", "status"))
+    for name in sorted(set(baseline["stages"]) | set(stages)):
+        base_stats = baseline["stages"].get(name)
+        new_stats = stages.get(name)
+        if base_stats is None:
+            print("%-60s %10s %10.3f %8s %10s %10.2f %8s  %s" % (name, "", new_stats["wall_time_s"], "", "", \
+                new_stats["peak_memory_bytes"] / 1024 / 1024, "", "NEW"))
+            continue
+        if new_stats is None:
+            print("%-60s %10.3f %10s %8s %10.2f %10s %8s  %s" % (name, base_stats["wall_time_s"], "", "", \
+                base_stats["peak_memory_bytes"] / 1024 / 1024, "", "", "MISSING"))
+            failures.append("%s: stage wasn't run" % name)
+            continue
+
+        statuses = []
+        if new_stats["wall_time_s"] > base_stats["wall_time_s"] * (1 + tolerances["wall_time"]) + \
+            tolerances["wall_time_slack_s"]:
+            statuses.append("TIME REGRESSION")
+        if new_stats["peak_memory_bytes"] > base_stats["peak_memory_bytes"] * (1 + tolerances["peak_memory"]) + \
+            tolerances["peak_memory_slack_bytes"]:
+            statuses.append("MEMORY REGRESSION")
+        if new_stats["calls"] != base_stats["calls"]:
+            statuses.append("CALLS %d -> %d" % (base_stats["calls"], new_stats["calls"]))
+        print("%-60s %10.3f %10.3f %8s %10.2f %10.2f %8s  %s" % (name, base_stats["wall_time_s"], \
+            new_stats["wall_time_s"], get_change(base_stats["wall_time_s"], new_stats["wall_time_s"]), \
+                base_stats["peak_memory_bytes"] / 1024 / 1024, new_stats["peak_memory_bytes"] / 1024 / 1024, \
+                    get_change(base_stats["peak_memory_bytes"], new_stats["peak_memory_bytes"]), \
+                        ', '.join(statuses) or "ok"))
+        failures.extend(["%s: %s" % (name, status) for status in statuses])
+
+    print()
+    print("%-60s %10s %10s" % ("counter", "base", "new"))
+    for name in sorted(set(baseline["counters"]) | set(counters)):
+        base_count = baseline["counters"].get(name, 0)
+        new_count = counters.get(name, 0)
+        status = "REGRESSION" if new_count > base_count else "ok"
+        print("%-60s %10d %10d  %s" % (name, base_count, new_count, status))
+        if new_count > base_count:
+            failures.append("%s: counter grew from %d to %d" % (name, base_count, new_count))
+    return failures
+
+def compare_outputs(golden, results, tolerance, path="", mismatches=None):
+    '''
+    Compares outputs recursively, floats within a tolerance (absolute, or relative for large values)
+
+    @return list(string), the path and values of every mismatch
+    '''
+    if mismatches is None:
+        mismatches = []
+    if isinstance(golden, dict) and isinstance(results, dict):
+        for key in sorted(set(golden) | set(results)):
+            if key not in golden or key not in results:
+                mismatches.append("%s/%s: %s in the golden outputs" % (path, key, "missing" if key not in golden \
+                    else "only"))
+            else:
+                compare_outputs(golden[key], results[key], tolerance, "%s/%s" % (path, key), mismatches)
+    elif isinstance(golden, list) and isinstance(results, list) and len(golden) == len(results):
+        for ind, (golden_val, val) in enumerate(zip(golden, results)):
+            compare_outputs(golden_val, val, tolerance, "%s[%d]" % (path, ind), mismatches)
+    elif isinstance(golden, float) or isinstance(results, float):
+        if not isinstance(golden, (int, float)) or not isinstance(results, (int, float)) or \
+            abs(golden - results) > tolerance * max(1.0, abs(golden)):
+            mismatches.append("%s: expected %r, got %r" % (path, golden, results))
+    elif golden != results:
+        mismatches.append("%s: expected %s, got %s" % (path, json.dumps(golden), json.dumps(results)))
+    return mismatches
+
+def read_json(filename):
+    json_file = open(filename, "r")
+    value = json.load(json_file)
+    json_file.close()
+    return value
+
+def write_json(filename, value):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    json_file = open(filename, "w")
+    json.dump(value, json_file, indent=4, sort_keys=True)
+    json_file.write("\n")
+    json_file.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Performance regression gate")
+    parser.add_argument("--corpus", default="small", help="Name of the corpus, a directory of %s" % CORPORA_DIR)
+    parser.add_argument("--runs", type=int, default=3, help="Number of runs, timings are the min over the runs")
+    parser.add_argument("--time-tolerance", type=float, default=None, help="Relative wall time increase allowed")
+    parser.add_argument("--memory-tolerance", type=float, default=None, help="Relative peak memory increase allowed")
+    parser.add_argument("--mutual-information-tolerance", type=float, default=None, \
+        help="Absolute (relative above 1) difference allowed between MI values and their golden values")
+    parser.add_argument("--update-baseline", action="store_true", help="Record the baseline instead of comparing")
+    parser.add_argument("--update-golden", action="store_true", help="Record the golden outputs instead of comparing")
+    args = parser.parse_args()
+
+    corpus_dir = os.path.join(CORPORA_DIR, args.corpus)
+    baseline_filename = os.path.join(BASELINES_DIR, "%s.json" % args.corpus)
+    golden_filename = os.path.join(GOLDEN_DIR, "%s.json" % args.corpus)
+    if not os.path.isdir(corpus_dir):
+        print("ERROR: %s doesn't exist" % corpus_dir)
+        exit(1)
+
+    reports = []
+    results = None
+    failures = []
+    for run in range(args.runs):
+        print("Run %d/%d" % (run + 1, args.runs))
+        report, run_results = run_workload(corpus_dir)
+        reports.append(report)
+        if results is not None and run_results != results:
+            failures.append("outputs differ between runs (nondeterministic results)")
+        results = run_results
+    stages, counters = aggregate_reports(reports)
+    print()
+
+    baseline = read_json(baseline_filename) if os.path.exists(baseline_filename) else None
+    tolerances = dict(DEFAULT_TOLERANCES)
+    tolerances.update(baseline["tolerances"] if baseline else {})
+    for name, tolerance in [("wall_time", args.time_tolerance), ("peak_memory", args.memory_tolerance), \
+        ("mutual_information", args.mutual_information_tolerance)]:
+        if tolerance is not None:
+            tolerances[name] = tolerance
+
+    if args.update_baseline:
+        write_json(baseline_filename, {"tolerances": tolerances, "stages": stages, "counters": counters})
+        print("Wrote %s" % baseline_filename)
+    elif baseline is None:
+        print("ERROR: %s doesn't exist, record it with --update-baseline" % baseline_filename)
+        exit(1)
+    else:
+        failures.extend(compare_stages(baseline, stages, counters, tolerances))
+
+    if args.update_golden:
+        write_json(golden_filename, results)
+        print("Wrote %s" % golden_filename)
+    elif not os.path.exists(golden_filename):
+        print("ERROR: %s doesn't exist, record it with --update-golden" % golden_filename)
+        exit(1)
+    else:
+        mismatches = compare_outputs(read_json(golden_filename), results, tolerances["mutual_information"])
+        for mismatch in mismatches[ : MAX_PRINTED_MISMATCHES]:
+            print("Golden output mismatch: %s" % mismatch)
+        if len(mismatches) > MAX_PRINTED_MISMATCHES:
+            print("... and %d more golden output mismatches" % (len(mismatches) - MAX_PRINTED_MISMATCHES))
+        if mismatches:
+            failures.append("%d outputs differ from the golden outputs" % len(mismatches))
+
+    print()
+    if failures:
+        for failure in failures:
+            print("FAILED: %s" % failure)
+        exit(1)
+    print("Passed")
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import shutil
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils", "frequent_pattern_mining"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "pattern_annotators"))
+
+from transactions_manager import TransactionsManager
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_pattern_file_into_records, get_sequential_title_pattern, write_pattern_records_to_file
+from remove_redundant_patterns import find_one_pass_microclustering_patterns, find_hierarchical_microclustering_patterns
+from strongest_context_indicator_extractor import StrongestContextIndicatorExtractor
+from semantically_similar_pattern_extractor import SemanticallySimilarPatternExtractor
+from representative_transaction_extractor import RepresentativeTransactionExtractor
+import instrumentation
+
+'''
+Fixed workload of the performance regression gate (see perf_gate.py), run over a checked-in corpus (data.csv, the
+id mappings and the frequent pattern files, see corpora/). Every step runs as a benchmark.* stage, so the
+instrumentation report has one entry per step (and the stages of the code it calls):
+    * loading the transactions and parsing the pattern files
+    * removing redundant title patterns (one pass and hierarchical microclustering)
+    * finding the transactions of every pattern
+    * computing every MI matrix (written during computation), and again out of core into the dense files
+    * reading the MI files, and answering the queries of every annotator
+
+The outputs the gate checks against its golden file are written as JSON:
+    {"supports": {"author": [[tid, ...], ...], "title": ...},
+     "clustering": {"one_pass": [[item, ...], ...], "hierarchical": ...},
+     "mutual_information": {"author_author": {"rows": {row: [MI, ...]}, "max_dense_difference": float}, ...},
+     "queries": {"context_indicators": {"author 0": [id, ...], ...}, "similar_patterns": ..., ...}}
+MI values are only kept for every MUTUAL_INFORMATION_ROW_STEP-th row, but the dense files are compared to the text
+files over every value (max_dense_difference).
+
+Usage (instrumentation is enabled by perf_gate.py through COURSEPROJECT_PROFILE):
+    py benchmarks/workload.py CORPUS_DIR WORK_DIR RESULTS_FILE
+'''
+
+CORPUS_FILENAMES = ["data.csv", "author_id_mappings.txt", "title_term_id_mappings.txt", \
+    "frequent_author_patterns.txt", "frequent_title_term_patterns.txt"]
+
+ONE_PASS_DIST_THRESH = 0.6
+HIERARCHICAL_DIST_THRESH = 0.7
+# Small enough that the out-of-core computation is split into several tiles
+TILED_MEMORY_BUDGET = 64 * 1024
+MUTUAL_INFORMATION_ROW_STEP = 8
+
+NUM_QUERIES = 8
+QUERY_K = 5
+# Paper context models cost a support scan per (paper, pattern), like in representative_transaction_extractor.py
+REPRESENTATIVE_TRANSACTIONS_LINE_COUNT = 50
+
+def get_query_ids(num_patterns):
+    return list(range(0, num_patterns, max(1, num_patterns // NUM_QUERIES)))[ : NUM_QUERIES]
+
+def run_workload(corpus_dir, work_dir):
+    '''
+    Runs every step of the workload in work_dir (the corpus is copied to work_dir/data, since every module reads
+    and writes data/...)
+
+    @param
+        corpus_dir: string      Directory holding CORPUS_FILENAMES
+        work_dir: string        Empty directory to run in
+    @return dict, the outputs of the workload (see the module docstring)
+    '''
+    os.makedirs(os.path.join(work_dir, "data"), exist_ok=True)
+    for filename in CORPUS_FILENAMES:
+        shutil.copy(os.path.join(corpus_dir, filename), os.path.join(work_dir, "data", filename))
+    os.chdir(work_dir)
+    results = {}
+
+    with instrumentation.stage("benchmark.load_transactions"):
+        transactions = TransactionsManager("data/data.csv", "data/author_id_mappings.txt", \
+            "data/title_term_id_mappings.txt")
+
+    with instrumentation.stage("benchmark.parse_patterns"):
+        author_records = parse_pattern_file_into_records("data/frequent_author_patterns.txt")
+        frequent_title_records = parse_pattern_file_into_records("data/frequent_title_term_patterns.txt")
+
+    frequent_title_items = [record.items for record in frequent_title_records]
+    with instrumentation.stage("benchmark.clustering.one_pass"):
+        minimal_patterns = find_one_pass_microclustering_patterns(frequent_title_items, ONE_PASS_DIST_THRESH)
+    with instrumentation.stage("benchmark.clustering.hierarchical"):
+        hierarchical_patterns = find_hierarchical_microclustering_patterns(frequent_title_items, \
+            HIERARCHICAL_DIST_THRESH)
+    results["clustering"] = {"one_pass": minimal_patterns, "hierarchical": hierarchical_patterns}
+
+    # Same as remove_redundant_patterns.py
+    records_by_items = {tuple(record.items): record for record in frequent_title_records}
+    title_records = [records_by_items[tuple(pattern)] for pattern in minimal_patterns]
+    write_pattern_records_to_file("data/minimal_title_term_patterns.txt", title_records)
+
+    author_patterns = [record.items for record in author_records]
+    title_patterns = [get_sequential_title_pattern(record) for record in title_records]
+    with instrumentation.stage("benchmark.find_supports"):
+        author_transaction_ids = transactions.find_patterns_transactions_ids(author_patterns, False)
+        title_transaction_ids = transactions.find_patterns_transactions_ids(title_patterns, True)
+    results["supports"] = {
+        "author": [list(transaction_ids) for transaction_ids in author_transaction_ids],
+        "title": [list(transaction_ids) for transaction_ids in title_transaction_ids]
+    }
+
+    matrices = [
+        ("author_author", MutualInformationManager.PatternType.AUTHOR_AUTHOR, author_patterns, None),
+        ("author_title", MutualInformationManager.PatternType.AUTHOR_TITLE, author_patterns, title_patterns),
+        ("title_title", MutualInformationManager.PatternType.TITLE_TITLE, title_patterns, None)
+    ]
+    for name, pattern_type, patterns, secondary_patterns in matrices:
+        with instrumentation.stage("benchmark.mutual_information.%s" % name):
+            MutualInformationManager(pattern_type, transactions, True).compute_mutual_information(patterns, \
+                secondary_patterns, num_processes=1)
+        with instrumentation.stage("benchmark.mutual_information.tiled_%s" % name):
+            MutualInformationManager(pattern_type, transactions).compute_mutual_information(patterns, \
+                secondary_patterns, num_processes=1, memory_budget=TILED_MEMORY_BUDGET)
+
+    mutual_infos = {}
+    results["mutual_information"] = {}
+    for name, pattern_type, patterns, secondary_patterns in matrices:
+        with instrumentation.stage("benchmark.read_mutual_information.%s" % name):
+            mutual_info = MutualInformationManager(pattern_type)
+            mutual_info.read_mutual_information_from_file()
+            dense_mutual_info = MutualInformationManager(pattern_type, \
+                storage_mode=MutualInformationManager.StorageMode.DENSE)
+            dense_mutual_info.read_mutual_information_from_file()
+        mutual_infos[pattern_type] = (mutual_info, dense_mutual_info)
+
+        num_cols = len(secondary_patterns if secondary_patterns is not None else patterns)
+        rows = [mutual_info.get_mutual_information_vector(row, num_cols) for row in range(len(patterns))]
+        dense_rows = [dense_mutual_info.get_mutual_information_vector(row, num_cols) for row in range(len(patterns))]
+        results["mutual_information"][name] = {
+            "rows": {str(row): rows[row] for row in range(0, len(patterns), MUTUAL_INFORMATION_ROW_STEP)},
+            "max_dense_difference": max([abs(val - dense_val) for row, dense_row in zip(rows, dense_rows) \
+                for val, dense_val in zip(row, dense_row)] + [0.0])
+        }
+
+    author_author_mutual_info, author_author_dense_mutual_info = mutual_infos[MutualInformationManager.PatternType.AUTHOR_AUTHOR]
+    author_title_mutual_info, _ = mutual_infos[MutualInformationManager.PatternType.AUTHOR_TITLE]
+    title_title_mutual_info, title_title_dense_mutual_info = mutual_infos[MutualInformationManager.PatternType.TITLE_TITLE]
+    author_query_ids = get_query_ids(len(author_patterns))
+    title_query_ids = get_query_ids(len(title_patterns))
+    results["queries"] = {}
+
+    # (target type, extractor, target ids) of every query
+    with instrumentation.stage("benchmark.queries.context_indicators"):
+        results["queries"]["context_indicators"] = run_queries([
+            ("author author", StrongestContextIndicatorExtractor(author_author_mutual_info, transactions, \
+                author_patterns, MutualInformationManager.PatternType.AUTHOR_AUTHOR), author_query_ids),
+            ("author title", StrongestContextIndicatorExtractor(author_title_mutual_info, transactions, \
+                title_patterns, MutualInformationManager.PatternType.AUTHOR_TITLE, author_patterns), author_query_ids),
+            ("title title", StrongestContextIndicatorExtractor(title_title_mutual_info, transactions, \
+                title_patterns, MutualInformationManager.PatternType.TITLE_TITLE), title_query_ids),
+            ("title author", StrongestContextIndicatorExtractor(author_title_mutual_info.get_transposed_manager(), \
+                transactions, author_patterns, MutualInformationManager.PatternType.TITLE_AUTHOR, title_patterns), \
+                    title_query_ids)
+        ], "find_strongest_context_indicators")
+
+    with instrumentation.stage("benchmark.queries.similar_patterns"):
+        results["queries"]["similar_patterns"] = run_queries([
+            ("author", SemanticallySimilarPatternExtractor(author_author_dense_mutual_info, transactions, \
+                author_patterns, MutualInformationManager.PatternType.AUTHOR_AUTHOR), author_query_ids),
+            ("title", SemanticallySimilarPatternExtractor(title_title_dense_mutual_info, transactions, \
+                title_patterns, MutualInformationManager.PatternType.TITLE_TITLE), title_query_ids)
+        ], "find_semantically_similar_patterns")
+
+    with instrumentation.stage("benchmark.queries.representative_transactions"):
+        representative_transactions = TransactionsManager("data/data.csv", "data/author_id_mappings.txt", \
+            "data/title_term_id_mappings.txt", REPRESENTATIVE_TRANSACTIONS_LINE_COUNT)
+        results["queries"]["representative_transactions"] = run_queries([
+            ("author", RepresentativeTransactionExtractor(representative_transactions, author_author_mutual_info, \
+                author_patterns, MutualInformationManager.PatternType.AUTHOR_AUTHOR, QUERY_K), author_query_ids),
+            ("title", RepresentativeTransactionExtractor(representative_transactions, title_title_mutual_info, \
+                title_patterns, MutualInformationManager.PatternType.TITLE_TITLE, QUERY_K), title_query_ids)
+        ], "find_representative_transactions")
+
+    for mutual_info, dense_mutual_info in mutual_infos.values():
+        dense_mutual_info.close()
+    return results
+
+def run_queries(queries, find_method_name):
+    '''
+    @param
+        queries: list((string, extractor, list(int)))   (name, extractor, target ids) of every query set
+        find_method_name: string                        Name of the extractors' find method
+    @return dict(string, list(int)), the ids found for every "<name> <target id>"
+    '''
+    return {"%s %d" % (name, target_id): getattr(extractor, find_method_name)(target_id, QUERY_K) \
+        for name, extractor, target_ids in queries for target_id in target_ids}
+
+if __name__ == "__main__":
+    corpus_dir, work_dir, results_filename = [os.path.abspath(arg) for arg in sys.argv[1 : 4]]
+    results = run_workload(corpus_dir, work_dir)
+    results_file = open(results_filename, "w")
+    json.dump(results, results_file)
+    results_file.close()
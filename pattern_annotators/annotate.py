@@ -0,0 +1,225 @@
+import sys
+import os
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.append(os.path.dirname(__file__))
+
+from transactions_manager import TransactionsManager
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
+from vocabulary import Vocabulary
+from pattern_store import get_pattern_store_filename
+from strongest_context_indicator_extractor import StrongestContextIndicatorExtractor
+from semantically_similar_pattern_extractor import SemanticallySimilarPatternExtractor
+from representative_transaction_extractor import RepresentativeTransactionExtractor
+from annotation_result_cache import AnnotationResultCache
+import instrumentation
+
+'''
+Single command line entry point for the three annotators, which only loads what the query needs:
+    * context-indicators: both pattern files and the 2 MI files of the target type (ex: author-author and
+      author-title for an author pattern)
+    * similar-patterns: the pattern file and the MI file of the target type
+    * representative-transactions: the pattern file and the MI file of the target type, and data.csv
+Independent files are loaded concurrently, and patterns are printed by looking their ids up in the id mapping
+files (see utils/vocabulary.py) rather than through a TransactionsManager, so data.csv is only parsed for
+representative transactions.
+
+By default (--storage-mode auto), MI files are mmapped from the dense binary files if they exist (see
+utils/mutual_information_manager.py dense), which is instant, and parsed from the text files otherwise.
+
+Pattern stores (see utils/pattern_store.py) are mapped instead of parsing the pattern files when they're at least as
+recent as them.
+
+Results are cached in data/annotation_cache (see annotation_result_cache.py, pass --no-result-cache to always
+compute them): repeated queries (or queries for a smaller k) only load the pattern files, and data.csv for
+representative transactions.
+
+The project isn't an installable package (there's no setup.py, like every other script it's run from
+CourseProject/ with its path), so annotate.py is run as a script rather than an installed command.
+
+Usage:
+    py pattern_annotators/annotate.py context-indicators|similar-patterns|representative-transactions \
+        author|title TARGET_ID [--k 5] [--storage-mode auto|full|top-k|dense|quantized] [--maximum-line-count N]
+        [--no-result-cache]
+
+Ex: the 5 strongest context indicators of author pattern 3
+    py pattern_annotators/annotate.py context-indicators author 3 --k 5
+'''
+
+AUTHOR = "author"
+TITLE = "title"
+
+CONTEXT_INDICATORS = "context-indicators"
+SIMILAR_PATTERNS = "similar-patterns"
+REPRESENTATIVE_TRANSACTIONS = "representative-transactions"
+
+STORAGE_MODES = {
+    "full": MutualInformationManager.StorageMode.FULL,
+    "top-k": MutualInformationManager.StorageMode.TOP_K,
+    "dense": MutualInformationManager.StorageMode.DENSE,
+    "quantized": MutualInformationManager.StorageMode.QUANTIZED
+}
+
+DATA_FILENAME = "data/data.csv"
+AUTHORS_MAPPING_FILENAME = "data/author_id_mappings.txt"
+TITLE_TERMS_MAPPING_FILENAME = "data/title_term_id_mappings.txt"
+PATTERN_FILENAMES = {
+    AUTHOR: "data/frequent_author_patterns.txt",
+    TITLE: "data/minimal_title_term_patterns.txt"
+}
+
+def get_pattern_filename(pattern_type):
+    '''
+    @param pattern_type: string     AUTHOR or TITLE
+    @return string, the pattern store of that type if it's at least as recent as the pattern file (which may have
+        been mined again since), the pattern file otherwise
+    '''
+    pattern_filename = PATTERN_FILENAMES[pattern_type]
+    store_filename = get_pattern_store_filename(pattern_filename)
+    if os.path.exists(store_filename) and (not os.path.exists(pattern_filename) or \
+        os.path.getmtime(store_filename) >= os.path.getmtime(pattern_filename)):
+        return store_filename
+    return pattern_filename
+
+def get_pattern_artifact_filename(pattern_type):
+    '''
+    @param pattern_type: string     AUTHOR or TITLE
+    @return string, the file results over patterns of that type are keyed by in the result cache: the pattern file,
+        like in AnnotationModels, even if its pattern store is read (unless there's only the store)
+    '''
+    pattern_filename = PATTERN_FILENAMES[pattern_type]
+    return pattern_filename if os.path.exists(pattern_filename) else get_pattern_filename(pattern_type)
+
+def load_patterns(pattern_type):
+    '''
+    @param pattern_type: string     AUTHOR or TITLE
+    @return list(list(int)), patterns of that type (a PatternStore if they're read from a pattern store)
+    '''
+    if pattern_type == AUTHOR:
+        return parse_author_file_into_patterns(get_pattern_filename(AUTHOR))
+    return parse_sequential_title_file_into_patterns(get_pattern_filename(TITLE))
+
+def create_mutual_information_manager(pattern_type, storage_mode_name):
+    '''
+    @param
+        pattern_type: PatternType       Type of the MI manager to create
+        storage_mode_name: string       Key of STORAGE_MODES, or auto to use the dense file if it exists
+    @return MutualInformationManager, whose values haven't been read yet
+    '''
+    if storage_mode_name == "auto":
+        storage_mode = MutualInformationManager.StorageMode.DENSE \
+            if os.path.exists(MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[pattern_type]) \
+                else MutualInformationManager.StorageMode.FULL
+    else:
+        storage_mode = STORAGE_MODES[storage_mode_name]
+    return MutualInformationManager(pattern_type, storage_mode=storage_mode)
+
+def annotate(annotator, target_type, target_id, k, storage_mode_name="auto", maximum_line_count=None, \
+    result_cache_dir=AnnotationResultCache.DEFAULT_CACHE_DIR):
+    '''
+    Runs a single query and prints its results
+
+    @param
+        annotator: string               CONTEXT_INDICATORS, SIMILAR_PATTERNS or REPRESENTATIVE_TRANSACTIONS
+        target_type: string             AUTHOR or TITLE
+        target_id: int                  Id of the pattern to annotate
+        k: int                          Number of results
+        storage_mode_name: string       Storage mode of the MI managers, see create_mutual_information_manager
+        maximum_line_count: int?        Cutoff for number of papers to read in (representative transactions only)
+        result_cache_dir: string?       Directory of the result cache (shared with AnnotationModels), None to
+            always compute results
+    '''
+    other_type = TITLE if target_type == AUTHOR else AUTHOR
+    same_type_pattern_type = MutualInformationManager.PatternType.AUTHOR_AUTHOR if target_type == AUTHOR \
+        else MutualInformationManager.PatternType.TITLE_TITLE
+    cross_type_pattern_type = MutualInformationManager.PatternType.AUTHOR_TITLE if target_type == AUTHOR \
+        else MutualInformationManager.PatternType.TITLE_AUTHOR
+    vocabulary = Vocabulary(AUTHORS_MAPPING_FILENAME, TITLE_TERMS_MAPPING_FILENAME)
+
+    # (result pattern type, MI manager, query, files the results depend on) of every result list, with the same
+    # queries and files as AnnotationModels so that both share cached results
+    results = []
+    if annotator == CONTEXT_INDICATORS:
+        for result_type, pattern_type in [(target_type, same_type_pattern_type), (other_type, cross_type_pattern_type)]:
+            results.append((result_type, create_mutual_information_manager(pattern_type, storage_mode_name), \
+                ["strongest_context_indicators", target_type, result_type]))
+    elif annotator == SIMILAR_PATTERNS:
+        results.append((target_type, create_mutual_information_manager(same_type_pattern_type, storage_mode_name), \
+            ["semantically_similar_patterns", target_type]))
+    else:
+        results.append((target_type, create_mutual_information_manager(same_type_pattern_type, storage_mode_name), \
+            ["representative_transactions", target_type, maximum_line_count]))
+    results = [(result_type, mutual_info, query + [target_id, mutual_info.get_storage_mode()], \
+        AnnotationResultCache.get_artifact_filenames(get_pattern_artifact_filename(target_type), \
+            get_pattern_artifact_filename(result_type), mutual_info.get_mutual_information_filename(), \
+                [DATA_FILENAME, AUTHORS_MAPPING_FILENAME, TITLE_TERMS_MAPPING_FILENAME], \
+                    annotator == REPRESENTATIVE_TRANSACTIONS)) \
+        for result_type, mutual_info, query in results]
+
+    result_cache = AnnotationResultCache(result_cache_dir) if result_cache_dir else None
+    result_ids = [result_cache.get(query, k, artifact_filenames) if result_cache else None \
+        for _, _, query, artifact_filenames in results]
+
+    # Every file is independent of the others, so they're all read at once. MI files are only read if some of
+    # their results aren't cached
+    with ThreadPoolExecutor() as executor:
+        patterns = {pattern_type: executor.submit(load_patterns, pattern_type) \
+            for pattern_type in set([target_type] + [result[0] for result in results])}
+        mutual_info_reads = [executor.submit(mutual_info.read_mutual_information_from_file) \
+            for (_, mutual_info, _, _), ids in zip(results, result_ids) if ids is None]
+        if annotator == REPRESENTATIVE_TRANSACTIONS:
+            transactions = executor.submit(TransactionsManager, DATA_FILENAME, AUTHORS_MAPPING_FILENAME, \
+                TITLE_TERMS_MAPPING_FILENAME, maximum_line_count)
+        patterns = {pattern_type: future.result() for pattern_type, future in patterns.items()}
+        for mutual_info_read in mutual_info_reads:
+            mutual_info_read.result()
+
+    if target_id < 0 or target_id >= len(patterns[target_type]):
+        print("ERROR: target_id must be in [0, %d)" % len(patterns[target_type]))
+        exit(1)
+
+    for (result_type, mutual_info, query, artifact_filenames), ids in zip(results, result_ids):
+        if annotator == CONTEXT_INDICATORS:
+            pattern_type = same_type_pattern_type if result_type == target_type else cross_type_pattern_type
+            extractor = StrongestContextIndicatorExtractor(mutual_info, vocabulary, patterns[result_type], \
+                pattern_type, patterns[target_type] if result_type != target_type else None)
+            find, display = extractor.find_strongest_context_indicators, extractor.pretty_print
+        elif annotator == SIMILAR_PATTERNS:
+            extractor = SemanticallySimilarPatternExtractor(mutual_info, vocabulary, patterns[target_type], \
+                same_type_pattern_type)
+            find, display = extractor.find_semantically_similar_patterns, extractor.pretty_print
+        else:
+            extractor = RepresentativeTransactionExtractor(transactions.result(), mutual_info, patterns[target_type], \
+                same_type_pattern_type, k)
+            find, display = extractor.find_representative_transactions, extractor.display_pretty
+
+        if ids is None:
+            try:
+                ids = find(target_id, k)
+            except ValueError as err:
+                print("ERROR: %s" % err)
+                exit(1)
+            if result_cache:
+                result_cache.put(query, k, artifact_filenames, ids)
+        display(target_id, ids)
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+
+    parser = argparse.ArgumentParser(description="Annotate a single pattern")
+    parser.add_argument("annotator", choices=[CONTEXT_INDICATORS, SIMILAR_PATTERNS, REPRESENTATIVE_TRANSACTIONS])
+    parser.add_argument("target_type", choices=[AUTHOR, TITLE])
+    parser.add_argument("target_id", type=int)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--storage-mode", choices=["auto"] + list(STORAGE_MODES), default="auto", \
+        help="Storage mode of the MI files, auto mmaps the dense files if they exist and parses the text files otherwise")
+    parser.add_argument("--maximum-line-count", type=int, default=None, \
+        help="Cutoff for number of papers to read in (representative transactions only)")
+    parser.add_argument("--no-result-cache", action="store_true", help="Compute results even if they're cached")
+    args = parser.parse_args()
+
+    annotate(args.annotator, args.target_type, args.target_id, args.k, args.storage_mode, args.maximum_line_count, \
+        None if args.no_result_cache else AnnotationResultCache.DEFAULT_CACHE_DIR)
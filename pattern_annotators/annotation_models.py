@@ -0,0 +1,243 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.append(os.path.dirname(__file__))
+
+from transactions_manager import TransactionsManager
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_pattern_file_into_records, get_sequential_title_pattern, get_records_transaction_ids
+from strongest_context_indicator_extractor import StrongestContextIndicatorExtractor
+from semantically_similar_pattern_extractor import SemanticallySimilarPatternExtractor
+from representative_transaction_extractor import RepresentativeTransactionExtractor
+from annotation_result_cache import AnnotationResultCache
+
+class AnnotationModels:
+    '''
+    Holds the transactions, the patterns, every MI manager and one extractor per (annotator, pattern type)
+    in memory so that queries don't have to reparse any files. Query results can also be cached on disk (see
+    AnnotationResultCache), so that repeated queries aren't recomputed across runs
+    '''
+    AUTHOR = "author"
+    TITLE = "title"
+
+    def __init__(self, papers_file_name, authors_mapping_filename, title_terms_mapping_filename, \
+        author_patterns_filename, title_patterns_filename, maximum_line_count=None, \
+        mutual_info_storage_mode=MutualInformationManager.StorageMode.FULL, \
+        mutual_info_sample_size=MutualInformationManager.DEFAULT_SAMPLE_SIZE, result_cache_dir=None):
+        '''
+        @param
+            papers_file_name: string                data.csv file path
+            authors_mapping_filename: string        file path to author-id mapping file
+            title_terms_mapping_filename: string    file path to title term-id mapping file
+            author_patterns_filename: string        file path to frequent author patterns
+            title_patterns_filename: string         file path to (minimal) title patterns
+            maximum_line_count: int (optional)      cutoff for number of papers to read in
+            mutual_info_storage_mode: StorageMode   storage mode of every MI manager. DENSE mmaps the dense MI files,
+                so that processes loading the same files share one copy of every matrix. LAZY only computes the MI
+                values queries need (and persists them), APPROXIMATE estimates them from a sample of the papers
+            mutual_info_sample_size: int            number of papers sampled in the APPROXIMATE storage mode
+            result_cache_dir: string (optional)     directory to cache query results in (not used in the APPROXIMATE
+                storage mode, whose results change as rows are refined)
+        '''
+        self.__transactions_filenames = [papers_file_name, authors_mapping_filename, title_terms_mapping_filename]
+        self.__pattern_filenames = {
+            AnnotationModels.AUTHOR: author_patterns_filename,
+            AnnotationModels.TITLE: title_patterns_filename
+        }
+        self.__maximum_line_count = maximum_line_count
+        self.__mutual_info_storage_mode = mutual_info_storage_mode
+        self.__result_cache = None
+        if result_cache_dir and mutual_info_storage_mode != MutualInformationManager.StorageMode.APPROXIMATE:
+            self.__result_cache = AnnotationResultCache(result_cache_dir)
+
+        self.__transactions = TransactionsManager(papers_file_name, authors_mapping_filename, \
+            title_terms_mapping_filename, maximum_line_count)
+
+        author_records = parse_pattern_file_into_records(author_patterns_filename)
+        title_records = parse_pattern_file_into_records(title_patterns_filename)
+        self.__patterns = {
+            AnnotationModels.AUTHOR: [record.items for record in author_records],
+            AnnotationModels.TITLE: [get_sequential_title_pattern(record) for record in title_records]
+        }
+        author_patterns = self.__patterns[AnnotationModels.AUTHOR]
+        title_patterns = self.__patterns[AnnotationModels.TITLE]
+
+        # Lazy (and approximate) managers compute MI values from the transactions and the patterns
+        lazy_args = {}
+        if mutual_info_storage_mode == MutualInformationManager.StorageMode.LAZY:
+            lazy_args = {"transactions": self.__transactions, "persist": True}
+        elif mutual_info_storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            lazy_args = {"transactions": self.__transactions, "sample_size": mutual_info_sample_size}
+
+        author_author_mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, \
+            storage_mode=mutual_info_storage_mode, patterns=author_patterns, **lazy_args)
+        author_author_mutual_info.read_mutual_information_from_file()
+        author_title_mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_TITLE, \
+            storage_mode=mutual_info_storage_mode, patterns=author_patterns, secondary_patterns=title_patterns, **lazy_args)
+        author_title_mutual_info.read_mutual_information_from_file()
+        title_author_mutual_info = author_title_mutual_info.get_transposed_manager()
+        title_title_mutual_info = MutualInformationManager(MutualInformationManager.PatternType.TITLE_TITLE, \
+            storage_mode=mutual_info_storage_mode, patterns=title_patterns, **lazy_args)
+        title_title_mutual_info.read_mutual_information_from_file()
+
+        # Lazy managers start from the transactions SPMF found for every pattern (if the pattern files have them)
+        author_transaction_ids = get_records_transaction_ids(author_records)
+        title_transaction_ids = get_records_transaction_ids(title_records)
+        if lazy_args and author_transaction_ids is not None and title_transaction_ids is not None:
+            author_author_mutual_info.seed_transaction_ids(author_transaction_ids)
+            author_title_mutual_info.seed_transaction_ids(author_transaction_ids, title_transaction_ids)
+            title_title_mutual_info.seed_transaction_ids(title_transaction_ids)
+
+        # (extractor, type of words in the extractor's result patterns), keyed by target type
+        self.__context_indicator_extractors = {
+            AnnotationModels.AUTHOR: [
+                (StrongestContextIndicatorExtractor(author_author_mutual_info, self.__transactions, author_patterns, \
+                    MutualInformationManager.PatternType.AUTHOR_AUTHOR), AnnotationModels.AUTHOR),
+                (StrongestContextIndicatorExtractor(author_title_mutual_info, self.__transactions, title_patterns, \
+                    MutualInformationManager.PatternType.AUTHOR_TITLE, author_patterns), AnnotationModels.TITLE)
+            ],
+            AnnotationModels.TITLE: [
+                (StrongestContextIndicatorExtractor(title_title_mutual_info, self.__transactions, title_patterns, \
+                    MutualInformationManager.PatternType.TITLE_TITLE), AnnotationModels.TITLE),
+                (StrongestContextIndicatorExtractor(title_author_mutual_info, self.__transactions, author_patterns, \
+                    MutualInformationManager.PatternType.TITLE_AUTHOR, title_patterns), AnnotationModels.AUTHOR)
+            ]
+        }
+        # Files the results of every (target type, indicator type) depend on, see get_result_artifact_filenames
+        self.__mutual_info_filenames = {
+            (AnnotationModels.AUTHOR, AnnotationModels.AUTHOR): author_author_mutual_info.get_mutual_information_filename(),
+            (AnnotationModels.AUTHOR, AnnotationModels.TITLE): author_title_mutual_info.get_mutual_information_filename(),
+            (AnnotationModels.TITLE, AnnotationModels.TITLE): title_title_mutual_info.get_mutual_information_filename(),
+            (AnnotationModels.TITLE, AnnotationModels.AUTHOR): title_author_mutual_info.get_mutual_information_filename()
+        }
+        self.__similar_pattern_extractors = {
+            AnnotationModels.AUTHOR: SemanticallySimilarPatternExtractor(author_author_mutual_info, self.__transactions, \
+                author_patterns, MutualInformationManager.PatternType.AUTHOR_AUTHOR),
+            AnnotationModels.TITLE: SemanticallySimilarPatternExtractor(title_title_mutual_info, self.__transactions, \
+                title_patterns, MutualInformationManager.PatternType.TITLE_TITLE)
+        }
+        # Representative transaction extractors cache paper context models after their first query
+        self.__representative_transaction_extractors = {
+            AnnotationModels.AUTHOR: RepresentativeTransactionExtractor(self.__transactions, author_author_mutual_info, \
+                author_patterns, MutualInformationManager.PatternType.AUTHOR_AUTHOR, None),
+            AnnotationModels.TITLE: RepresentativeTransactionExtractor(self.__transactions, title_title_mutual_info, \
+                title_patterns, MutualInformationManager.PatternType.TITLE_TITLE, None)
+        }
+
+    def get_number_of_patterns(self, target_type):
+        return len(self.__patterns[target_type])
+
+    def warm_up(self, target_type):
+        '''
+        Precomputes the intermediate results shared by every query on target_type patterns (normalized
+        MI context vectors and normalized paper context models), ex: before forking batch workers
+        '''
+        self.__similar_pattern_extractors[target_type].get_normalized_context_vectors()
+        self.__representative_transaction_extractors[target_type].get_normalized_paper_context_models()
+
+    def annotate_pattern(self, target_type, target_id, k):
+        '''
+        @return dict, every annotation of a single pattern: its k strongest author and title context indicators,
+            its k most semantically similar patterns and its k most representative transactions
+        '''
+        annotation = {"target_type": target_type}
+        annotation.update(self.find_strongest_context_indicators(target_type, target_id, k))
+        annotation.update(self.find_semantically_similar_patterns(target_type, target_id, k))
+        annotation.update(self.find_representative_transactions(target_type, target_id, k))
+        return annotation
+
+    def find_strongest_context_indicators(self, target_type, target_id, k):
+        '''
+        @return dict, the target pattern and its k strongest author and title context indicators
+        '''
+        self.__validate_target(target_type, target_id)
+        result = {"target": self.__describe_pattern(target_type, target_id)}
+        for extractor, indicator_type in self.__context_indicator_extractors[target_type]:
+            indicator_ids = self.__find_cached(["strongest_context_indicators", target_type, indicator_type], \
+                target_id, k, self.get_result_artifact_filenames(target_type, indicator_type), \
+                extractor.find_strongest_context_indicators)
+            result["%s_context_indicators" % indicator_type] = \
+                [self.__describe_pattern(indicator_type, indicator_id) for indicator_id in indicator_ids]
+        return result
+
+    def find_semantically_similar_patterns(self, target_type, target_id, k):
+        '''
+        @return dict, the target pattern and its k most semantically similar patterns
+        '''
+        self.__validate_target(target_type, target_id)
+        similar_ids = self.__find_cached(["semantically_similar_patterns", target_type], target_id, k, \
+            self.get_result_artifact_filenames(target_type, target_type), \
+            self.__similar_pattern_extractors[target_type].find_semantically_similar_patterns)
+        return {
+            "target": self.__describe_pattern(target_type, target_id),
+            "similar_patterns": [self.__describe_pattern(target_type, similar_id) for similar_id in similar_ids]
+        }
+
+    def find_representative_transactions(self, target_type, target_id, k):
+        '''
+        @return dict, the target pattern and its k most representative transactions (papers)
+        '''
+        self.__validate_target(target_type, target_id)
+        transaction_ids = self.__find_cached(["representative_transactions", target_type, \
+            self.__maximum_line_count], target_id, k, self.get_result_artifact_filenames(target_type, target_type, True), \
+            self.__representative_transaction_extractors[target_type].find_representative_transactions)
+        return {
+            "target": self.__describe_pattern(target_type, target_id),
+            "representative_transactions": [self.__describe_transaction(transaction_id) \
+                for transaction_id in transaction_ids]
+        }
+
+    def get_result_artifact_filenames(self, target_type, result_type, needs_transactions=False):
+        '''
+        @param
+            target_type: string         Type of the annotated pattern
+            result_type: string         Type of the result patterns (same as target_type except for context indicators)
+            needs_transactions: bool    True if results depend on the papers (representative transactions)
+        @return list(string), files the results of a query depend on
+        '''
+        # Lazy MI values are computed from the papers (their MI file name is None)
+        return AnnotationResultCache.get_artifact_filenames(self.__pattern_filenames[target_type], \
+            self.__pattern_filenames[result_type], self.__mutual_info_filenames[(target_type, result_type)], \
+                self.__transactions_filenames, needs_transactions)
+
+    def __find_cached(self, query, target_id, k, artifact_filenames, find):
+        '''
+        @param
+            query: list                         Query parameters (besides the storage mode and k)
+            target_id: int                      Id of the annotated pattern
+            k: int                              Number of results
+            artifact_filenames: list(string)    Files the results depend on
+            find: function(int, int)            Extractor method finding the results of (target id, k)
+        @return list(int), the k results of the query, from the result cache if it has them
+        '''
+        if self.__result_cache is None:
+            return find(target_id, k)
+        query = query + [target_id, self.__mutual_info_storage_mode]
+        ids = self.__result_cache.get(query, k, artifact_filenames)
+        if ids is None:
+            ids = find(target_id, k)
+            self.__result_cache.put(query, k, artifact_filenames, ids)
+        return ids
+
+    def __validate_target(self, target_type, target_id):
+        if target_type not in self.__patterns:
+            raise ValueError("target_type must be one of %s" % ', '.join(self.__patterns))
+        if target_id < 0 or target_id >= len(self.__patterns[target_type]):
+            raise ValueError("target_id must be in [0, %d)" % len(self.__patterns[target_type]))
+
+    def __describe_pattern(self, pattern_type, pattern_id):
+        if pattern_type == AnnotationModels.AUTHOR:
+            words = [self.__transactions.get_author_name(word_id) for word_id in self.__patterns[pattern_type][pattern_id]]
+        else:
+            words = [self.__transactions.get_title_term(word_id) for word_id in self.__patterns[pattern_type][pattern_id]]
+        return {"id": pattern_id, "pattern": words}
+
+    def __describe_transaction(self, transaction_id):
+        return {
+            "id": transaction_id,
+            "authors": [self.__transactions.get_author_name(word_id) \
+                for word_id in self.__transactions.get_paper_authors(transaction_id)],
+            "title": [self.__transactions.get_title_term(word_id) \
+                for word_id in self.__transactions.get_paper_title_terms(transaction_id)]
+        }
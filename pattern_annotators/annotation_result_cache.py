@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import instrumentation
+
+'''
+Persistent cache of annotation results (the ids returned by find_strongest_context_indicators,
+find_semantically_similar_patterns and find_representative_transactions), so that repeated queries aren't
+recomputed, within a process or across runs.
+
+Results are keyed by the query (annotator, target type, target id, storage mode, ...) and the sha256 of every
+file the result depends on (MI, pattern, id mapping and data files), so results computed from files that were
+rebuilt since (ex: by setup.sh) are never returned. Files are only hashed again when their size or modification
+time changes; known hashes are kept in digests.json in the cache directory.
+
+Every annotator returns the first k ids of the same ranking whatever k is, so a result cached for k also answers
+any smaller k (and any k at all if it has fewer than k ids, i.e. every candidate).
+
+Results are kept in an in-memory LRU in front of the cache directory, where each one is a JSON file:
+    {"query": [...], "k": int, "ids": [int, ...]}
+'''
+
+class AnnotationResultCache:
+    DEFAULT_CACHE_DIR = os.path.join("data", "annotation_cache")
+    DEFAULT_MAX_CACHED_RESULTS = 4096
+    DIGESTS_FILENAME = "digests.json"
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_cached_results=DEFAULT_MAX_CACHED_RESULTS):
+        '''
+        @param
+            cache_dir: string           Directory results are persisted to (created if needed)
+            max_cached_results: int     Max number of results kept in memory
+        '''
+        self.__cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.__max_cached_results = max_cached_results
+        # Entry filename -> (k, ids)
+        self.__results = OrderedDict()
+        # Absolute file path -> (size, modification time, sha256)
+        self.__digests = {}
+        self.__read_digests()
+        # Queries may come from several threads (ex: the annotation server)
+        self.__lock = threading.RLock()
+
+    @staticmethod
+    def get_artifact_filenames(target_patterns_filename, result_patterns_filename, mutual_info_filename, \
+        transactions_filenames, needs_transactions=False):
+        '''
+        Files the results of a query depend on. Every component sharing a cache (annotate.py, AnnotationModels) must
+        key its results with this, so that they're keyed the same way. Pass the pattern files, even if patterns are
+        read from their pattern stores (see pattern_store.py), which hold the same patterns
+
+        @param
+            target_patterns_filename: string        Pattern file of the annotated pattern's type
+            result_patterns_filename: string        Pattern file of the result patterns' type
+            mutual_info_filename: string?           MI file the results are computed from, None if MI values are
+                computed from the papers (LAZY storage mode)
+            transactions_filenames: list(string)    data.csv and the author and title term id mapping files
+            needs_transactions: bool                True if results depend on the papers (representative transactions)
+        @return list(string), the files
+        '''
+        filenames = [target_patterns_filename, result_patterns_filename]
+        if mutual_info_filename is not None:
+            filenames.append(mutual_info_filename)
+        if needs_transactions or mutual_info_filename is None:
+            filenames.extend(transactions_filenames)
+        return filenames
+
+    def get(self, query, k, artifact_filenames):
+        '''
+        @param
+            query: list                         JSON serializable query parameters, ex: [annotator, target type, id]
+            k: int                              Number of results wanted
+            artifact_filenames: list(string)    Files the results depend on
+        @return list(int)?, the first k cached ids of the query, None if they aren't cached
+        '''
+        with self.__lock:
+            entry_filename = self.__get_entry_filename(query, artifact_filenames)
+            result = self.__results.get(entry_filename)
+            if result is None:
+                result = self.__read_entry(entry_filename)
+                if result is not None:
+                    self.__cache_result(entry_filename, result)
+            else:
+                self.__results.move_to_end(entry_filename)
+
+        if result is None or (result[0] < k and len(result[1]) == result[0]):
+            instrumentation.increment("annotation_cache_misses")
+            return None
+        instrumentation.increment("annotation_cache_hits")
+        return result[1][ : k]
+
+    def put(self, query, k, artifact_filenames, ids):
+        '''
+        Caches the first k ids of a query (unless a larger k is already cached)
+
+        @param
+            query: list                         JSON serializable query parameters
+            k: int                              Number of results that were asked for
+            artifact_filenames: list(string)    Files the results depend on
+            ids: list(int)                      Ids found for k
+        '''
+        with self.__lock:
+            entry_filename = self.__get_entry_filename(query, artifact_filenames)
+            cached_result = self.__results.get(entry_filename) or self.__read_entry(entry_filename)
+            if cached_result is not None and cached_result[0] >= k:
+                return
+            self.__cache_result(entry_filename, (k, list(ids)))
+            self.__write_json(entry_filename, {"query": query, "k": k, "ids": list(ids)})
+
+    def __cache_result(self, entry_filename, result):
+        self.__results[entry_filename] = result
+        self.__results.move_to_end(entry_filename)
+        while len(self.__results) > self.__max_cached_results:
+            self.__results.popitem(last=False)
+
+    def __get_entry_filename(self, query, artifact_filenames):
+        key = json.dumps([query, [self.__get_file_digest(filename) for filename in artifact_filenames]])
+        return os.path.join(self.__cache_dir, "%s.json" % hashlib.sha256(key.encode()).hexdigest())
+
+    def __read_entry(self, entry_filename):
+        '''
+        @return (int, list(int))?, (k, ids) of the persisted result, None if there's none
+        '''
+        if not os.path.exists(entry_filename):
+            return None
+        entry_file = open(entry_filename, "r")
+        try:
+            entry = json.load(entry_file)
+        except ValueError:
+            # Entries are written atomically, but a corrupted one is just recomputed
+            return None
+        finally:
+            entry_file.close()
+        return entry["k"], entry["ids"]
+
+    def __get_file_digest(self, filename):
+        '''
+        @return string, sha256 of the file's content (hashed again only if its size or modification time changed)
+        '''
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        digest = self.__digests.get(path)
+        if digest is not None and digest[0] == stat.st_size and digest[1] == stat.st_mtime_ns:
+            return digest[2]
+
+        sha256 = hashlib.sha256()
+        artifact_file = open(path, "rb")
+        for chunk in iter(lambda: artifact_file.read(1 << 20), b""):
+            sha256.update(chunk)
+        artifact_file.close()
+        self.__digests[path] = (stat.st_size, stat.st_mtime_ns, sha256.hexdigest())
+        self.__write_json(os.path.join(self.__cache_dir, AnnotationResultCache.DIGESTS_FILENAME), \
+            {path: list(digest) for path, digest in self.__digests.items()})
+        return self.__digests[path][2]
+
+    def __read_digests(self):
+        digests_filename = os.path.join(self.__cache_dir, AnnotationResultCache.DIGESTS_FILENAME)
+        if not os.path.exists(digests_filename):
+            return
+        digests_file = open(digests_filename, "r")
+        try:
+            self.__digests = {path: tuple(digest) for path, digest in json.load(digests_file).items()}
+        except ValueError:
+            self.__digests = {}
+        digests_file.close()
+
+    def __write_json(self, filename, value):
+        '''
+        Writes a JSON file atomically, so that concurrent readers (ex: batch workers) never see a partial file
+        '''
+        temp_fd, temp_filename = tempfile.mkstemp(dir=self.__cache_dir, suffix=".tmp")
+        temp_file = os.fdopen(temp_fd, "w")
+        json.dump(value, temp_file)
+        temp_file.close()
+        os.replace(temp_filename, filename)
@@ -0,0 +1,151 @@
+import sys
+import os
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.append(os.path.dirname(__file__))
+
+from annotation_models import AnnotationModels
+from mutual_information_manager import MutualInformationManager
+import instrumentation
+
+'''
+Long-running annotation service. Loads data.csv, the id mappings, the pattern files and all MI files
+ONCE and then answers annotation queries over HTTP (TCP or Unix socket) with JSON results.
+
+Usage:
+    py pattern_annotators/annotation_server.py [--port 8765] [--unix-socket path]
+
+Queries (target_type is either "author" or "title"):
+    GET /strongest_context_indicators?target_type=author&target_id=3&k=5
+    GET /semantically_similar_patterns?target_type=title&target_id=3&k=5
+    GET /representative_transactions?target_type=author&target_id=3&k=5
+    GET /health
+
+Ex: curl "localhost:8765/strongest_context_indicators?target_type=author&target_id=3&k=5"
+    curl --unix-socket annotations.sock "localhost/semantically_similar_patterns?target_type=title&target_id=0&k=3"
+'''
+
+class AnnotationServer:
+    '''
+    Minimal asyncio HTTP/1.1 server (one request per connection) dispatching queries to AnnotationModels.
+    Queries are CPU bound, so they run on a thread pool to keep the event loop free to accept connections.
+    '''
+
+    def __init__(self, models, max_workers=None):
+        '''
+        @param
+            models: AnnotationModels        Loaded models to answer queries with
+            max_workers: int (optional)     Max number of queries evaluated at the same time
+        '''
+        self.__models = models
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__routes = {
+            "/strongest_context_indicators": models.find_strongest_context_indicators,
+            "/semantically_similar_patterns": models.find_semantically_similar_patterns,
+            "/representative_transactions": models.find_representative_transactions
+        }
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_socket_path=None):
+        '''
+        Serves forever on either a TCP port or a Unix socket (if unix_socket_path is set)
+        '''
+        if unix_socket_path:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket_path)
+            print("Serving annotations on unix socket %s" % unix_socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print("Serving annotations on http://%s:%d" % (host, port))
+
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # Skip headers, queries are fully described by the request line
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            if len(request_line) < 2 or request_line[0] != "GET":
+                status, body = 405, {"error": "Only GET requests are supported"}
+            else:
+                status, body = await self.__dispatch(request_line[1])
+
+            payload = json.dumps(body).encode("utf-8")
+            writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n" \
+                "Connection: close\r\n\r\n" % (status, AnnotationServer.__reason(status), len(payload))).encode("latin-1"))
+            writer.write(payload)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def __dispatch(self, target):
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok"}
+        if url.path not in self.__routes:
+            return 404, {"error": "Unknown query %s" % url.path}
+
+        params = parse_qs(url.query)
+        try:
+            target_type = params["target_type"][0]
+            target_id = int(params["target_id"][0])
+            k = int(params["k"][0])
+        except (KeyError, ValueError):
+            return 400, {"error": "target_type, target_id and k (integers) are required"}
+        if k < 1:
+            return 400, {"error": "k must be positive"}
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.__executor, self.__routes[url.path], target_type, target_id, k)
+        except ValueError as err:
+            return 400, {"error": str(err)}
+        except Exception as err:
+            # A failed query must still get a response, and mustn't take the connection handler down with it
+            return 500, {"error": "%s: %s" % (type(err).__name__, err)}
+        return 200, result
+
+    @staticmethod
+    def __reason(status):
+        return {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", \
+            500: "Internal Server Error"}[status]
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+
+    parser = argparse.ArgumentParser(description="Serve pattern annotation queries from models held in memory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--max-workers", type=int, default=None, help="Max number of queries evaluated concurrently")
+    parser.add_argument("--maximum-line-count", type=int, default=None, help="Cutoff for number of papers to read in")
+    parser.add_argument("--dense-mutual-info", action="store_true", \
+        help="mmap the dense MI files (see utils/mutual_information_manager.py dense) instead of parsing the text files")
+    parser.add_argument("--lazy-mutual-info", action="store_true", \
+        help="Only compute (and persist) the MI values queries need instead of reading the full MI files")
+    parser.add_argument("--result-cache-dir", default=None, \
+        help="Cache query results in this directory (ex: data/annotation_cache, shared with annotate.py)")
+    args = parser.parse_args()
+
+    mutual_info_storage_mode = MutualInformationManager.StorageMode.FULL
+    if args.dense_mutual_info:
+        mutual_info_storage_mode = MutualInformationManager.StorageMode.DENSE
+    elif args.lazy_mutual_info:
+        mutual_info_storage_mode = MutualInformationManager.StorageMode.LAZY
+
+    print("Loading models")
+    models = AnnotationModels("data/data.csv", "data/author_id_mappings.txt", "data/title_term_id_mappings.txt", \
+        "data/frequent_author_patterns.txt", "data/minimal_title_term_patterns.txt", args.maximum_line_count, \
+        mutual_info_storage_mode, result_cache_dir=args.result_cache_dir)
+
+    server = AnnotationServer(models, args.max_workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        print("Shutting down")
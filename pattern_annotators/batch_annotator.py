@@ -0,0 +1,145 @@
+import sys
+import os
+import json
+import argparse
+import multiprocessing
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+sys.path.append(os.path.dirname(__file__))
+
+from annotation_models import AnnotationModels
+from mutual_information_manager import MutualInformationManager
+import instrumentation
+
+'''
+Annotates many patterns in one run. Every file is loaded once, intermediate results shared by all
+queries (normalized MI context vectors, paper context models) are computed once before the workers
+start, and the per-pattern queries are split across a process pool. Annotations are streamed out as
+JSON Lines (one JSON object per pattern) in pattern id order.
+
+Usage:
+    py pattern_annotators/batch_annotator.py [--target-type author|title|all] [--ids 0,3,5] [--k 5]
+        [--num-processes 4] [--output annotations.jsonl]
+
+Ex: annotate every author and title pattern with k = 5
+    py pattern_annotators/batch_annotator.py --target-type all --k 5 --output data/annotations.jsonl
+'''
+
+# Models are loaded by the parent process and inherited by forked workers, so a worker only loads its
+# own copy when processes are spawned rather than forked
+_models = None
+
+def _init_worker(models_args):
+    global _models
+    if _models is None:
+        _models = AnnotationModels(*models_args)
+
+def _annotate_pattern(query):
+    target_type, target_id, k = query
+    return json.dumps(_models.annotate_pattern(target_type, target_id, k))
+
+def annotate_patterns(models_args, queries, output_file, num_processes=None, chunk_size=4):
+    '''
+    Annotates every (target type, target id, k) query and writes one JSON line per query to output_file,
+    in the order of queries
+
+    @param
+        models_args: tuple                      Args to construct AnnotationModels with
+        queries: list((string, int, int))       (target type, target id, k) queries to annotate
+        output_file: File                       File object to stream JSON lines to
+        num_processes: int (optional)           Number of worker processes (defaults to the cpu count)
+        chunk_size: int                         Number of queries sent to a worker at a time
+    '''
+    global _models
+    if _models is None:
+        _models = AnnotationModels(*models_args)
+
+    with instrumentation.stage("batch_annotation.warm_up"):
+        for target_type in sorted(set(query[0] for query in queries)):
+            _models.warm_up(target_type)
+
+    with instrumentation.stage("batch_annotation.annotate"):
+        if num_processes == 1:
+            for query in queries:
+                output_file.write("%s\n" % _annotate_pattern(query))
+            return
+
+        with multiprocessing.Pool(num_processes, initializer=_init_worker, initargs=(models_args,)) as pool:
+            for annotation in pool.imap(_annotate_pattern, queries, chunk_size):
+                output_file.write("%s\n" % annotation)
+
+def parse_ids(ids_arg):
+    '''
+    argparse type of --ids
+
+    @param ids_arg: string      Comma separated pattern ids and id ranges, ex: 0,3,5-9
+    @return list(int), pattern ids
+    '''
+    ids = []
+    for id_range in ids_arg.split(','):
+        try:
+            if '-' in id_range:
+                first_id, last_id = id_range.split('-')
+                first_id, last_id = int(first_id), int(last_id)
+            else:
+                first_id = last_id = int(id_range)
+        except ValueError:
+            raise argparse.ArgumentTypeError("invalid id or id range: '%s'" % id_range)
+        if first_id > last_id:
+            raise argparse.ArgumentTypeError("invalid id range: '%s'" % id_range)
+        ids.extend(range(first_id, last_id + 1))
+    return ids
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+
+    parser = argparse.ArgumentParser(description="Annotate a set of patterns (or all of them) in one run")
+    parser.add_argument("--target-type", choices=[AnnotationModels.AUTHOR, AnnotationModels.TITLE, "all"], default="all")
+    parser.add_argument("--ids", type=parse_ids, default=None, help="Comma separated pattern ids/ranges (ex: 0,3,5-9), defaults to all")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--num-processes", type=int, default=None, help="Defaults to the cpu count")
+    parser.add_argument("--output", default=None, help="JSON Lines output file, defaults to stdout")
+    parser.add_argument("--maximum-line-count", type=int, default=None, help="Cutoff for number of papers to read in")
+    parser.add_argument("--dense-mutual-info", action="store_true", \
+        help="mmap the dense MI files (see utils/mutual_information_manager.py dense) instead of parsing the text files")
+    parser.add_argument("--approximate-mutual-info", type=int, default=None, metavar="SAMPLE_SIZE", \
+        help="Estimate MI values from a sample of SAMPLE_SIZE papers instead of reading the MI files (quick first pass)")
+    parser.add_argument("--result-cache-dir", default=None, \
+        help="Cache query results in this directory (ex: data/annotation_cache, shared with annotate.py)")
+    args = parser.parse_args()
+
+    mutual_info_storage_mode = MutualInformationManager.StorageMode.FULL
+    if args.dense_mutual_info:
+        mutual_info_storage_mode = MutualInformationManager.StorageMode.DENSE
+    elif args.approximate_mutual_info:
+        mutual_info_storage_mode = MutualInformationManager.StorageMode.APPROXIMATE
+
+    models_args = ("data/data.csv", "data/author_id_mappings.txt", "data/title_term_id_mappings.txt", \
+        "data/frequent_author_patterns.txt", "data/minimal_title_term_patterns.txt", args.maximum_line_count, \
+        mutual_info_storage_mode, args.approximate_mutual_info or MutualInformationManager.DEFAULT_SAMPLE_SIZE, \
+        args.result_cache_dir)
+    _models = AnnotationModels(*models_args)
+
+    if args.target_type == "all":
+        target_types = [AnnotationModels.AUTHOR, AnnotationModels.TITLE]
+    else:
+        target_types = [args.target_type]
+
+    queries = []
+    for target_type in target_types:
+        num_patterns = _models.get_number_of_patterns(target_type)
+        if args.ids:
+            # Checked before any worker starts, a bad id would otherwise stop the run partway through the output
+            invalid_ids = [target_id for target_id in args.ids if target_id >= num_patterns]
+            if invalid_ids:
+                parser.error("--ids: %s pattern ids must be in [0, %d), got %s" % (target_type, num_patterns, \
+                    ','.join([str(target_id) for target_id in invalid_ids])))
+            target_ids = args.ids
+        else:
+            target_ids = range(num_patterns)
+        queries.extend((target_type, target_id, args.k) for target_id in target_ids)
+
+    output_file = open(args.output, "w") if args.output else sys.stdout
+    annotate_patterns(models_args, queries, output_file, args.num_processes)
+    if args.output:
+        output_file.close()
@@ -7,7 +7,8 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
 from transactions_manager import TransactionsManager
 from mutual_information_manager import MutualInformationManager
 from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
-from cosine_similarity import compute_cosine_similarity
+from cosine_similarity import normalize_vector, compute_normalized_cosine_similarity
+import instrumentation
 
 '''
 Extracts representative transactions and pretty prints them
@@ -30,7 +31,8 @@ class RepresentativeTransactionExtractor:
         def __eq__(self, other):
             return self.cosine_sim == other.cosine_sim
 
-    def __init__(self, transaction_mananger, mutual_info_manager, patterns, pattern_type, num_transactions):
+    def __init__(self, transaction_mananger, mutual_info_manager, patterns, pattern_type, num_transactions, \
+        embeddings=None, paper_embeddings=None):
         '''
         @param
             transaction_mananger: TransactionsManager       Object storing all transactions (every line from data.csv)
@@ -38,6 +40,11 @@ class RepresentativeTransactionExtractor:
             patterns: list(list(int))                       List of all SSP patterns
             pattern_type: PatternType                       Type of pattern pairs to compute MI for
             num_transactions: int                           Top k most representative transactions to find
+            embeddings: ContextEmbeddings (optional)        Low dimensional embeddings of the patterns' MI context
+                vectors (see utils/context_embeddings.py)
+            paper_embeddings: ContextEmbeddings (optional)  Embeddings of the paper context models, with the same
+                projection as embeddings. If both are set, papers are ranked by the cosine similarity of the
+                embeddings instead of the context models, which are then never computed
         '''
         self.__transaction_manager = transaction_mananger
         self.__mutual_info_manager = mutual_info_manager
@@ -49,9 +56,22 @@ class RepresentativeTransactionExtractor:
 
         self.__num_transactions = num_transactions
 
+        # Paper context models only depend on the patterns, so they're computed (and normalized) on the
+        # first query and reused by every query after that (see get_normalized_paper_context_models)
+        self.__paper_context_models = None
+        self.__normalized_paper_context_models = None
+
+        assert (embeddings is None) == (paper_embeddings is None)
+        self.__embeddings = embeddings
+        self.__paper_embeddings = paper_embeddings
+        if embeddings is not None:
+            assert embeddings.get_number_of_vectors() == len(patterns)
+            assert paper_embeddings.get_number_of_vectors() == transaction_mananger.get_number_of_transactions()
+
+    @instrumentation.instrumented_stage("representative_transactions.find")
     def find_representative_transactions(self, pattern_id, k):
         '''
-        Finds the top num_transactions representative transactions for each pattern inputted in the constructor
+        Finds the top k representative transactions for a pattern inputted in the constructor
 
         @param pattern_id int:
             id for which we are trying to find semantically similar patterns for
@@ -60,28 +80,57 @@ class RepresentativeTransactionExtractor:
         @return list(int):
             k most semantically similar patterns, sorted in decreasing similarity
         '''
-        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR:
-            paper_context_models = self.__transaction_manager.compute_author_context_models(self.__patterns)
-        elif self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
-             paper_context_models = self.__transaction_manager.compute_title_context_models(self.__patterns)
-
+        paper_context_models = self.get_normalized_paper_context_models()
         context_model_dim = len(self.__patterns)
 
         similarities_max_q = []
 
         # Read in the context model vector
-        pattern_context_model = self.__mutual_info_manager.get_mutual_information_vector(pattern_id, context_model_dim)
+        if self.__embeddings is not None:
+            pattern_context_model = self.__embeddings.get_embedding(pattern_id)
+        else:
+            pattern_context_model = normalize_vector( \
+                self.__mutual_info_manager.get_mutual_information_vector(pattern_id, context_model_dim))
 
         for transaction_ind, transaction_vec in enumerate(paper_context_models):
-            cosine_sim = compute_cosine_similarity(pattern_context_model, transaction_vec)
+            cosine_sim = compute_normalized_cosine_similarity(pattern_context_model, transaction_vec)
             heapq.heappush(similarities_max_q, RepresentativeTransactionExtractor.TransactionSimilarity(cosine_sim, transaction_ind))
 
         pattern_transactions = []
-        for _ in range(self.__num_transactions):
+        for _ in range(min(k, len(similarities_max_q))):
             transaction_ind = heapq.heappop(similarities_max_q).transaction_ind
             pattern_transactions.append(transaction_ind)
         return pattern_transactions
 
+    def get_paper_context_models(self):
+        '''
+        Computes the context model of every paper against the patterns inputted in the constructor
+        the first time it's called and returns the cached context models after that
+
+        @return list(list(float)):
+            context models, one per paper
+        '''
+        if self.__paper_context_models is None:
+            if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR:
+                self.__paper_context_models = self.__transaction_manager.compute_author_context_models(self.__patterns)
+            elif self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
+                self.__paper_context_models = self.__transaction_manager.compute_title_context_models(self.__patterns)
+        return self.__paper_context_models
+
+    def get_normalized_paper_context_models(self):
+        '''
+        @return list(list(float)):
+            unit length paper context models (or their embeddings if embeddings were passed in), one per paper
+            (cached after the first call)
+        '''
+        if self.__normalized_paper_context_models is None:
+            if self.__paper_embeddings is not None:
+                self.__normalized_paper_context_models = self.__paper_embeddings.get_embeddings()
+            else:
+                self.__normalized_paper_context_models = [normalize_vector(context_model) \
+                    for context_model in self.get_paper_context_models()]
+        return self.__normalized_paper_context_models
+
     def display_pretty(self, pattern_id, top_transactions):
         '''
         Prints the representative transactions out per pattern. All patterns and transactions are represented
@@ -133,6 +182,7 @@ if __name__ == "__main__":
     '''
     Usage: py pattern_annotators/representative_transaction_extractor.py [target_id] [k] [is author experiment]
     '''
+    instrumentation.configure_from_argv(sys.argv)
     # We pull only the first 100 lines to speed up computation.
     MAXIMUM_LINE_COUNT = 100
     target_id = int(sys.argv[1])
@@ -1,14 +1,14 @@
 import sys
 import os
 import heapq
-import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
 
 from transactions_manager import TransactionsManager
 from mutual_information_manager import MutualInformationManager
 from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
-from cosine_similarity import compute_cosine_similarity
+from cosine_similarity import normalize_vector, compute_normalized_cosine_similarity
+import instrumentation
 
 class SemanticallySimilarPatternExtractor:
     class SemanticSimilarityHeapEntry(object):
@@ -27,13 +27,20 @@ class SemanticallySimilarPatternExtractor:
         def __eq__(self, other):
             return self.sim == other.sim
 
-    def __init__(self, mutual_info_manager, transaction_manager, patterns, pattern_type):
+    def __init__(self, mutual_info_manager, transaction_manager, patterns, pattern_type, ann_index=None, \
+        embeddings=None):
         '''
         @param
-            transaction_mananger: TransactionsManager       Object storing all transactions (every line from data.csv)
+            transaction_mananger: TransactionsManager       Object storing all transactions (every line from data.csv),
+                or a Vocabulary, since it's only used to print patterns
             mutual_info_manager: MutualInformationManager   Object storing a set of all author-author mutual information vals
             patterns: list(list(int))                       List of all SSP patterns
             pattern_type: PatternType                       Type of pattern pairs to compute MI for
+            ann_index: RandomHyperplaneLshIndex (optional)  Approximate nearest-neighbor index over the patterns' MI
+                context vectors. If set, queries only rank the index's candidates instead of every pattern
+            embeddings: ContextEmbeddings (optional)        Low dimensional embeddings of the patterns' MI context
+                vectors (see utils/context_embeddings.py). If set, patterns are ranked by the cosine similarity of
+                their embeddings instead of their context vectors, and the MI manager isn't read
         '''
         self.__transaction_manager = transaction_manager
         self.__mutual_info_manager = mutual_info_manager
@@ -42,28 +49,64 @@ class SemanticallySimilarPatternExtractor:
             or pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
         self.__pattern_type = pattern_type
 
-    def find_semantically_similar_patterns(self, pattern_id, k):
+        # Normalized MI context vector of every pattern, computed on the first query and shared by all
+        # queries after that (see get_normalized_context_vectors)
+        self.__normalized_context_vectors = None
+        self.__ann_index = ann_index
+        self.__embeddings = embeddings
+        if embeddings is not None:
+            assert embeddings.get_number_of_vectors() == len(patterns)
+
+    @instrumentation.instrumented_stage("semantically_similar_patterns.find")
+    def find_semantically_similar_patterns(self, pattern_id, k, exact=False):
         '''
         @param pattern_id int:
             id for which we are trying to find semantically similar patterns for
         @param k int:
             number of semantically similar patterns to find
+        @param exact bool:
+            True to scan every pattern even if an ANN index was passed in (ex: to validate the index)
         @return list(int):
             k most semantically similar patterns, sorted in decreasing similarity
         '''
-        pattern_id_mutual_info_vector = self.__mutual_info_manager.get_mutual_information_vector(pattern_id, len(self.__patterns))
+        normalized_context_vectors = self.get_normalized_context_vectors()
+        if self.__ann_index and not exact:
+            ids = self.__ann_index.query(pattern_id, k)
+            # Fall back to the exact scan if the query's buckets didn't hold enough candidates
+            if len(ids) >= min(k, len(normalized_context_vectors)):
+                return ids
+
+        pattern_id_context_vector = normalized_context_vectors[pattern_id]
         strongest_context_indicators = []
-        for idx in range(len(pattern_id_mutual_info_vector)):
-            idx_mutual_info_vector = self.__mutual_info_manager.get_mutual_information_vector(idx, len(self.__patterns))
-            cosine_similarity = compute_cosine_similarity(pattern_id_mutual_info_vector, idx_mutual_info_vector)
+        for idx, idx_context_vector in enumerate(normalized_context_vectors):
+            cosine_similarity = compute_normalized_cosine_similarity(pattern_id_context_vector, idx_context_vector)
             heapq.heappush(strongest_context_indicators, SemanticallySimilarPatternExtractor.SemanticSimilarityHeapEntry(idx, cosine_similarity))
 
         ids = []
-        for index in range(k):
+        for index in range(min(k, len(strongest_context_indicators))):
             top_entry_id = heapq.heappop(strongest_context_indicators).id
             ids.append(top_entry_id)
         return ids
 
+    def get_normalized_context_vectors(self):
+        '''
+        Reads the MI context vector of every pattern and normalizes it (or reads its embedding if embeddings
+        were passed in) the first time it's called and returns the cached vectors after that
+
+        @return list(list(float)):
+            unit length MI context vectors (or embeddings), indexed by pattern id
+        '''
+        if self.__normalized_context_vectors is None:
+            if self.__embeddings is not None:
+                self.__normalized_context_vectors = self.__embeddings.get_embeddings()
+            else:
+                self.__normalized_context_vectors = [normalize_vector( \
+                    self.__mutual_info_manager.get_mutual_information_vector(idx, len(self.__patterns))) \
+                        for idx in range(len(self.__patterns))]
+            if self.__ann_index:
+                self.__ann_index.set_vectors(self.__normalized_context_vectors)
+        return self.__normalized_context_vectors
+
     def pretty_print(self, pattern_id, top_patterns):
         '''
         Takes in a list of pattern ids and converts them to pattern names.
@@ -92,6 +135,7 @@ if __name__ == '__main__':
     '''
     Usage: py strongest_context_indicator_extractor.py [target_id] [k] [is author experiment]
     '''
+    instrumentation.configure_from_argv(sys.argv)
     target_id = int(sys.argv[1])
     k = int(sys.argv[2])
     is_auth_experiment = sys.argv[3] == "True"
@@ -8,29 +8,14 @@ from transactions_manager import TransactionsManager
 from mutual_information_manager import MutualInformationManager
 from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
 from cosine_similarity import compute_cosine_similarity
+import instrumentation
 
 class StrongestContextIndicatorExtractor:
-    # From: https://stackoverflow.com/questions/2501457/what-do-i-use-for-a-max-heap-implementation-in-python
-    class ContextIndicatorHeapEntry(object):
-        '''
-        Pattern index object used to implement a maxheap. Stores the cosine similarity, which is used
-        for comparisions and the pattern index, which keeps track of which transaction the mutual information
-        belongs to
-        '''
-        def __init__(self, id, sim):
-            self.id = id
-            self.sim = sim
-
-        def __lt__(self, other):
-            return self.sim > other.sim
-
-        def __eq__(self, other):
-            return self.sim == other.sim
-
     def __init__(self, mutual_info_manager, transaction_manager, patterns, pattern_type, alternate_patterns=None):
         '''
         @param
-            transaction_mananger: TransactionsManager       Object storing all transactions (every line from data.csv)
+            transaction_mananger: TransactionsManager       Object storing all transactions (every line from data.csv),
+                or a Vocabulary, since it's only used to print patterns
             mutual_info_manager: MutualInformationManager   Object storing a set of all author-author mutual information vals
             patterns: list(list(int))                       List of all SSP patterns
             pattern_type: PatternType                       Type of pattern pairs to compute MI for
@@ -53,6 +38,7 @@ class StrongestContextIndicatorExtractor:
 
         self.__alternate_patterns = alternate_patterns
 
+    @instrumentation.instrumented_stage("strongest_context_indicators.find")
     def find_strongest_context_indicators(self, pattern_id, k):
         '''
         @param pattern_id int:
@@ -61,17 +47,23 @@ class StrongestContextIndicatorExtractor:
             number of strongest context indicators to find
         @return list(int):
             k strongest context indicators, sorted in descending strength (measured by mutual information)
+
+        Raises ValueError in TOP_K storage mode if k is larger than the K the top K files were built with: only
+        the top K entries of every row are kept, every other value reads as 0
         '''
+        # Rows of the top K files are sorted in descending MI (title-author rows are sorted columns of the
+        # author-title matrix), so only the first k entries of the row are touched
+        if self.__mutual_info_manager.get_storage_mode() == MutualInformationManager.StorageMode.TOP_K:
+            if k > self.__mutual_info_manager.get_top_k():
+                raise ValueError("k must be at most %d, the K of the top K MI files" % \
+                    self.__mutual_info_manager.get_top_k())
+            return [other_pattern_id for other_pattern_id, _ in \
+                self.__mutual_info_manager.get_top_k_mutual_information(pattern_id, k)]
+
+        # Otherwise, partially select the top k of the row's vector: nlargest keeps a k sized heap of ids rather
+        # than heapifying one object per pattern, and breaks ties in favor of the smaller id
         mutual_info_vector = self.__mutual_info_manager.get_mutual_information_vector(pattern_id, len(self.__patterns))
-        strongest_context_indicators = []
-        for id in range(len(mutual_info_vector)):
-            heapq.heappush(strongest_context_indicators, StrongestContextIndicatorExtractor.ContextIndicatorHeapEntry(id, mutual_info_vector[id]))
-
-        ids = []
-        for index in range(k):
-            top_entry_id = heapq.heappop(strongest_context_indicators).id
-            ids.append(top_entry_id)
-        return ids
+        return heapq.nlargest(k, range(len(mutual_info_vector)), key=mutual_info_vector.__getitem__)
 
     def pretty_print(self, pattern_id, top_patterns):
         '''
@@ -109,6 +101,7 @@ if __name__ == '__main__':
     '''
     Usage: py strongest_context_indicator_extractor.py [target_id] [k] [is author experiment]
     '''
+    instrumentation.configure_from_argv(sys.argv)
     target_id = int(sys.argv[1])
     k = int(sys.argv[2])
     is_auth_experiment = sys.argv[3] == "True"
@@ -0,0 +1,96 @@
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
+from strongest_context_indicator_extractor import StrongestContextIndicatorExtractor
+from semantically_similar_pattern_extractor import SemanticallySimilarPatternExtractor
+import instrumentation
+
+'''
+Compares the top k results of the MI based annotators computed from the quantized MI files against the ones
+computed from the full precision MI files, for every pattern, and reports how far the quantized values are
+from the full ones (next to the documented bound, see MutualInformationManager.get_max_quantization_error).
+
+Build the quantized files first:
+    py utils/mutual_information_manager.py quantize [BITS]
+
+Usage:
+    py pattern_annotators/validate_quantized_mutual_info.py [k]
+
+Reported per annotator and pattern type:
+    exact_match     fraction of patterns whose quantized top k is identical (same ids, same order) to the full one
+    recall          average fraction of the full top k found in the quantized top k (ties may swap ids at rank k)
+'''
+
+def compare_top_k(full_find, quantized_find, num_patterns, k):
+    '''
+    @param
+        full_find: function(int, int)           Annotator query against the full MI values
+        quantized_find: function(int, int)      Same annotator query against the quantized MI values
+        num_patterns: int                       Number of patterns to query
+        k: int                                  Number of results per query
+    @return (float, float), (exact match rate, average recall@k)
+    '''
+    exact_matches = 0
+    total_recall = 0
+    for pattern_id in range(num_patterns):
+        full_ids = full_find(pattern_id, k)
+        quantized_ids = quantized_find(pattern_id, k)
+        if full_ids == quantized_ids:
+            exact_matches += 1
+        total_recall += len(set(full_ids).intersection(quantized_ids)) / len(full_ids) if full_ids else 1
+    return exact_matches / num_patterns, total_recall / num_patterns
+
+def find_max_quantization_error(full_mutual_info, quantized_mutual_info, num_rows, num_cols):
+    '''
+    @return float, largest absolute difference between a full and a quantized MI value
+    '''
+    max_error = 0.0
+    for row in range(num_rows):
+        full_vec = full_mutual_info.get_mutual_information_vector(row, num_cols)
+        quantized_vec = quantized_mutual_info.get_mutual_information_vector(row, num_cols)
+        max_error = max([max_error] + [abs(full - quantized) for full, quantized in zip(full_vec, quantized_vec)])
+    return max_error
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    author_patterns = parse_author_file_into_patterns("data/frequent_author_patterns.txt")
+    title_patterns = parse_sequential_title_file_into_patterns("data/minimal_title_term_patterns.txt")
+
+    for pattern_type, name, row_patterns, col_patterns in [
+        (MutualInformationManager.PatternType.AUTHOR_AUTHOR, "author-author", author_patterns, author_patterns),
+        (MutualInformationManager.PatternType.AUTHOR_TITLE, "author-title", author_patterns, title_patterns),
+        (MutualInformationManager.PatternType.TITLE_AUTHOR, "title-author", title_patterns, author_patterns),
+        (MutualInformationManager.PatternType.TITLE_TITLE, "title-title", title_patterns, title_patterns)]:
+
+        managers = []
+        for storage_mode in [MutualInformationManager.StorageMode.FULL, MutualInformationManager.StorageMode.QUANTIZED]:
+            mutual_info = MutualInformationManager(pattern_type, storage_mode=storage_mode)
+            mutual_info.read_mutual_information_from_file()
+            managers.append(mutual_info)
+        full_mutual_info, quantized_mutual_info = managers
+
+        max_error = find_max_quantization_error(full_mutual_info, quantized_mutual_info, len(row_patterns), \
+            len(col_patterns))
+        print("%s: max absolute error %g (bound %g)" % (name, max_error, \
+            quantized_mutual_info.get_max_quantization_error()))
+
+        alternate_patterns = row_patterns if pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE \
+            or pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR else None
+        full_extractor, quantized_extractor = [StrongestContextIndicatorExtractor(mutual_info, None, col_patterns, \
+            pattern_type, alternate_patterns) for mutual_info in managers]
+        exact_match, recall = compare_top_k(full_extractor.find_strongest_context_indicators, \
+            quantized_extractor.find_strongest_context_indicators, len(row_patterns), k)
+        print("    strongest context indicators: exact_match %f, recall@%d %f" % (exact_match, k, recall))
+
+        if alternate_patterns is None:
+            full_extractor, quantized_extractor = [SemanticallySimilarPatternExtractor(mutual_info, None, col_patterns, \
+                pattern_type) for mutual_info in managers]
+            exact_match, recall = compare_top_k(full_extractor.find_semantically_similar_patterns, \
+                quantized_extractor.find_semantically_similar_patterns, len(row_patterns), k)
+            print("    semantically similar patterns: exact_match %f, recall@%d %f" % (exact_match, k, recall))
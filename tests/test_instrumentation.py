@@ -0,0 +1,49 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from instrumentation import StageProfiler
+
+'''
+Run with `python -m unittest discover tests` (or pytest) from CourseProject/
+'''
+
+NUM_THREADS = 4
+NUM_ITERATIONS = 200
+
+class StageProfilerTest(unittest.TestCase):
+    def test_stages_from_several_threads(self):
+        profiler = StageProfiler()
+        profiler.start()
+        # Every thread enters its stages at the same time, so their stage stacks interleave
+        barrier = threading.Barrier(NUM_THREADS)
+        errors = []
+
+        def run_stages(thread_index):
+            try:
+                barrier.wait()
+                for _ in range(NUM_ITERATIONS):
+                    with StageProfiler.Stage(profiler, "outer.%d" % (thread_index % 2)):
+                        with StageProfiler.Stage(profiler, "inner"):
+                            profiler.increment("iterations")
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run_stages, args=(thread_index,)) for thread_index in range(NUM_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        report = profiler.get_report()
+        self.assertEqual(report["stages"]["outer.0"]["calls"], NUM_THREADS // 2 * NUM_ITERATIONS)
+        self.assertEqual(report["stages"]["outer.1"]["calls"], NUM_THREADS // 2 * NUM_ITERATIONS)
+        self.assertEqual(report["stages"]["inner"]["calls"], NUM_THREADS * NUM_ITERATIONS)
+        self.assertEqual(report["counters"]["iterations"], NUM_THREADS * NUM_ITERATIONS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from transactions_manager import TransactionsManager
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_author_file_into_patterns
+import instrumentation
+
+CORPUS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpora", "small"))
+NUM_PATTERNS = 40
+# Small enough that estimates differ from the exact values
+SAMPLE_SIZE = 100
+# Small enough that the out-of-core computation has several row blocks
+TILED_MEMORY_BUDGET = 16 * 1024
+
+class Interrupted(Exception):
+    pass
+
+class MutualInformationManagerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.transactions = TransactionsManager(os.path.join(CORPUS_DIR, "data.csv"), \
+            os.path.join(CORPUS_DIR, "author_id_mappings.txt"), os.path.join(CORPUS_DIR, "title_term_id_mappings.txt"))
+        cls.patterns = parse_author_file_into_patterns(os.path.join(CORPUS_DIR, \
+            "frequent_author_patterns.txt"))[ : NUM_PATTERNS]
+
+    def get_manager(self, storage_mode):
+        return MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, self.transactions, \
+            storage_mode=storage_mode, patterns=self.patterns, sample_size=SAMPLE_SIZE)
+
+    def test_lazy_symmetric_rows_reuse_cached_values(self):
+        mutual_info = self.get_manager(MutualInformationManager.StorageMode.LAZY)
+        mutual_info.get_mutual_information_vector(0, NUM_PATTERNS)
+
+        profiler = instrumentation.enable()
+        num_evaluations = profiler.get_report()["counters"].get("pair_mi_evaluations", 0)
+        mutual_info.get_mutual_information_vector(1, NUM_PATTERNS)
+        # (1, 0) is the cached (0, 1)
+        self.assertEqual(profiler.get_report()["counters"]["pair_mi_evaluations"] - num_evaluations, NUM_PATTERNS - 1)
+
+    def test_refined_rows_are_exact_in_both_directions(self):
+        mutual_info = self.get_manager(MutualInformationManager.StorageMode.APPROXIMATE)
+        exact_mutual_info = self.get_manager(MutualInformationManager.StorageMode.LAZY)
+        # Cache estimates of the column of row 0 before it's refined
+        for row in range(1, NUM_PATTERNS):
+            mutual_info.get_mutual_information_vector(row, NUM_PATTERNS)
+        self.assertTrue(any(mutual_info.get_mutual_information(row, 0) != \
+            exact_mutual_info.get_mutual_information(row, 0) for row in range(1, NUM_PATTERNS)))
+
+        mutual_info.refine_rows([0])
+        for col in range(NUM_PATTERNS):
+            exact_val = exact_mutual_info.get_mutual_information(0, col)
+            self.assertEqual(mutual_info.get_mutual_information(0, col), exact_val)
+            self.assertEqual(mutual_info.get_mutual_information(col, 0), exact_val)
+            self.assertEqual(mutual_info.get_mutual_information_bounds(col, 0), (exact_val, exact_val))
+
+    def test_tiled_resume_validates_committed_tiles(self):
+        cwd = os.getcwd()
+        temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(temp_dir, "data"))
+        os.chdir(temp_dir)
+        try:
+            dense_filename = MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[ \
+                MutualInformationManager.PatternType.AUTHOR_AUTHOR]
+            self.compute_tiled()
+            expected = self.read_file(dense_filename)
+
+            for is_corrupted in [False, True]:
+                # Interrupted right after the first row block is committed
+                with mock.patch.object(MutualInformationManager, "_MutualInformationManager__report_progress", \
+                    side_effect=Interrupted):
+                    self.assertRaises(Interrupted, self.compute_tiled)
+                if is_corrupted:
+                    dense_file = open(dense_filename, "r+b")
+                    dense_file.seek(len(expected) - 8 * NUM_PATTERNS * NUM_PATTERNS)
+                    dense_file.write(b"\xff" * 8)
+                    dense_file.close()
+
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    self.compute_tiled(resume=True)
+                self.assertIn("doesn't match" if is_corrupted else "Resuming", output.getvalue())
+                self.assertEqual(self.read_file(dense_filename), expected)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(temp_dir)
+
+    def compute_tiled(self, resume=False):
+        MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, self.transactions) \
+            .compute_mutual_information(self.patterns, memory_budget=TILED_MEMORY_BUDGET, resume=resume)
+
+    def read_file(self, filename):
+        read_file = open(filename, "rb")
+        content = read_file.read()
+        read_file.close()
+        return content
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from parse_patterns import PatternRecord
+from pattern_store import PatternStore, write_pattern_store
+
+AUTHOR_RECORDS = [
+    PatternRecord([3, 7], 4, {0, 2, 5, 9}),
+    PatternRecord([12], 3, {1, 2, 8}),
+    PatternRecord([7, 3, 21], 2, {2, 9}),
+    PatternRecord([0, 5], 2, {4, 6})
+]
+# Title patterns are sequences of 1-itemsets (see FrequentPatternBuilder)
+TITLE_RECORDS = [
+    PatternRecord([4, -1, 9, -1], 5, {0, 1, 3, 6, 7}),
+    PatternRecord([9, -1, 4, -1], 2, {2, 5}),
+    PatternRecord([11, -1], 3, {1, 4, 8}),
+    PatternRecord([4, -1, 9, -1, 2, -1], 2, {3, 6})
+]
+
+class PatternStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.__temp_dir = tempfile.mkdtemp()
+        self.__stores = []
+
+    def tearDown(self):
+        for store in self.__stores:
+            store.close()
+        shutil.rmtree(self.__temp_dir)
+
+    def open_store(self, records, is_sequential_title, build_index=True):
+        store_file_name = os.path.join(self.__temp_dir, "patterns_%d.bin" % len(self.__stores))
+        write_pattern_store(store_file_name, records, is_sequential_title, build_index)
+        store = PatternStore(store_file_name)
+        self.__stores.append(store)
+        return store
+
+    def assert_records_equal(self, records, expected_records):
+        self.assertEqual(len(records), len(expected_records))
+        for record, expected_record in zip(records, expected_records):
+            self.assertEqual(record.items, expected_record.items)
+            self.assertEqual(record.support, expected_record.support)
+            self.assertEqual(record.transaction_ids, expected_record.transaction_ids)
+
+    def test_to_records_round_trip(self):
+        for records, is_sequential_title in [(AUTHOR_RECORDS, False), (TITLE_RECORDS, True)]:
+            store = self.open_store(records, is_sequential_title)
+            self.assertEqual(store.is_sequential_title(), is_sequential_title)
+            self.assert_records_equal(store.to_records(), records)
+
+        # Pattern files mined without #SUP or #TID
+        store = self.open_store([PatternRecord(record.items) for record in AUTHOR_RECORDS], False)
+        self.assertIsNone(store.get_support(0))
+        self.assertIsNone(store.get_transaction_ids(0))
+        self.assert_records_equal(store.to_records(), [PatternRecord(record.items) for record in AUTHOR_RECORDS])
+
+    def test_find(self):
+        for build_index in [True, False]:
+            author_store = self.open_store(AUTHOR_RECORDS, False, build_index)
+            for pattern_id, record in enumerate(AUTHOR_RECORDS):
+                self.assertEqual(author_store.find(record.items), pattern_id)
+                # Author patterns are itemsets
+                self.assertEqual(author_store.find(list(reversed(record.items))), pattern_id)
+            self.assertEqual(author_store.find([21, 3, 7]), 2)
+            self.assertIsNone(author_store.find([3, 21]))
+            self.assertIsNone(author_store.find([]))
+
+            title_store = self.open_store(TITLE_RECORDS, True, build_index)
+            for pattern_id, record in enumerate(TITLE_RECORDS):
+                self.assertEqual(title_store.find([item for item in record.items if item != -1]), pattern_id)
+            # Title patterns are sequences
+            self.assertIsNone(title_store.find([2, 9, 4]))
+            self.assertIsNone(title_store.find([9]))
+
+    def test_indexing(self):
+        store = self.open_store(AUTHOR_RECORDS, False)
+        patterns = [record.items for record in AUTHOR_RECORDS]
+        self.assertEqual(len(store), len(patterns))
+        self.assertEqual(list(store), patterns)
+        for pattern_id in range(-len(patterns), len(patterns)):
+            self.assertEqual(store[pattern_id], patterns[pattern_id])
+        for pattern_slice in [slice(None), slice(1, 3), slice(-2, None), slice(None, None, -1), slice(5, 9)]:
+            self.assertEqual(store[pattern_slice], patterns[pattern_slice])
+        for pattern_id in [len(patterns), -len(patterns) - 1]:
+            self.assertRaises(IndexError, lambda: store[pattern_id])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import random
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from transaction_id_set import TransactionIdSet
+
+# Sets whose ids are spread over [0, largest id] have offset 0, sets whose ids are all in the second half of it are
+# offset by their smallest id (ex: papers of a single conference shard)
+ID_SETS = {
+    "empty": set(),
+    "spread": {0, 3, 64, 65, 130, 255, 256, 300},
+    "spread_dense": set(range(0, 320, 3)),
+    "shard": set(range(100, 180, 2)),
+    "overlapping_shard": {101, 120, 121, 150, 179, 200, 201},
+    "disjoint_shard": set(range(500, 530)),
+    "single": {120}
+}
+
+class TransactionIdSetTest(unittest.TestCase):
+    def test_matches_python_sets(self):
+        random_sets = {"random_%d" % ind: set(random.Random(ind).sample(range(ind * 40, 400 + ind * 40), 50)) \
+            for ind in range(4)}
+        id_sets = dict(ID_SETS, **random_sets)
+        for name, ids in id_sets.items():
+            transaction_ids = TransactionIdSet(ids)
+            self.assertEqual(list(transaction_ids), sorted(ids), name)
+            self.assertEqual(len(transaction_ids), len(ids), name)
+
+            for other_name, other_ids in id_sets.items():
+                other_transaction_ids = TransactionIdSet(other_ids)
+                pair = (name, other_name)
+                self.assertEqual(transaction_ids.intersection_cardinality(other_transaction_ids), \
+                    len(ids & other_ids), pair)
+                self.assertEqual(list(transaction_ids.intersection(other_transaction_ids)), sorted(ids & other_ids), \
+                    pair)
+                self.assertEqual(list(transaction_ids.union(other_transaction_ids)), sorted(ids | other_ids), pair)
+                # Equal sets are equal however they were built
+                self.assertEqual(transaction_ids.intersection(other_transaction_ids), TransactionIdSet(ids & other_ids), \
+                    pair)
+                self.assertEqual(transaction_ids.union(other_transaction_ids), TransactionIdSet(ids | other_ids), pair)
+
+    def test_truncate_and_contains(self):
+        for name, ids in ID_SETS.items():
+            transaction_ids = TransactionIdSet(ids)
+            for num_transactions in [0, 1, 100, 121, 180, 1000]:
+                self.assertEqual(list(transaction_ids.truncate(num_transactions)), \
+                    sorted(transaction_id for transaction_id in ids if transaction_id < num_transactions), name)
+            for transaction_id in range(0, 600, 7):
+                self.assertEqual(transaction_id in transaction_ids, transaction_id in ids, name)
+
+if __name__ == "__main__":
+    unittest.main()
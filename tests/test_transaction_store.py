@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "utils"))
+
+from ingest_pipeline import StreamingIngestPipeline
+from transactions_manager import TransactionsManager
+from transaction_store import TRANSACTION_STORE_FILENAME
+
+# (authors, title) of every paper, normalized like the data set builders do (see data_set_format.py)
+PAPERS = [
+    (["ada lovelace", "alan turing"], "on comput number"),
+    (["alan turing"], "comput machineri and intellig"),
+    (["grace hopper", "ada lovelace", "edsger dijkstra"], "compil for comput comput"),
+    (["edsger dijkstra"], "goto statement consid harm"),
+    (["barbara liskov", "grace hopper"], "data abstract and hierarch, type"),
+    (["alan turing", "barbara liskov"], "intellig machineri"),
+    (["edsger dijkstra", "ada lovelace"], "on the cruelti of realli teach comput scienc")
+]
+
+class TransactionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.__cwd = os.getcwd()
+        self.__temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.__temp_dir, "data"))
+        os.chdir(self.__temp_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            StreamingIngestPipeline().ingest(iter(PAPERS))
+
+    def tearDown(self):
+        os.chdir(self.__cwd)
+        shutil.rmtree(self.__temp_dir)
+
+    def test_store_matches_data_csv(self):
+        for maximum_line_count in [None, 0, 3, len(PAPERS), len(PAPERS) + 5]:
+            csv_transactions = TransactionsManager("data/data.csv", "data/author_id_mappings.txt", \
+                "data/title_term_id_mappings.txt", maximum_line_count)
+            store_transactions = TransactionsManager(TRANSACTION_STORE_FILENAME, "data/author_id_mappings.txt", \
+                "data/title_term_id_mappings.txt", maximum_line_count)
+
+            num_papers = len(PAPERS) if maximum_line_count is None else min(maximum_line_count, len(PAPERS))
+            self.assertEqual(csv_transactions.get_number_of_transactions(), num_papers)
+            self.assertEqual(store_transactions.get_number_of_transactions(), num_papers)
+            for paper_id in range(num_papers):
+                self.assertEqual(store_transactions.get_paper_authors(paper_id), \
+                    csv_transactions.get_paper_authors(paper_id))
+                self.assertEqual(store_transactions.get_paper_title_terms(paper_id), \
+                    csv_transactions.get_paper_title_terms(paper_id))
+            self.assertEqual(store_transactions._TransactionsManager__partitions, \
+                csv_transactions._TransactionsManager__partitions)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+import html.entities
+import xml.etree.ElementTree as ElementTree
+from functools import lru_cache
+from nltk.stem.porter import PorterStemmer
+
+from data_set_format import SHARD_MANIFEST_FILENAME, normalize_author, normalize_title, write_papers_to_csv_file
+import instrumentation
+
+'''
+Builds data.csv (and optionally its conference shards) from a local dblp.xml or dblp.xml.gz dump
+(https://dblp.org/xml/), instead of scraping dblp.org one event at a time (see build_data_from_web.py).
+
+The dump is streamed with an incremental parser and every record is cleared as soon as it's parsed, so memory
+stays constant whatever the size of the dump. Conference papers are the <inproceedings> records whose key is
+conf/<conference abbreviation>/..., with the same abbreviations as build_data_from_web.py, and are written with the
+same normalization (see data_set_format.py). The dump's DTD isn't needed: dblp only uses HTML named entities, which
+are resolved directly.
+
+Papers are grouped by conference (in the order of the conference list, like build_data_from_web.py) and, within a
+conference, listed in dump order. Unlike the web builder, every event of every conference is ingested. Shards are
+listed in a manifest with the same format as the web builder's, except that events are identified by their dblp
+key rather than their url:
+    {"shards": [{"conference": "kdd", "filename": "kdd.csv", "num_papers": int,
+                 "events": [{"key": "conf/kdd/2020", "num_papers": int}, ...]}, ...]}
+
+Usage:
+    py utils/build_data_from_dblp_dump.py DUMP_FILE [conference1,conference2,...]
+'''
+
+class DblpDumpDataSetBuilder:
+    '''
+    Builds a CSV file where each line is a list of comma separated authors and a single title, from a dblp dump
+    '''
+    # Every type of record directly under <dblp>
+    RECORD_TAGS = {"article", "inproceedings", "proceedings", "book", "incollection", "phdthesis", "mastersthesis", \
+        "www", "person", "data"}
+
+    def __init__(self, data_set_name, dump_file_name, conference_abbrevs, shards_dir=None):
+        '''
+        @param data_set_name: string            name of data set file to write to
+        @param dump_file_name: string           dblp.xml or dblp.xml.gz dump to read papers from
+        @param conference_abbrevs: list(string) conferences to keep papers of (ex: kdd for conf/kdd/... keys)
+        @param shards_dir: string (optional)    directory to write one shard per conference and the shard manifest to
+        '''
+        self.__data_set_name = data_set_name
+        self.__dump_file_name = dump_file_name
+        self.__conference_abbrevs = conference_abbrevs
+        self.__shards_dir = shards_dir
+        # The vocabulary is much smaller than the number of title words, so every word is only stemmed once
+        self.__stem = lru_cache(maxsize=None)(PorterStemmer().stem)
+
+    @instrumentation.instrumented_stage("data_set.build_from_dblp_dump")
+    def build_data_set(self):
+        '''
+        Driver function that streams the dump once, writing the papers of every conference to its shard (or to
+        a temporary file per conference), then writes the manifest and data.csv as the concatenation of the shards
+        '''
+        if self.__shards_dir:
+            os.makedirs(self.__shards_dir, exist_ok=True)
+            shards_dir = self.__shards_dir
+        else:
+            temp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.__data_set_name)))
+            shards_dir = temp_dir
+
+        shards = {}
+        shard_files = {}
+        for conference_name in self.__conference_abbrevs:
+            shards[conference_name] = {"conference": conference_name, "filename": "%s.csv" % conference_name, \
+                "num_papers": 0, "events": []}
+            shard_files[conference_name] = open(os.path.join(shards_dir, shards[conference_name]["filename"]), "w")
+
+        event_inds = {}
+        for conference_name, event_key, paper in self.__parse_papers():
+            shard = shards[conference_name]
+            write_papers_to_csv_file(shard_files[conference_name], [paper])
+            shard["num_papers"] += 1
+            if event_key not in event_inds:
+                event_inds[event_key] = len(shard["events"])
+                shard["events"].append({"key": event_key, "num_papers": 0})
+            shard["events"][event_inds[event_key]]["num_papers"] += 1
+
+        for shard_file in shard_files.values():
+            shard_file.close()
+
+        if self.__shards_dir:
+            manifest_file = open(os.path.join(shards_dir, SHARD_MANIFEST_FILENAME), "w")
+            json.dump({"shards": [shards[conference_name] for conference_name in self.__conference_abbrevs]}, \
+                manifest_file, indent=4)
+            manifest_file.close()
+
+        data_file = open(self.__data_set_name, "w")
+        for conference_name in self.__conference_abbrevs:
+            print("Conference %s: %d papers" % (conference_name, shards[conference_name]["num_papers"]))
+            shard_file = open(os.path.join(shards_dir, shards[conference_name]["filename"]), "r")
+            shutil.copyfileobj(shard_file, data_file)
+            shard_file.close()
+        data_file.close()
+
+        if not self.__shards_dir:
+            shutil.rmtree(temp_dir)
+
+    def iterate_papers(self):
+        '''
+        Streams the papers of the selected conferences in dump order (build_data_set groups them by conference
+        instead), ex: for StreamingIngestPipeline, which writes data.csv itself
+
+        @return iterator((list(string), string)), (authors, title) of every paper
+        '''
+        for _, _, paper in self.__parse_papers():
+            yield paper
+
+    def __parse_papers(self):
+        '''
+        Streams the conference papers of the dump
+
+        @return iterator((string, string, (list(string), string))), (conference, event key, (authors, title)) of
+            every paper of the selected conferences that has both authors and a title, in dump order
+        '''
+        conference_abbrevs = set(self.__conference_abbrevs)
+        parser = ElementTree.XMLParser()
+        # Named entities are declared in dblp.dtd, which isn't read; they're all HTML entities
+        parser.entity.update(html.entities.entitydefs)
+
+        dump_file = gzip.open(self.__dump_file_name, "rb") if self.__dump_file_name.endswith(".gz") \
+            else open(self.__dump_file_name, "rb")
+        root = None
+        for event, elem in ElementTree.iterparse(dump_file, events=("start", "end"), parser=parser):
+            if root is None:
+                root = elem
+                continue
+            if event != "end" or elem.tag not in DblpDumpDataSetBuilder.RECORD_TAGS:
+                continue
+
+            if elem.tag == "inproceedings":
+                key_parts = elem.get("key", "").split("/")
+                if len(key_parts) == 3 and key_parts[0] == "conf" and key_parts[1] in conference_abbrevs:
+                    authors = [normalize_author(''.join(author.itertext())) for author in elem.iter("author")]
+                    title = elem.find("title")
+                    raw_title = ''.join(title.itertext()) if title is not None else ""
+                    if authors and raw_title.strip():
+                        event_key = elem.findtext("crossref") or "conf/%s" % key_parts[1]
+                        yield key_parts[1], event_key, (authors, normalize_title(raw_title, self.__stem))
+            # Records are only referenced by the root, so this frees every record parsed so far
+            root.clear()
+        dump_file.close()
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+    dump_file_name = sys.argv[1]
+    # Same conferences as build_data_from_web.py
+    conferences = sys.argv[2].split(",") if len(sys.argv) > 2 else \
+        ['aciids', 'icdm', 'sdm', 'dba', 'balt', 'dbsec', 'dbcrowd', 'pkdd' ,'kdd', 'trec', 'cikm', 'sigir']
+
+    data_set_builder = DblpDumpDataSetBuilder('data/data.csv', dump_file_name, conferences, 'data/shards')
+    data_set_builder.build_data_set()
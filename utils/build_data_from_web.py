@@ -1,8 +1,11 @@
 import os
+import json
 from bs4 import BeautifulSoup
 import urllib.request
 from nltk.stem.porter import *
 
+from data_set_format import SHARD_MANIFEST_FILENAME, normalize_author, normalize_title, write_papers_to_csv_file
+
 '''
 Background:
 First type of URL: contains citations for all papers per year for a specific conference.
@@ -11,6 +14,20 @@ First type of URL: contains citations for all papers per year for a specific con
 Second type of URL: scraped via following the "contents" hyperlink in the first type of URL.
 Contains citations for all papers for a specific year for a specific conference.
     URL formatting: https://dblp.org/db/conf/<conf-abbrev>/<conf-abbrev><date>.html
+
+Shards (optional): papers of every conference are also written to their own shard file (same format as data.csv),
+listed in a manifest together with the papers of every event:
+    {
+        "shards": [
+            {"conference": "kdd", "filename": "kdd.csv", "num_papers": int,
+             "events": [{"url": string, "num_papers": int}, ...]},
+            ...
+        ]
+    }
+Shards are listed in the order of the conferences, which is also the order of data.csv, so reading the manifest
+(see TransactionsManager) gives the same transaction ids as reading data.csv. Conferences already in the manifest
+aren't downloaded again, so adding or dropping a conference only rebuilds its own shard (and data.csv, which is
+concatenated from the shards).
 '''
 
 class DataSetBuilder:
@@ -18,19 +35,22 @@ class DataSetBuilder:
     Builds a CSV file where each line is a list of comma separated authors and a single title.
     In other words, each line corresponds to a single paper. Note that this file is partitioned
     based on which conferences these papers were from but the conferences aren't explicitly stated
-    in the file.
+    in the file (they are in the shard manifest, if shards are built).
     '''
+    SHARD_MANIFEST_FILENAME = SHARD_MANIFEST_FILENAME
 
-    def __init__(self, data_set_name, conference_abbrevs, num_events_per_conference):
+    def __init__(self, data_set_name, conference_abbrevs, num_events_per_conference, shards_dir=None):
         '''
         @param data_set_name: string            name of data set file to write to
         @param conference_abbrevs: list(string) conferences to parse papers from
         @param num_events_per_conference: int   # of events to parse per conference because each 
             conference is composed of multiple events (>= 1 per year)
+        @param shards_dir: string (optional)    directory to write one shard per conference and the shard manifest to
         '''
         self.__num_events_per_conference = num_events_per_conference
         self.__conference_abbrevs = conference_abbrevs
         self.__data_set_name = data_set_name
+        self.__shards_dir = shards_dir
         self.__stemmer = PorterStemmer()
 
     def build_data_set(self):
@@ -38,19 +58,78 @@ class DataSetBuilder:
         Driver function that builds csv-separated data file. Writes all relevant paper meta-info
         per event per conference.
         '''
+        if self.__shards_dir:
+            self.__build_sharded_data_set()
+            return
+
         data_file = open(self.__data_set_name, "w")
+        write_papers_to_csv_file(data_file, self.iterate_papers())
+        data_file.close()
+
+    def iterate_papers(self):
+        '''
+        Streams the papers of every event of every conference, one event page at a time, in data.csv order (ex:
+        for StreamingIngestPipeline, which writes data.csv itself)
+
+        @return iterator((list(string), string)), (authors, title) of every paper
+        '''
+        for conference_name in self.__conference_abbrevs:
+            print("Parsing data for conference %s" % conference_name)
+
+            events = self.__parse_conference_events(conference_name)
+            content_urls = self.__parse_content_urls(events)
+
+            for ind, content_url in enumerate(content_urls):
+                print("Parsing papers for event %d" % ind)
+                yield from self.__parse_title_author_data(content_url)
 
+    def __build_sharded_data_set(self):
+        '''
+        Writes one shard per conference (reusing the shards of conferences already in the manifest), the manifest,
+        and data.csv as the concatenation of the shards
+        '''
+        os.makedirs(self.__shards_dir, exist_ok=True)
+        manifest_filename = os.path.join(self.__shards_dir, DataSetBuilder.SHARD_MANIFEST_FILENAME)
+        existing_shards = {}
+        if os.path.exists(manifest_filename):
+            manifest_file = open(manifest_filename, "r")
+            existing_shards = {shard["conference"]: shard for shard in json.load(manifest_file)["shards"]}
+            manifest_file.close()
+
+        shards = []
         for conference_name in self.__conference_abbrevs:
+            shard = existing_shards.get(conference_name)
+            if shard and os.path.exists(os.path.join(self.__shards_dir, shard["filename"])):
+                print("Reusing shard for conference %s" % conference_name)
+                shards.append(shard)
+                continue
+
             print("Parsing data for conference %s" % conference_name)
+            shard = {"conference": conference_name, "filename": "%s.csv" % conference_name, "num_papers": 0, "events": []}
+            shard_file = open(os.path.join(self.__shards_dir, shard["filename"]), "w")
 
             events = self.__parse_conference_events(conference_name)
             content_urls = self.__parse_content_urls(events)
-            
+
             for ind, content_url in enumerate(content_urls):
                 print("Parsing papers for event %d" % ind)
                 author_title_info = self.__parse_title_author_data(content_url)
-                self.__write_data_to_csv_file(data_file, author_title_info)
+                write_papers_to_csv_file(shard_file, author_title_info)
+                shard["events"].append({"url": content_url, "num_papers": len(author_title_info)})
+                shard["num_papers"] += len(author_title_info)
+            shard_file.close()
+            shards.append(shard)
 
+        manifest_file = open(manifest_filename, "w")
+        json.dump({"shards": shards}, manifest_file, indent=4)
+        manifest_file.close()
+
+        data_file = open(self.__data_set_name, "w")
+        for shard in shards:
+            shard_file = open(os.path.join(self.__shards_dir, shard["filename"]), "r")
+            for line in shard_file:
+                data_file.write(line)
+            shard_file.close()
         data_file.close()
 
     def __parse_conference_events(self, conference_name):
@@ -101,37 +180,16 @@ class DataSetBuilder:
             author_spans = citation.find_all('span', {'itemprop': 'author'})
             authors = []
             for author_span in author_spans:
-                authors.append(author_span.find('span', {'itemprop': 'name'})['title'].lower())
+                authors.append(normalize_author(author_span.find('span', {'itemprop': 'name'})['title']))
 
             raw_title = citation.find('span', {'class': 'title'}).string
             if not authors or not raw_title:
                 continue
-            title_no_spaces_commas = raw_title.replace(",", " ").replace(".", "").lower()
-            stemmed_title = ' '.join([self.__stemmer.stem(word) for word in title_no_spaces_commas.split()])
-            author_title_info.append( (authors, stemmed_title) )
+            author_title_info.append( (authors, normalize_title(raw_title, self.__stemmer.stem)) )
         # Skip zeroth author/title tuple because it corresponds to the title of the EVENT 
         # and the hosts of the event, rather than a specific paper
         return author_title_info[1:]
 
-    def __write_data_to_csv_file(self, data_file, author_title_data):
-        '''
-        Writes author title data to a csv file, where each line corresponds to a paper.
-        Replaces all commas from titles and all spaces from names to simplify parsing this file
-
-        Format:
-            author1, author2, author3, ... etc, Title
-
-        @param data_file: Fle object        File object to csv file we should write to
-        @param author_title_data: list((list(string), string)   List of paper metadata, where 
-            tup[0] is a list of authors of the paper and tup[1] is the paper's title. 
-            @see __parse_title_author_data for more info
-        '''
-        for authors, title in author_title_data:
-            # Replaces all commas, spaces in order to simplify parsing this file into intermediate files for SMPF
-            title = title.replace(",", "<comma>")
-            authors_no_spaces = [author.replace(" ", "_") for author in authors]
-            data_file.write("%s,%s\n" % (','.join(authors_no_spaces), title))
-
     def __parse_citations(self, data):
         '''
         Parses citations from raw HTML data object
@@ -152,5 +210,5 @@ if __name__ == "__main__":
     conferences = ['aciids', 'icdm', 'sdm', 'dba', 'balt', 'dbsec', 'dbcrowd', 'pkdd' ,'kdd', 'trec', 'cikm', 'sigir']
     events_per_conference = 10
 
-    data_set_builder = DataSetBuilder(output_file, conferences, events_per_conference)    
+    data_set_builder = DataSetBuilder(output_file, conferences, events_per_conference, 'data/shards')
     data_set_builder.build_data_set()
\ No newline at end of file
@@ -0,0 +1,294 @@
+import os
+import sys
+import math
+import random
+import struct
+from array import array
+
+from transactions_manager import TransactionsManager
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
+from cosine_similarity import normalize_vector, compute_normalized_cosine_similarity
+import instrumentation
+
+'''
+Fixed, low dimensional embeddings of context vectors (MI context vectors of patterns and context models of papers),
+so that ranking by cosine similarity costs dim rather than num_patterns operations per comparison and the vectors
+take num_vectors * dim floats.
+
+Embeddings are computed with one of:
+    PROJECTION  sparse random projection: every input dimension (context pattern) is added, with a random sign, to
+                nonzeros_per_column random output dimensions, which preserves cosines in expectation
+                (Johnson-Lindenstrauss). The projection is regenerated from its seed rather than stored
+    SELECTION   keeps the dim context patterns whose MI varies most across patterns (the most informative ones)
+Embeddings are computed one vector at a time (ex: one row of a dense MI file), so the context vectors never have to
+be held in memory at once, and stored normalized (see normalize_vector).
+
+On-disk format (little endian):
+    b"CTXE" method input_dim num_vectors dim nonzeros_per_column seed (uint32 x 5, int64)
+    SELECTION only: dim uint32 selected input dimensions
+    num_vectors * dim float32 normalized embeddings (row major, one row per vector)
+
+Pattern and paper embeddings of the same pattern type are written to separate files with the same projection, so
+that a pattern's embedding can be compared to the papers' (see RepresentativeTransactionExtractor).
+
+Usage (builds and persists the author and title pattern and paper embeddings and reports their top k agreement with
+the exact context vectors, for similar patterns and representative transactions):
+    py utils/context_embeddings.py [dim] [k] [projection|selection] [maximum_line_count]
+'''
+
+class ContextEmbeddings:
+    MAGIC = b"CTXE"
+    HEADER_FORMAT = "<4sIIIIIq"
+
+    PROJECTION = 0
+    SELECTION = 1
+
+    DEFAULT_DIM = 64
+    DEFAULT_NONZEROS_PER_COLUMN = 4
+
+    PATTERN_EMBEDDINGS_FILENAMES = {
+        MutualInformationManager.PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_context_embeddings.bin"),
+        MutualInformationManager.PatternType.TITLE_TITLE: os.path.join("data", "title_context_embeddings.bin")
+    }
+    PAPER_EMBEDDINGS_FILENAMES = {
+        MutualInformationManager.PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_paper_context_embeddings.bin"),
+        MutualInformationManager.PatternType.TITLE_TITLE: os.path.join("data", "title_paper_context_embeddings.bin")
+    }
+
+    def __init__(self, input_dim, dim=DEFAULT_DIM, method=PROJECTION, seed=0, \
+        nonzeros_per_column=DEFAULT_NONZEROS_PER_COLUMN, selected_columns=None):
+        '''
+        @param
+            input_dim: int                      Dimension of the context vectors (number of context patterns)
+            dim: int                            Dimension of the embeddings
+            method: int                         PROJECTION or SELECTION
+            seed: int                           PROJECTION only, seed the projection is generated from
+            nonzeros_per_column: int            PROJECTION only, number of output dimensions per input dimension
+            selected_columns: list(int)         SELECTION only, the dim input dimensions that are kept (see
+                select_informative_columns)
+        '''
+        assert method == ContextEmbeddings.PROJECTION or method == ContextEmbeddings.SELECTION
+        if method == ContextEmbeddings.SELECTION:
+            assert selected_columns is not None and len(selected_columns) == dim
+        self.__input_dim = input_dim
+        self.__dim = dim
+        self.__method = method
+        self.__seed = seed
+        self.__nonzeros_per_column = min(nonzeros_per_column, dim)
+        self.__selected_columns = selected_columns
+
+        # PROJECTION: (output dimension, weight) pairs of every input dimension, generated on first use
+        self.__projection = None
+        # Normalized embeddings: embeddings[vector_id * dim : (vector_id + 1) * dim]
+        self.__embeddings = array('f')
+
+    def get_dim(self):
+        return self.__dim
+
+    def get_number_of_vectors(self):
+        return len(self.__embeddings) // self.__dim
+
+    def copy_projection(self):
+        '''
+        @return ContextEmbeddings, with the same projection (or selection) and no embeddings, ex: to embed papers
+            in the same space as patterns
+        '''
+        return ContextEmbeddings(self.__input_dim, self.__dim, self.__method, self.__seed, \
+            self.__nonzeros_per_column, self.__selected_columns)
+
+    def embed(self, context_vector):
+        '''
+        @param context_vector: list(float)      Context vector of dimension input_dim
+        @return list(float), its normalized embedding
+        '''
+        assert len(context_vector) == self.__input_dim
+        if self.__method == ContextEmbeddings.SELECTION:
+            return normalize_vector([context_vector[column] for column in self.__selected_columns])
+
+        if self.__projection is None:
+            self.__projection = self.__generate_projection()
+        embedding = [0.0] * self.__dim
+        for column, val in enumerate(context_vector):
+            # Context vectors are mostly zeros (most patterns don't co-occur)
+            if val:
+                for output_dim, weight in self.__projection[column]:
+                    embedding[output_dim] += weight * val
+        return normalize_vector(embedding)
+
+    def build(self, context_vectors):
+        '''
+        Embeds every vector, replacing the current embeddings
+
+        @param context_vectors: Iterable(list(float))   Context vectors, indexed by id. Only one is used at a time,
+            so they can be generated on the fly (ex: one MI row at a time)
+        '''
+        with instrumentation.stage("context_embeddings.build"):
+            self.__embeddings = array('f')
+            for context_vector in context_vectors:
+                self.__embeddings.extend(self.embed(context_vector))
+
+    def get_embedding(self, vector_id):
+        '''
+        @return array(float), the normalized embedding of a vector
+        '''
+        return self.__embeddings[vector_id * self.__dim : (vector_id + 1) * self.__dim]
+
+    def get_embeddings(self):
+        '''
+        @return list(array(float)), the normalized embedding of every vector, indexed by id
+        '''
+        return [self.get_embedding(vector_id) for vector_id in range(self.get_number_of_vectors())]
+
+    def write_to_file(self, embeddings_filename):
+        embeddings_file = open(embeddings_filename, "wb")
+        embeddings_file.write(struct.pack(ContextEmbeddings.HEADER_FORMAT, ContextEmbeddings.MAGIC, self.__method, \
+            self.__input_dim, self.get_number_of_vectors(), self.__dim, self.__nonzeros_per_column, self.__seed))
+        arrays = [array('f', self.__embeddings)]
+        if self.__method == ContextEmbeddings.SELECTION:
+            arrays.insert(0, array('I', self.__selected_columns))
+        for values in arrays:
+            if sys.byteorder != "little":
+                values.byteswap()
+            values.tofile(embeddings_file)
+        embeddings_file.close()
+
+    @staticmethod
+    def read_from_file(embeddings_filename):
+        '''
+        @param embeddings_filename: string      File written by write_to_file
+        @return ContextEmbeddings, with its embeddings
+        '''
+        embeddings_file = open(embeddings_filename, "rb")
+        magic, method, input_dim, num_vectors, dim, nonzeros_per_column, seed = struct.unpack( \
+            ContextEmbeddings.HEADER_FORMAT, embeddings_file.read(struct.calcsize(ContextEmbeddings.HEADER_FORMAT)))
+        assert magic == ContextEmbeddings.MAGIC
+
+        selected_columns = None
+        if method == ContextEmbeddings.SELECTION:
+            selected_columns = array('I')
+            selected_columns.fromfile(embeddings_file, dim)
+            if sys.byteorder != "little":
+                selected_columns.byteswap()
+            selected_columns = selected_columns.tolist()
+
+        embeddings = ContextEmbeddings(input_dim, dim, method, seed, nonzeros_per_column, selected_columns)
+        embeddings.__embeddings.fromfile(embeddings_file, num_vectors * dim)
+        if sys.byteorder != "little":
+            embeddings.__embeddings.byteswap()
+        embeddings_file.close()
+        return embeddings
+
+    @staticmethod
+    def select_informative_columns(context_vectors, input_dim, dim):
+        '''
+        Finds the input dimensions whose values vary most across context vectors, in one pass over the vectors
+
+        @param
+            context_vectors: Iterable(list(float))  Context vectors (only one is used at a time)
+            input_dim: int                          Dimension of the context vectors
+            dim: int                                Number of input dimensions to select
+        @return list(int), the dim input dimensions with the highest variance, in increasing order
+        '''
+        sums = [0.0] * input_dim
+        squared_sums = [0.0] * input_dim
+        num_vectors = 0
+        for context_vector in context_vectors:
+            for column, val in enumerate(context_vector):
+                if val:
+                    sums[column] += val
+                    squared_sums[column] += val * val
+            num_vectors += 1
+        num_vectors = max(num_vectors, 1)
+        variances = [squared_sums[column] / num_vectors - (sums[column] / num_vectors) ** 2 \
+            for column in range(input_dim)]
+        return sorted(sorted(range(input_dim), key=lambda column: (-variances[column], column))[ : dim])
+
+    def __generate_projection(self):
+        rand = random.Random(self.__seed)
+        weight = 1 / math.sqrt(self.__nonzeros_per_column)
+        return [[(output_dim, weight if rand.random() < 0.5 else -weight) \
+            for output_dim in rand.sample(range(self.__dim), self.__nonzeros_per_column)] \
+                for _ in range(self.__input_dim)]
+
+def find_top_k(normalized_query, normalized_vectors, k):
+    '''
+    @return list(int), ids of the k vectors most similar to the query, sorted in decreasing similarity
+    '''
+    similarities = [(compute_normalized_cosine_similarity(normalized_query, vector), -ind) \
+        for ind, vector in enumerate(normalized_vectors)]
+    similarities.sort(reverse=True)
+    return [-negated_id for _, negated_id in similarities[ : k]]
+
+def compute_agreement(exact_queries, exact_vectors, embedded_queries, embedded_vectors, k):
+    '''
+    Computes the average top k agreement (fraction of the exact top k found) of the embeddings
+
+    @param
+        exact_queries: list(list(float))        Normalized exact query vectors
+        exact_vectors: list(list(float))        Normalized exact vectors queries are ranked against
+        embedded_queries: list(list(float))     Embeddings of the queries
+        embedded_vectors: list(list(float))     Embeddings of the vectors
+        k: int                                  Number of results per query
+    @return float, average fraction of the exact top k that's in the top k of the embeddings
+    '''
+    total_agreement = 0
+    for exact_query, embedded_query in zip(exact_queries, embedded_queries):
+        exact_top_k = find_top_k(exact_query, exact_vectors, k)
+        embedded_top_k = set(find_top_k(embedded_query, embedded_vectors, k))
+        total_agreement += len(embedded_top_k.intersection(exact_top_k)) / len(exact_top_k)
+    return total_agreement / max(len(exact_queries), 1)
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+    dim = int(sys.argv[1]) if len(sys.argv) > 1 else ContextEmbeddings.DEFAULT_DIM
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    method = ContextEmbeddings.SELECTION if len(sys.argv) > 3 and sys.argv[3] == "selection" \
+        else ContextEmbeddings.PROJECTION
+    # Paper context models cost a support scan per (paper, pattern), like in representative_transaction_extractor.py
+    maximum_line_count = int(sys.argv[4]) if len(sys.argv) > 4 else 100
+
+    transactions = TransactionsManager("data/data.csv", "data/author_id_mappings.txt", \
+        "data/title_term_id_mappings.txt", maximum_line_count)
+
+    for pattern_type, patterns in [
+        (MutualInformationManager.PatternType.AUTHOR_AUTHOR, parse_author_file_into_patterns("data/frequent_author_patterns.txt")),
+        (MutualInformationManager.PatternType.TITLE_TITLE, parse_sequential_title_file_into_patterns("data/minimal_title_term_patterns.txt"))]:
+
+        mutual_info = MutualInformationManager(pattern_type)
+        mutual_info.read_mutual_information_from_file()
+        num_patterns = len(patterns)
+
+        def get_context_vectors():
+            return (mutual_info.get_mutual_information_vector(ind, num_patterns) for ind in range(num_patterns))
+
+        if num_patterns <= dim:
+            # Nothing to reduce, every context pattern is kept
+            pattern_embeddings = ContextEmbeddings(num_patterns, num_patterns, ContextEmbeddings.SELECTION, \
+                selected_columns=list(range(num_patterns)))
+        elif method == ContextEmbeddings.SELECTION:
+            pattern_embeddings = ContextEmbeddings(num_patterns, dim, method, \
+                selected_columns=ContextEmbeddings.select_informative_columns(get_context_vectors(), num_patterns, dim))
+        else:
+            pattern_embeddings = ContextEmbeddings(num_patterns, dim, method)
+        pattern_embeddings.build(get_context_vectors())
+        pattern_embeddings.write_to_file(ContextEmbeddings.PATTERN_EMBEDDINGS_FILENAMES[pattern_type])
+
+        if pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR:
+            paper_context_models = transactions.compute_author_context_models(patterns)
+        else:
+            paper_context_models = transactions.compute_title_context_models(patterns)
+        paper_embeddings = pattern_embeddings.copy_projection()
+        paper_embeddings.build(paper_context_models)
+        paper_embeddings.write_to_file(ContextEmbeddings.PAPER_EMBEDDINGS_FILENAMES[pattern_type])
+
+        normalized_context_vectors = [normalize_vector(context_vector) for context_vector in get_context_vectors()]
+        similar_agreement = compute_agreement(normalized_context_vectors, normalized_context_vectors, \
+            pattern_embeddings.get_embeddings(), pattern_embeddings.get_embeddings(), k)
+        representative_agreement = compute_agreement(normalized_context_vectors, \
+            [normalize_vector(context_model) for context_model in paper_context_models], \
+            pattern_embeddings.get_embeddings(), paper_embeddings.get_embeddings(), k)
+        print("%s: %d patterns, %d papers, %d -> %d dimensions, top %d agreement: similar patterns %f, " \
+            "representative transactions %f" % (ContextEmbeddings.PATTERN_EMBEDDINGS_FILENAMES[pattern_type], \
+                num_patterns, len(paper_context_models), num_patterns, pattern_embeddings.get_dim(), k, \
+                similar_agreement, representative_agreement))
@@ -1,5 +1,8 @@
+import instrumentation
+
 def compute_cosine_similarity(context_vec_1, context_vec_2):
     assert len(context_vec_1) == len(context_vec_2)
+    instrumentation.increment("cosine_computations")
     dot_product = 0
 
     for ind in range(len(context_vec_1)):
@@ -11,4 +14,26 @@ def compute_cosine_similarity(context_vec_1, context_vec_2):
             dist += el ** 2
         return dist ** 0.5
     
-    return dot_product / compute_distance(context_vec_1) / compute_distance(context_vec_2)
\ No newline at end of file
+    return dot_product / compute_distance(context_vec_1) / compute_distance(context_vec_2)
+
+def normalize_vector(context_vec):
+    '''
+    Scales a context vector to unit length so that the cosine similarity of two normalized vectors is
+    just their dot product (see compute_normalized_cosine_similarity). Lets callers that compare the
+    same vectors many times compute each norm once.
+
+    @param context_vec: list(float)     Context vector to normalize
+    @return list(float), unit length copy of context_vec (or an all zero vector if context_vec is all zero)
+    '''
+    norm = sum(el ** 2 for el in context_vec) ** 0.5
+    if norm == 0:
+        return [0.0] * len(context_vec)
+    return [el / norm for el in context_vec]
+
+def compute_normalized_cosine_similarity(normalized_vec_1, normalized_vec_2):
+    '''
+    Computes the cosine similarity of two vectors that were normalized with normalize_vector
+    '''
+    assert len(normalized_vec_1) == len(normalized_vec_2)
+    instrumentation.increment("cosine_computations")
+    return sum(el_1 * el_2 for el_1, el_2 in zip(normalized_vec_1, normalized_vec_2))
@@ -0,0 +1,65 @@
+'''
+Format of data.csv (and of its conference shards), shared by every data set builder (build_data_from_web.py scrapes
+dblp.org, build_data_from_dblp_dump.py streams a local dblp.xml dump) so that they write identical lines for the
+same papers.
+
+Format (one paper per line):
+    author1,author2,author3,...,stemmed title
+Author names are lowercased and their spaces replaced with underscores. Titles are lowercased, their commas
+replaced with spaces, their periods removed and every word Porter stemmed.
+'''
+
+SHARD_MANIFEST_FILENAME = "manifest.json"
+
+def normalize_author(raw_author):
+    '''
+    @param raw_author: string       Author name as listed by dblp
+    @return string, the author name written to data.csv (before spaces are replaced, see write_papers_to_csv_file)
+    '''
+    return raw_author.lower()
+
+def normalize_title(raw_title, stem):
+    '''
+    @param raw_title: string                Title as listed by dblp
+    @param stem: function(string)           Stems a word (ex: PorterStemmer().stem)
+    @return string, the lowercased, comma/period stripped and stemmed title
+    '''
+    title_no_spaces_commas = raw_title.replace(",", " ").replace(".", "").lower()
+    return ' '.join([stem(word) for word in title_no_spaces_commas.split()])
+
+def write_papers_to_csv_file(data_file, author_title_data):
+    '''
+    Writes author title data to a csv file, where each line corresponds to a paper.
+    Replaces all commas from titles and all spaces from names to simplify parsing this file
+
+    Format:
+        author1, author2, author3, ... etc, Title
+
+    @param data_file: Fle object        File object to csv file we should write to
+    @param author_title_data: list((list(string), string)   List of paper metadata, where
+        tup[0] is a list of authors of the paper and tup[1] is the paper's title
+    '''
+    for authors, title in author_title_data:
+        data_file.write(format_paper_line(authors, title))
+
+def format_paper_line(authors, title):
+    '''
+    @param authors: list(string)    Authors of the paper
+    @param title: string            Title of the paper
+    @return string, the paper's line of data.csv (with its newline)
+    '''
+    # Replaces all commas, spaces in order to simplify parsing this file into intermediate files for SMPF
+    title = title.replace(",", "<comma>")
+    authors_no_spaces = [author.replace(" ", "_") for author in authors]
+    return "%s,%s\n" % (','.join(authors_no_spaces), title)
+
+def parse_paper_line(line):
+    '''
+    Splits a line of data.csv the same way as FrequentPatternBuilder and TransactionsManager
+
+    @param line: string     Line of data.csv
+    @return (list(string), list(string)), the authors and the title terms of the paper
+    '''
+    # Note: Titles are guaranteed to not have commas
+    line_as_lst = line.split(',')
+    return line_as_lst[ : -1], line_as_lst[-1].split()
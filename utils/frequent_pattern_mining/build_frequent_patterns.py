@@ -1,5 +1,12 @@
 from spmf_python_wrapper import run_spmf
 import os
+import sys
+import json
+import math
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import instrumentation
+from parse_patterns import parse_pattern_file_into_records, write_pattern_records_to_file
 
 class FrequentPatternBuilder():
     '''
@@ -16,6 +23,10 @@ class FrequentPatternBuilder():
         data/frequent_title_term_patterns.txt   Frequent title term patterns (via clospan)
         data/author_id_mappings.txt             Mapping from author ID to author name 
         data/title_term_id_mappings.txt         Mapping from title term ID to title term 
+        data/frequent_patterns_state.json       Number of papers the pattern files were mined from
+
+    Papers appended to data.csv afterwards (ex: a newly scraped conference, see DataSetBuilder's shards) can be
+    folded in with update_frequent_pattern_files, which keeps every word id and pattern id stable.
     '''
     CSV_FILE_PATH = "data/data.csv"
 
@@ -28,38 +39,295 @@ class FrequentPatternBuilder():
     AUTHOR_ID_FILE_PATH = "data/author_id_mappings.txt"
     TITLE_TERM_ID_FILE_PATH = "data/title_term_id_mappings.txt"
 
-    def __init__(self, fp_close_thresh=0.08, clospan_thresh=0.3, display_transaction_nums=False):
+    STATE_FILE_PATH = "data/frequent_patterns_state.json"
+    # SPMF output of update_frequent_pattern_files and sweep_frequent_pattern_files, before it's merged into (or
+    # filtered into) the pattern files
+    AUTHORS_REMINED_OUTPUT_FILE_PATH = "data/remined_author_patterns_temp.txt"
+    TITLE_TERMS_REMINED_OUTPUT_FILE_PATH = "data/remined_title_term_patterns_temp.txt"
+
+    def __init__(self, fp_close_thresh=0.08, clospan_thresh=0.3, display_transaction_nums=True):
         '''
         @param fp_close_thresh          Min relative (percentage) support for FPClose
         @param clospan_thresh           Min relative (percentage) support for CloSpan
         @param display_transaction_nums True if output file should display the transaction ids the elements
-            in the frequent patterns were from, False otherwise (useful when debugging only). DON'T SET THIS
-            TO TRUE WHEN GENERATING PATTERN FILES TO PARSE INTO ANNOTATOR
+            in the frequent patterns were from (#TID/#SID, line numbers of data.csv), False otherwise. The MI
+            builders reuse these instead of scanning data.csv for the transactions of every pattern
         '''
         self.__fp_close_thresh = fp_close_thresh
         self.__clospan_thresh = clospan_thresh
         self.__display_transaction_nums = display_transaction_nums
 
-    def build_frequent_pattern_files(self):
+    @instrumentation.instrumented_stage("frequent_patterns.build")
+    def build_frequent_pattern_files(self, num_papers=None):
         '''
         Driver function that builds intermediate input files from raw authors/title file and builds final
         pattern files.
+
+        @param num_papers: int?     Number of papers if the intermediate input files and the id mapping files were
+            already written along with data.csv (see StreamingIngestPipeline), None to build them from data.csv
+        '''
+        if num_papers is None:
+            author_id_mapping, title_term_id_mapping, num_papers, _ = self.__build_intermediate_smpf_input()
+
+            FrequentPatternBuilder.__write_word_id_mapping(author_id_mapping, FrequentPatternBuilder.AUTHOR_ID_FILE_PATH)
+            FrequentPatternBuilder.__write_word_id_mapping(title_term_id_mapping, FrequentPatternBuilder.TITLE_TERM_ID_FILE_PATH)
+
+        self.__run_spmf(FrequentPatternBuilder.AUTHORS_OUTPUT_FILE_PATH, FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH)
+        FrequentPatternBuilder.__write_state(num_papers)
+
+    @instrumentation.instrumented_stage("frequent_patterns.update")
+    def update_frequent_pattern_files(self, remine=True):
+        '''
+        Incrementally updates the pattern files after papers were appended to data.csv (papers already mined MUST
+        stay in place, at the same lines). Instead of rebuilding everything from scratch:
+        * The id mapping files are only appended to, so every existing author and title term keeps its id
+        * The supports (and transaction ids) of every existing pattern are updated from the new papers only
+        * Existing patterns keep their line, so their pattern ids (and downstream MI rows/columns) stay stable.
+          Patterns that are newly frequent are appended after them
+
+        Closedness and the relative support thresholds are global properties, so patterns that are newly frequent
+        can only be found by mining the whole corpus again (remine). Existing patterns SPMF doesn't output anymore
+        (ex: their relative support dropped below the threshold) are kept, with exact supports, so ids stay stable.
+
+        @param remine: bool     True to run SPMF again to find newly frequent patterns, False to only update the
+            supports of the existing patterns
+        @return (list(int), list(int)), ids of the (author, title term) patterns appended to the pattern files
+        '''
+        state = FrequentPatternBuilder.__read_state()
+        if state is None:
+            print("ERROR: %s doesn't exist, build the pattern files with build_frequent_pattern_files first" % \
+                FrequentPatternBuilder.STATE_FILE_PATH)
+            exit(1)
+        num_mined_papers = state["num_papers"]
+
+        author_id_mapping = FrequentPatternBuilder.__read_word_id_mapping(FrequentPatternBuilder.AUTHOR_ID_FILE_PATH)
+        title_term_id_mapping = FrequentPatternBuilder.__read_word_id_mapping(FrequentPatternBuilder.TITLE_TERM_ID_FILE_PATH)
+        num_authors = len(author_id_mapping)
+        num_title_terms = len(title_term_id_mapping)
+
+        author_id_mapping, title_term_id_mapping, num_papers, new_papers = self.__build_intermediate_smpf_input( \
+            author_id_mapping, title_term_id_mapping, num_mined_papers)
+        if num_papers < num_mined_papers:
+            print("ERROR: data.csv has %d papers, but the pattern files were mined from %d papers" % (num_papers, \
+                num_mined_papers))
+            exit(1)
+
+        FrequentPatternBuilder.__write_word_id_mapping(author_id_mapping, FrequentPatternBuilder.AUTHOR_ID_FILE_PATH, \
+            num_authors)
+        FrequentPatternBuilder.__write_word_id_mapping(title_term_id_mapping, FrequentPatternBuilder.TITLE_TERM_ID_FILE_PATH, \
+            num_title_terms)
+        print("Updating patterns with %d new papers, %d new authors and %d new title terms" % (len(new_papers), \
+            len(author_id_mapping) - num_authors, len(title_term_id_mapping) - num_title_terms))
+
+        author_records = parse_pattern_file_into_records(FrequentPatternBuilder.AUTHORS_OUTPUT_FILE_PATH)
+        title_records = parse_pattern_file_into_records(FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH)
+        FrequentPatternBuilder.__update_supports(author_records, title_records, new_papers)
+
+        new_author_pattern_ids, new_title_pattern_ids = [], []
+        if remine:
+            self.__run_spmf(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH, \
+                FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH)
+            # FPClose may list the items of a pattern in any order, while CloSpan patterns are sequences
+            new_author_pattern_ids = FrequentPatternBuilder.__merge_records(author_records, \
+                parse_pattern_file_into_records(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH), \
+                    lambda items: tuple(sorted(items)))
+            new_title_pattern_ids = FrequentPatternBuilder.__merge_records(title_records, \
+                parse_pattern_file_into_records(FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH), tuple)
+            os.remove(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH)
+            os.remove(FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH)
+
+        write_pattern_records_to_file(FrequentPatternBuilder.AUTHORS_OUTPUT_FILE_PATH, author_records)
+        write_pattern_records_to_file(FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH, title_records)
+        FrequentPatternBuilder.__write_state(num_papers)
+        print("Appended %d author patterns and %d title term patterns" % (len(new_author_pattern_ids), \
+            len(new_title_pattern_ids)))
+        return new_author_pattern_ids, new_title_pattern_ids
+
+    @instrumentation.instrumented_stage("frequent_patterns.sweep")
+    def sweep_frequent_pattern_files(self, fp_close_threshs, clospan_threshs):
         '''
-        author_id_mapping, title_term_id_mapping = self.__build_intermediate_smpf_input()
+        Builds pattern files for several support thresholds while running SPMF only once. Closed patterns stay
+        closed whatever the threshold, so the patterns of every threshold are the patterns mined at the lowest
+        threshold whose support is at least the threshold's (absolute) min support.
+
+        The files of each threshold are written next to the pattern files (see get_sweep_output_file_path) and
+        don't replace them. Pattern counts and projected MI sizes are printed for every pair of thresholds.
 
+        @param fp_close_threshs: list(float)    Min relative (percentage) supports for FPClose
+        @param clospan_threshs: list(float)     Min relative (percentage) supports for CloSpan
+        @return list(dict), one report per (fp_close_thresh, clospan_thresh) pair, see __get_sweep_report
+        '''
+        author_id_mapping, title_term_id_mapping, num_papers, _ = self.__build_intermediate_smpf_input()
         FrequentPatternBuilder.__write_word_id_mapping(author_id_mapping, FrequentPatternBuilder.AUTHOR_ID_FILE_PATH)
         FrequentPatternBuilder.__write_word_id_mapping(title_term_id_mapping, FrequentPatternBuilder.TITLE_TERM_ID_FILE_PATH)
 
+        self.__fp_close_thresh = min(fp_close_threshs)
+        self.__clospan_thresh = min(clospan_threshs)
+        self.__run_spmf(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH, \
+            FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH)
+        author_records = parse_pattern_file_into_records(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH)
+        title_records = parse_pattern_file_into_records(FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH)
+        os.remove(FrequentPatternBuilder.AUTHORS_REMINED_OUTPUT_FILE_PATH)
+        os.remove(FrequentPatternBuilder.TITLE_TERMS_REMINED_OUTPUT_FILE_PATH)
+
+        # Like SPMF, a relative min support of x% means at least ceil(x / 100 * number of transactions) transactions
+        def filter_records(records, thresh):
+            min_support = math.ceil(thresh / 100 * num_papers)
+            return [record for record in records if record.support >= min_support]
+
+        num_author_patterns = {}
+        for thresh in fp_close_threshs:
+            thresh_records = filter_records(author_records, thresh)
+            write_pattern_records_to_file(FrequentPatternBuilder.get_sweep_output_file_path( \
+                FrequentPatternBuilder.AUTHORS_OUTPUT_FILE_PATH, thresh), thresh_records)
+            num_author_patterns[thresh] = len(thresh_records)
+        num_title_patterns = {}
+        for thresh in clospan_threshs:
+            thresh_records = filter_records(title_records, thresh)
+            write_pattern_records_to_file(FrequentPatternBuilder.get_sweep_output_file_path( \
+                FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH, thresh), thresh_records)
+            num_title_patterns[thresh] = len(thresh_records)
+
+        reports = [FrequentPatternBuilder.__get_sweep_report(fp_close_thresh, clospan_thresh, \
+            num_author_patterns[fp_close_thresh], num_title_patterns[clospan_thresh]) \
+                for fp_close_thresh in fp_close_threshs for clospan_thresh in clospan_threshs]
+
+        print("%-10s %-10s %10s %10s %14s %14s" % ("fpclose", "clospan", "authors", "titles", "dense MI", "16 bit MI"))
+        for report in reports:
+            print("%-10s %-10s %10d %10d %14s %14s" % (report["fp_close_thresh"], report["clospan_thresh"], \
+                report["num_author_patterns"], report["num_title_patterns"], \
+                    FrequentPatternBuilder.__format_size(report["dense_mutual_info_bytes"]), \
+                        FrequentPatternBuilder.__format_size(report["quantized_mutual_info_bytes"])))
+        return reports
+
+    @staticmethod
+    def get_sweep_output_file_path(output_file_path, thresh):
+        '''
+        @param output_file_path: string     Pattern file path (ex: AUTHORS_OUTPUT_FILE_PATH)
+        @param thresh: float                Min relative (percentage) support of the patterns
+        @return string, path of the pattern file of the threshold, ex: data/frequent_author_patterns_0.08.txt
+        '''
+        root, ext = os.path.splitext(output_file_path)
+        return "%s_%s%s" % (root, thresh, ext)
+
+    @staticmethod
+    def __get_sweep_report(fp_close_thresh, clospan_thresh, num_author_patterns, num_title_patterns):
+        '''
+        Projects the sizes of the author-author, author-title and title-title MI matrices of the patterns. Title
+        patterns are counted before redundancy removal (see remove_redundant_patterns.py), so title sizes are upper
+        bounds.
+
+        @return dict with the thresholds, the pattern counts, the number of MI values (pairs, a <= b for symmetric
+            matrices), and the bytes of the dense (8 bytes/value) and 16 bit quantized (2 bytes/value + 8
+            bytes/row) MI files
+        '''
+        matrix_shapes = [(num_author_patterns, num_author_patterns), (num_author_patterns, num_title_patterns), \
+            (num_title_patterns, num_title_patterns)]
+        return {
+            "fp_close_thresh": fp_close_thresh,
+            "clospan_thresh": clospan_thresh,
+            "num_author_patterns": num_author_patterns,
+            "num_title_patterns": num_title_patterns,
+            "num_mutual_info_vals": num_author_patterns * (num_author_patterns + 1) // 2 + \
+                num_author_patterns * num_title_patterns + num_title_patterns * (num_title_patterns + 1) // 2,
+            "dense_mutual_info_bytes": sum(8 * num_rows * num_cols for num_rows, num_cols in matrix_shapes),
+            "quantized_mutual_info_bytes": sum(2 * num_rows * num_cols + 8 * num_rows \
+                for num_rows, num_cols in matrix_shapes)
+        }
+
+    @staticmethod
+    def __format_size(num_bytes):
+        for unit in ["B", "KB", "MB", "GB"]:
+            if num_bytes < 1024 or unit == "GB":
+                return "%.1f %s" % (num_bytes, unit)
+            num_bytes /= 1024
+
+    def __run_spmf(self, authors_output_file_path, title_terms_output_file_path):
+        '''
+        Runs FPClose and CloSpan over the intermediate input files
+        '''
         display_transaction_nums_str = str(self.__display_transaction_nums).lower()
 
-        run_spmf("FPClose", FrequentPatternBuilder.AUTHORS_INPUT_FILE_PATH, \
-            FrequentPatternBuilder.AUTHORS_OUTPUT_FILE_PATH, \
+        with instrumentation.stage("frequent_patterns.fpclose"):
+            run_spmf("FPClose", FrequentPatternBuilder.AUTHORS_INPUT_FILE_PATH, authors_output_file_path, \
                 [str(self.__fp_close_thresh) + "%", display_transaction_nums_str])
 
-        run_spmf("CloSpan", FrequentPatternBuilder.TITLE_TERMS_INPUT_FILE_PATH, \
-            FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH, \
-                [str(self.__clospan_thresh) + "%", display_transaction_nums_str])   
-         
+        with instrumentation.stage("frequent_patterns.clospan"):
+            run_spmf("CloSpan", FrequentPatternBuilder.TITLE_TERMS_INPUT_FILE_PATH, title_terms_output_file_path, \
+                [str(self.__clospan_thresh) + "%", display_transaction_nums_str])
+
+    @staticmethod
+    def __update_supports(author_records, title_records, new_papers):
+        '''
+        Adds the new papers containing each pattern to its support (and transaction ids, if the record has them)
+
+        @param
+            author_records: list(PatternRecord)     Author patterns mined from the previous papers
+            title_records: list(PatternRecord)      Title term patterns mined from the previous papers
+            new_papers: list((int, set(int), list(int)))    (id, author ids, title term ids) of every new paper
+        '''
+        # https://stackoverflow.com/questions/24017363/how-to-test-if-one-string-is-a-subsequence-of-another
+        def is_subseq(x, y):
+            it = iter(y)
+            return all(any(c == ch for c in it) for ch in x)
+
+        author_patterns = [set(record.items) for record in author_records]
+        # -1s only separate the (1-item) itemsets of title patterns
+        title_patterns = [[item for item in record.items if item != -1] for record in title_records]
+        for paper_id, author_ids, term_ids in new_papers:
+            for record, pattern in zip(author_records, author_patterns):
+                if pattern.issubset(author_ids):
+                    FrequentPatternBuilder.__add_transaction(record, paper_id)
+            for record, pattern in zip(title_records, title_patterns):
+                if is_subseq(pattern, term_ids):
+                    FrequentPatternBuilder.__add_transaction(record, paper_id)
+
+    @staticmethod
+    def __add_transaction(record, paper_id):
+        if record.support is not None:
+            record.support += 1
+        if record.transaction_ids is not None:
+            record.transaction_ids.add(paper_id)
+
+    @staticmethod
+    def __merge_records(records, remined_records, get_key):
+        '''
+        Merges patterns mined from every paper into the existing patterns (in place), keeping the existing ones
+        in place and appending the newly frequent ones
+
+        @param
+            records: list(PatternRecord)            Existing patterns, with updated supports
+            remined_records: list(PatternRecord)    Patterns mined from every paper
+            get_key: function(list(int))            Maps the items of a pattern to a key identifying the pattern
+        @return list(int), ids of the appended patterns
+        '''
+        pattern_ids = {get_key(record.items): pattern_id for pattern_id, record in enumerate(records)}
+        new_pattern_ids = []
+        for remined_record in remined_records:
+            pattern_id = pattern_ids.get(get_key(remined_record.items))
+            if pattern_id is None:
+                new_pattern_ids.append(len(records))
+                records.append(remined_record)
+            elif remined_record.support is not None and records[pattern_id].support != remined_record.support:
+                print("Warning: support of pattern %d is %d, but SPMF found %d (were papers of data.csv modified?)" \
+                    % (pattern_id, records[pattern_id].support, remined_record.support))
+        return new_pattern_ids
+
+    @staticmethod
+    def __read_state():
+        if not os.path.exists(FrequentPatternBuilder.STATE_FILE_PATH):
+            return None
+        state_file = open(FrequentPatternBuilder.STATE_FILE_PATH, "r")
+        state = json.load(state_file)
+        state_file.close()
+        return state
+
+    @staticmethod
+    def __write_state(num_papers):
+        state_file = open(FrequentPatternBuilder.STATE_FILE_PATH, "w")
+        json.dump({"num_papers": num_papers}, state_file, indent=4)
+        state_file.close()
+
     def clean_intermediate_files(self):
         '''
         Delete input files built specifically for SPMF
@@ -73,7 +341,8 @@ class FrequentPatternBuilder():
         delete_file(FrequentPatternBuilder.AUTHORS_INPUT_FILE_PATH)
         delete_file(FrequentPatternBuilder.TITLE_TERMS_INPUT_FILE_PATH)
 
-    def __build_intermediate_smpf_input(self):
+    @instrumentation.instrumented_stage("frequent_patterns.build_intermediate_spmf_input")
+    def __build_intermediate_smpf_input(self, author_id_mapping=None, title_term_id_mapping=None, first_new_paper=None):
         '''
         Build intermediate files (title and author files). Note that the format for CloSpan
         input files is different because we need to account for itemsets and transactions
@@ -85,9 +354,14 @@ class FrequentPatternBuilder():
         need to either put everything per title into 1 itemset (which doesn't make sense because
         then our patterns wouldn't be sequential) or make every word its own itemset.
 
-        @return (map(int, string), map(int, string))    Tuple of maps where the first map 
-            is a mapping between all unique author names to their author ids and the second 
-            is a mapping between all unique title terms to their title ids. NOTE: The mappings
+        @param author_id_mapping: map(string, int)?     Existing author mapping to extend (new authors get the next ids)
+        @param title_term_id_mapping: map(string, int)? Existing title term mapping to extend
+        @param first_new_paper: int?                    Id of the first paper to return, None to not return any
+
+        @return (map(int, string), map(int, string), int, list((int, set(int), list(int))))    Tuple of maps where
+            the first map is a mapping between all unique author names to their author ids and the second 
+            is a mapping between all unique title terms to their title ids, the number of papers and the (id,
+            author ids, title term ids) of every paper from first_new_paper on. NOTE: The mappings
             are completely independent -- so auth_map["foo"] has no relation to title_map["foo"]
 
         Documentation on input files for the 2 algorithms:
@@ -98,11 +372,14 @@ class FrequentPatternBuilder():
         title_terms_input_file = open(FrequentPatternBuilder.TITLE_TERMS_INPUT_FILE_PATH, "w")
         data_csv_file = open(FrequentPatternBuilder.CSV_FILE_PATH, "r")
         
-        author_id_mapping = {}
-        curr_author_id = 0
+        author_id_mapping = dict(author_id_mapping or {})
+        curr_author_id = len(author_id_mapping)
+
+        title_term_id_mapping = dict(title_term_id_mapping or {})
+        curr_title_term = len(title_term_id_mapping)
 
-        title_term_id_mapping = {}
-        curr_title_term = 0
+        num_papers = 0
+        new_papers = []
         
         # Repeating some code so we can iterate through the raw data file (big) one time
         for line in data_csv_file:
@@ -134,14 +411,18 @@ class FrequentPatternBuilder():
             term_ids.append(str(-2))
             title_terms_input_file.write("%s\n" % ' '.join(term_ids))
 
+            if first_new_paper is not None and num_papers >= first_new_paper:
+                new_papers.append((num_papers, set(author_ids), [int(term_id) for term_id in term_ids[0 : -1 : 2]]))
+            num_papers += 1
+
         data_csv_file.close()
         title_terms_input_file.close()
         authors_input_file.close()
 
-        return author_id_mapping, title_term_id_mapping
+        return author_id_mapping, title_term_id_mapping, num_papers, new_papers
 
     @staticmethod
-    def __write_word_id_mapping(word_id_mapping, output_file_path):
+    def __write_word_id_mapping(word_id_mapping, output_file_path, first_new_id=0):
         '''
         Writes a mapping between each id and each unique word to a file
 
@@ -153,13 +434,43 @@ class FrequentPatternBuilder():
         @param word_id_mapping: map(word, int)  Mapping between unique words 
             and their corresponding ids
         @param output_file_path: string         Path to write mapping to
+        @param first_new_id: int                Words with smaller ids are already in the file, only the others
+            are appended to it
         '''
-        word_id_file = open(output_file_path, "w")
+        word_id_file = open(output_file_path, "a" if first_new_id > 0 else "w")
         for word in word_id_mapping:
-            word_id_file.write("%d %s\n" % (word_id_mapping[word], word))
+            if word_id_mapping[word] >= first_new_id:
+                word_id_file.write("%d %s\n" % (word_id_mapping[word], word))
+        word_id_file.close()
+
+    @staticmethod
+    def __read_word_id_mapping(input_file_path):
+        '''
+        @param input_file_path: string      Path of a mapping written by __write_word_id_mapping
+        @return map(word, int), mapping between unique words and their corresponding ids
+        '''
+        word_id_mapping = {}
+        word_id_file = open(input_file_path, "r")
+        for line in word_id_file:
+            word_id, word = line.split()
+            word_id_mapping[word] = int(word_id)
         word_id_file.close()
+        return word_id_mapping
 
 if __name__ == "__main__":
+    '''
+    Usage: py utils/frequent_pattern_mining/build_frequent_patterns.py          (mines every pattern file)
+           py utils/frequent_pattern_mining/build_frequent_patterns.py update   (folds papers appended to data.csv in)
+           py utils/frequent_pattern_mining/build_frequent_patterns.py sweep FP_CLOSE_THRESHS CLOSPAN_THRESHS
+                (mines once, writes the pattern files of every threshold, ex: sweep 0.05,0.08,0.1 0.2,0.3)
+    '''
+    instrumentation.configure_from_argv(sys.argv)
     pattern_builder = FrequentPatternBuilder()
-    pattern_builder.build_frequent_pattern_files()
+    if len(sys.argv) > 1 and sys.argv[1] == "update":
+        pattern_builder.update_frequent_pattern_files()
+    elif len(sys.argv) > 3 and sys.argv[1] == "sweep":
+        pattern_builder.sweep_frequent_pattern_files([float(thresh) for thresh in sys.argv[2].split(",")], \
+            [float(thresh) for thresh in sys.argv[3].split(",")])
+    else:
+        pattern_builder.build_frequent_pattern_files()
     # pattern_builder.clean_intermediate_files()
\ No newline at end of file
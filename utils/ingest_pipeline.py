@@ -0,0 +1,115 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "frequent_pattern_mining"))
+
+from data_set_format import format_paper_line, parse_paper_line
+from transaction_store import TRANSACTION_STORE_FILENAME, TransactionStoreWriter
+from build_frequent_patterns import FrequentPatternBuilder
+import instrumentation
+
+'''
+Streams scraped (build_data_from_web.py) or ingested (build_data_from_dblp_dump.py) papers through id assignment
+once, writing at the same time:
+    data/data.csv                   The papers (see data_set_format.py)
+    data/authors_temp_input.txt     FPClose input (author ids of every paper)
+    data/title_temp_input.txt       CloSpan input (title term ids of every paper)
+    data/author_id_mappings.txt     Author id mapping, a line is appended when an author is first seen
+    data/title_term_id_mappings.txt Title term id mapping, a line is appended when a term is first seen
+    data/transactions.bin           Id mapped transactions (see transaction_store.py)
+instead of writing data.csv, then reading it again to assign ids and write the SPMF inputs (see
+FrequentPatternBuilder), then again with the id mappings to rebuild the same transactions (see TransactionsManager).
+
+Ids are assigned exactly as FrequentPatternBuilder assigns them from data.csv (in order of first appearance), so
+every file is identical to the ones it would write. Papers are only held one at a time: memory is bounded by the
+vocabulary (the author and title term to id mappings).
+
+Usage (ingests, then mines the pattern files from the SPMF inputs without reading data.csv again):
+    py utils/ingest_pipeline.py                                 (scrapes dblp.org like build_data_from_web.py)
+    py utils/ingest_pipeline.py DUMP_FILE [conference1,...]     (streams a dblp.xml(.gz) dump, in dump order)
+TransactionsManager("data/transactions.bin", ...) then loads the transactions without parsing data.csv.
+'''
+
+class StreamingIngestPipeline:
+    def __init__(self, data_set_name=FrequentPatternBuilder.CSV_FILE_PATH, \
+        store_filename=TRANSACTION_STORE_FILENAME):
+        '''
+        @param
+            data_set_name: string       data.csv file path to write to
+            store_filename: string      Transaction store file path to write to
+        '''
+        self.__data_set_name = data_set_name
+        self.__store_filename = store_filename
+
+    @instrumentation.instrumented_stage("ingest.stream")
+    def ingest(self, papers):
+        '''
+        Writes every paper and its ids to every output file (overwriting them)
+
+        @param papers: Iterable((list(string), string))     (authors, title) of every paper, normalized (see
+            data_set_format.py), ex: DataSetBuilder.iterate_papers()
+        @return int, the number of papers
+        '''
+        data_file = open(self.__data_set_name, "w")
+        authors_input_file = open(FrequentPatternBuilder.AUTHORS_INPUT_FILE_PATH, "w")
+        title_terms_input_file = open(FrequentPatternBuilder.TITLE_TERMS_INPUT_FILE_PATH, "w")
+        authors_mapping_file = open(FrequentPatternBuilder.AUTHOR_ID_FILE_PATH, "w")
+        title_terms_mapping_file = open(FrequentPatternBuilder.TITLE_TERM_ID_FILE_PATH, "w")
+        store_writer = TransactionStoreWriter(self.__store_filename)
+
+        author_id_mapping = {}
+        title_term_id_mapping = {}
+        num_papers = 0
+        for authors, title in papers:
+            line = format_paper_line(authors, title)
+            data_file.write(line)
+
+            # Words are the ones that will be read back from the line
+            authors, title_terms = parse_paper_line(line)
+            author_ids = sorted([StreamingIngestPipeline.__get_word_id(author, author_id_mapping, \
+                authors_mapping_file) for author in authors])
+            title_term_ids = [StreamingIngestPipeline.__get_word_id(title_term, title_term_id_mapping, \
+                title_terms_mapping_file) for title_term in title_terms]
+
+            # Same formats as FrequentPatternBuilder's intermediate input files
+            authors_input_file.write("%s\n" % ' '.join([str(author_id) for author_id in author_ids]))
+            title_terms_input_file.write("%s\n" % ' '.join(["%d -1" % term_id for term_id in title_term_ids] + ["-2"]))
+            store_writer.write_paper(author_ids, title_term_ids)
+            num_papers += 1
+
+        store_writer.close()
+        title_terms_mapping_file.close()
+        authors_mapping_file.close()
+        title_terms_input_file.close()
+        authors_input_file.close()
+        data_file.close()
+        print("Ingested %d papers, %d authors and %d title terms" % (num_papers, len(author_id_mapping), \
+            len(title_term_id_mapping)))
+        return num_papers
+
+    @staticmethod
+    def __get_word_id(word, word_id_mapping, mapping_file):
+        '''
+        @return int, the id of the word, assigning it the next id (and appending it to the mapping file) if it's new
+        '''
+        word_id = word_id_mapping.get(word)
+        if word_id is None:
+            word_id = len(word_id_mapping)
+            word_id_mapping[word] = word_id
+            mapping_file.write("%d %s\n" % (word_id, word))
+        return word_id
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+    # Same conferences as build_data_from_web.py and build_data_from_dblp_dump.py
+    conferences = ['aciids', 'icdm', 'sdm', 'dba', 'balt', 'dbsec', 'dbcrowd', 'pkdd' ,'kdd', 'trec', 'cikm', 'sigir']
+    if len(sys.argv) > 1:
+        from build_data_from_dblp_dump import DblpDumpDataSetBuilder
+        data_set_builder = DblpDumpDataSetBuilder(FrequentPatternBuilder.CSV_FILE_PATH, sys.argv[1], \
+            sys.argv[2].split(",") if len(sys.argv) > 2 else conferences)
+    else:
+        from build_data_from_web import DataSetBuilder
+        data_set_builder = DataSetBuilder(FrequentPatternBuilder.CSV_FILE_PATH, conferences, 10)
+
+    num_papers = StreamingIngestPipeline().ingest(data_set_builder.iterate_papers())
+    FrequentPatternBuilder().build_frequent_pattern_files(num_papers)
@@ -0,0 +1,281 @@
+import atexit
+import cProfile
+import json
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+
+'''
+Opt-in instrumentation layer used to find out where time and memory go when building
+MI files or answering annotator queries. Nothing is recorded unless instrumentation is
+enabled, either through environment variables or through CLI flags:
+
+    COURSEPROJECT_PROFILE=report.json python utils/mutual_information_manager.py
+    python pattern_annotators/strongest_context_indicator_extractor.py 1 5 True --profile=report.json
+
+Optionally, a cProfile dump can be written as well (view it with `python -m pstats <file>`):
+
+    COURSEPROJECT_CPROFILE=profile.out python utils/mutual_information_manager.py
+    python utils/mutual_information_manager.py --cprofile=profile.out
+
+Note that tracemalloc slows down allocations, so timings from an instrumented run are inflated
+relative to an uninstrumented one; compare instrumented runs against each other.
+
+Usage inside the code base:
+    @instrumentation.instrumented_stage("mutual_information.compute")
+    def compute_mutual_information(...):
+        ...
+
+    with instrumentation.stage("mutual_information.compute"):
+        ...
+    instrumentation.increment("support_scans")
+
+Report format (JSON):
+    {
+        "argv": [...],
+        "total_wall_time_s": float,
+        "stages": { stage name: {"calls", "wall_time_s", "cpu_time_s", "peak_memory_bytes"} },
+        "counters": { counter name: int }
+    }
+'''
+
+PROFILE_REPORT_ENV_VAR = "COURSEPROJECT_PROFILE"
+CPROFILE_DUMP_ENV_VAR = "COURSEPROJECT_CPROFILE"
+
+PROFILE_REPORT_FLAG = "--profile="
+CPROFILE_DUMP_FLAG = "--cprofile="
+
+# Shared no-op context manager returned by stage() when instrumentation is disabled so that
+# disabled instrumentation costs one function call and a boolean check per stage
+_NULL_STAGE = nullcontext()
+
+class StageProfiler:
+    '''
+    Records wall time, CPU time and tracemalloc peak memory per named stage, plus a set of
+    named counters, and writes them out as a JSON report
+    '''
+
+    class Stage:
+        '''
+        Context manager timing a single execution of a stage
+        '''
+        def __init__(self, profiler, name):
+            self.__profiler = profiler
+            self.__name = name
+
+        def __enter__(self):
+            self.__profiler.enter_stage(self.__name)
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.__profiler.exit_stage(self.__name)
+            return False
+
+    def __init__(self, report_file_name=None, cprofile_file_name=None):
+        '''
+        @param
+            report_file_name: string (optional)     file path to write the JSON report to
+            cprofile_file_name: string (optional)   file path to dump cProfile stats to
+        '''
+        self.__report_file_name = report_file_name
+        self.__cprofile_file_name = cprofile_file_name
+        self.__stages = {}
+        self.__counters = {}
+        # Per thread stack of [name, wall start, cpu start, running peak memory] entries for nested stages, so
+        # that stages run concurrently by a thread pool don't pop each other's entries
+        self.__local = threading.local()
+        # Guards __stages and __counters, which every thread updates
+        self.__lock = threading.Lock()
+        self.__start_time = time.perf_counter()
+        self.__cprofiler = None
+
+    def start(self):
+        '''
+        Starts memory tracing (and cProfile if requested)
+        '''
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.__cprofile_file_name:
+            self.__cprofiler = cProfile.Profile()
+            self.__cprofiler.enable()
+
+    def set_report_file_name(self, report_file_name):
+        self.__report_file_name = report_file_name
+
+    def set_cprofile_file_name(self, cprofile_file_name):
+        self.__cprofile_file_name = cprofile_file_name
+        if not self.__cprofiler:
+            self.__cprofiler = cProfile.Profile()
+            self.__cprofiler.enable()
+
+    def __get_stage_stack(self):
+        '''
+        @return list, the stage stack of the calling thread
+        '''
+        stage_stack = getattr(self.__local, "stage_stack", None)
+        if stage_stack is None:
+            stage_stack = self.__local.stage_stack = []
+        return stage_stack
+
+    def enter_stage(self, name):
+        # tracemalloc only has a process wide peak, so the peak of stages run concurrently includes the memory
+        # allocated by the other threads meanwhile
+        stage_stack = self.__get_stage_stack()
+        # Fold the parent's peak so far into its running max before resetting the peak for
+        # the child, otherwise the parent would lose memory it allocated before the child ran
+        if stage_stack:
+            parent = stage_stack[-1]
+            parent[3] = max(parent[3], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        stage_stack.append([name, time.perf_counter(), time.process_time(), 0])
+
+    def exit_stage(self, name):
+        stage_stack = self.__get_stage_stack()
+        stage_name, wall_start, cpu_start, running_peak = stage_stack.pop()
+        assert stage_name == name
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+
+        peak_memory = max(running_peak, tracemalloc.get_traced_memory()[1])
+        if stage_stack:
+            parent = stage_stack[-1]
+            parent[3] = max(parent[3], peak_memory)
+
+        with self.__lock:
+            if name not in self.__stages:
+                self.__stages[name] = {"calls": 0, "wall_time_s": 0.0, "cpu_time_s": 0.0, "peak_memory_bytes": 0}
+            stage_stats = self.__stages[name]
+            stage_stats["calls"] += 1
+            stage_stats["wall_time_s"] += wall_time
+            stage_stats["cpu_time_s"] += cpu_time
+            stage_stats["peak_memory_bytes"] = max(stage_stats["peak_memory_bytes"], peak_memory)
+
+    def increment(self, counter_name, amount=1):
+        with self.__lock:
+            self.__counters[counter_name] = self.__counters.get(counter_name, 0) + amount
+
+    def get_report(self):
+        '''
+        @return dict, JSON serializable report of all stages and counters recorded so far
+        '''
+        with self.__lock:
+            return {
+                "argv": sys.argv,
+                "total_wall_time_s": time.perf_counter() - self.__start_time,
+                "stages": {name: dict(stage_stats) for name, stage_stats in self.__stages.items()},
+                "counters": dict(self.__counters)
+            }
+
+    def write_report(self):
+        '''
+        Writes the JSON report and the cProfile dump (if they were requested)
+        '''
+        if self.__cprofiler:
+            self.__cprofiler.disable()
+            self.__cprofiler.dump_stats(self.__cprofile_file_name)
+
+        if self.__report_file_name:
+            report_file = open(self.__report_file_name, "w")
+            json.dump(self.get_report(), report_file, indent=4)
+            report_file.close()
+
+_profiler = None
+
+def is_enabled():
+    return _profiler is not None
+
+def enable(report_file_name=None, cprofile_file_name=None):
+    '''
+    Enables instrumentation for the rest of the process. The report is written when the
+    process exits. Calling this again only updates the output file names.
+
+    @param
+        report_file_name: string (optional)     file path to write the JSON report to
+        cprofile_file_name: string (optional)   file path to dump cProfile stats to
+    '''
+    global _profiler
+    if _profiler:
+        if report_file_name:
+            _profiler.set_report_file_name(report_file_name)
+        if cprofile_file_name:
+            _profiler.set_cprofile_file_name(cprofile_file_name)
+        return _profiler
+
+    _profiler = StageProfiler(report_file_name, cprofile_file_name)
+    _profiler.start()
+    atexit.register(_profiler.write_report)
+    return _profiler
+
+def get_profiler():
+    '''
+    @return StageProfiler?, the active profiler, or None if instrumentation is disabled
+    '''
+    return _profiler
+
+def configure_from_argv(argv):
+    '''
+    Enables instrumentation if --profile=<report file> or --cprofile=<dump file> is in argv
+    and removes these flags from argv IN PLACE so positional argument parsing isn't affected
+
+    @param argv: list(string)   Usually sys.argv
+    '''
+    report_file_name = None
+    cprofile_file_name = None
+    remaining_args = []
+    for arg in argv:
+        if arg.startswith(PROFILE_REPORT_FLAG):
+            report_file_name = arg[len(PROFILE_REPORT_FLAG) : ]
+        elif arg.startswith(CPROFILE_DUMP_FLAG):
+            cprofile_file_name = arg[len(CPROFILE_DUMP_FLAG) : ]
+        else:
+            remaining_args.append(arg)
+    argv[:] = remaining_args
+
+    if report_file_name or cprofile_file_name:
+        enable(report_file_name, cprofile_file_name)
+
+def stage(name):
+    '''
+    @param name: string     Stage name, formatted as <component>.<operation>
+    @return a context manager timing the stage, or a shared no-op context manager if
+        instrumentation is disabled
+    '''
+    if _profiler is None:
+        return _NULL_STAGE
+    return StageProfiler.Stage(_profiler, name)
+
+def instrumented_stage(name):
+    '''
+    Decorator timing every call of the decorated function as a stage. Whether instrumentation
+    is enabled is checked per call, so flags parsed after import time are respected.
+
+    @param name: string     Stage name, formatted as <component>.<operation>
+    '''
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            with StageProfiler.Stage(_profiler, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def increment(counter_name, amount=1):
+    '''
+    Increments a named counter. Hot loops should call this once per batch rather than
+    once per item.
+
+    @param
+        counter_name: string    Counter name (ex: support_scans)
+        amount: int             Amount to add to the counter
+    '''
+    if _profiler is not None:
+        _profiler.increment(counter_name, amount)
+
+if os.environ.get(PROFILE_REPORT_ENV_VAR) or os.environ.get(CPROFILE_DUMP_ENV_VAR):
+    enable(os.environ.get(PROFILE_REPORT_ENV_VAR), os.environ.get(CPROFILE_DUMP_ENV_VAR))
@@ -0,0 +1,240 @@
+import os
+import sys
+import random
+import struct
+from array import array
+
+from mutual_information_manager import MutualInformationManager
+from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
+from cosine_similarity import normalize_vector, compute_normalized_cosine_similarity
+import instrumentation
+
+'''
+Approximate nearest-neighbor (cosine) index over normalized MI context vectors, based on random-hyperplane
+locality sensitive hashing. Each of the num_tables tables hashes a vector to a num_bits signature (one bit per
+random hyperplane: which side of the hyperplane the vector is on), so vectors with a small angle between them
+are likely to share a bucket in at least one table. A query only ranks the vectors in its buckets (exactly, by
+cosine similarity), so the number of similarities computed per query is sublinear in the number of patterns.
+
+Recall is tuned with:
+    num_tables      more tables = higher recall, more memory and more candidates per query
+    num_bits        more bits = smaller buckets = fewer candidates (lower recall, faster queries)
+    probe_radius    0 to only look at the query's own bucket per table, 1 to also look at every bucket whose
+                    signature differs by one bit (multi-probe LSH: higher recall without more tables)
+
+On-disk format (little endian):
+    b"LSH1" dim num_vectors num_tables num_bits seed (uint32 x 4, int64)
+    num_vectors * num_tables uint64 signatures (row major, one row per vector)
+
+Hyperplanes aren't persisted, they're regenerated from the seed when needed (only to hash vectors that
+weren't indexed). Buckets are rebuilt from the signatures on load.
+
+Usage (builds and persists the author-author and title-title indices and reports recall@k against the
+exact scan):
+    py utils/lsh_index.py [k] [num_tables] [num_bits]
+'''
+
+class RandomHyperplaneLshIndex:
+    MAGIC = b"LSH1"
+    HEADER_FORMAT = "<4sIIIIq"
+
+    AUTHOR_AUTHOR_INDEX_FILENAME = os.path.join("data", "author_author_lsh_index.bin")
+    TITLE_TITLE_INDEX_FILENAME = os.path.join("data", "title_title_lsh_index.bin")
+
+    def __init__(self, dim, num_tables=8, num_bits=8, seed=0, probe_radius=1):
+        '''
+        @param
+            dim: int                Dimension of the indexed vectors
+            num_tables: int         Number of hash tables
+            num_bits: int           Number of hyperplanes (signature bits) per table, at most 64
+            seed: int               Seed the hyperplanes are generated from
+            probe_radius: int       0 or 1, Hamming radius of the buckets looked at per table
+        '''
+        assert 0 < num_bits <= 64
+        assert probe_radius in (0, 1)
+        self.__dim = dim
+        self.__num_tables = num_tables
+        self.__num_bits = num_bits
+        self.__seed = seed
+        self.probe_radius = probe_radius
+
+        self.__hyperplanes = None
+        # Signatures of indexed vectors: signatures[vector_id * num_tables + table]
+        self.__signatures = array('Q')
+        # One dict(signature, list(vector id)) per table
+        self.__buckets = [{} for _ in range(num_tables)]
+        self.__normalized_vectors = None
+
+    def build(self, normalized_vectors):
+        '''
+        Hashes every vector into every table
+
+        @param normalized_vectors: list(list(float))    Unit length vectors (see normalize_vector), indexed by id
+        '''
+        with instrumentation.stage("lsh_index.build"):
+            self.__normalized_vectors = normalized_vectors
+            self.__signatures = array('Q')
+            for vector in normalized_vectors:
+                assert len(vector) == self.__dim
+                self.__signatures.extend(self.compute_signatures(vector))
+            self.__build_buckets()
+
+    def set_vectors(self, normalized_vectors):
+        '''
+        Sets the vectors candidates are ranked against, ex: after loading the index from a file
+
+        @param normalized_vectors: list(list(float))    The same vectors the index was built over
+        '''
+        assert len(normalized_vectors) * self.__num_tables == len(self.__signatures)
+        self.__normalized_vectors = normalized_vectors
+
+    def compute_signatures(self, vector):
+        '''
+        @param vector: list(float)      Vector to hash
+        @return list(int), the vector's signature in every table
+        '''
+        if self.__hyperplanes is None:
+            self.__hyperplanes = self.__generate_hyperplanes()
+
+        signatures = []
+        for table_hyperplanes in self.__hyperplanes:
+            signature = 0
+            for bit, hyperplane in enumerate(table_hyperplanes):
+                if sum(h * el for h, el in zip(hyperplane, vector)) >= 0:
+                    signature |= 1 << bit
+            signatures.append(signature)
+        return signatures
+
+    def find_candidates(self, vector_id=None, vector=None):
+        '''
+        Finds every indexed vector sharing a (probed) bucket with the query. Pass in vector_id to query with
+        an indexed vector (uses its stored signatures) or vector to query with any other vector.
+
+        @return set(int), candidate vector ids
+        '''
+        if vector_id is not None:
+            signatures = self.__signatures[vector_id * self.__num_tables : (vector_id + 1) * self.__num_tables]
+        else:
+            signatures = self.compute_signatures(vector)
+
+        candidates = set()
+        for table, signature in enumerate(signatures):
+            buckets = self.__buckets[table]
+            candidates.update(buckets.get(signature, ()))
+            if self.probe_radius == 1:
+                for bit in range(self.__num_bits):
+                    candidates.update(buckets.get(signature ^ (1 << bit), ()))
+        return candidates
+
+    def query(self, vector_id, k):
+        '''
+        Finds the (approximately) k most similar indexed vectors to an indexed vector. Candidates are ranked
+        by their exact cosine similarity.
+
+        @param
+            vector_id: int      Id of the query vector
+            k: int              Number of neighbors to find
+        @return list(int), up to k vector ids sorted in decreasing similarity (the query vector included)
+        '''
+        candidates = self.find_candidates(vector_id)
+        instrumentation.increment("lsh_candidates", len(candidates))
+        query_vector = self.__normalized_vectors[vector_id]
+        similarities = [(compute_normalized_cosine_similarity(query_vector, self.__normalized_vectors[candidate]), \
+            -candidate) for candidate in candidates]
+        similarities.sort(reverse=True)
+        return [-negated_id for _, negated_id in similarities[ : k]]
+
+    def write_to_file(self, index_filename):
+        index_file = open(index_filename, "wb")
+        index_file.write(struct.pack(RandomHyperplaneLshIndex.HEADER_FORMAT, RandomHyperplaneLshIndex.MAGIC, \
+            self.__dim, len(self.__signatures) // self.__num_tables, self.__num_tables, self.__num_bits, self.__seed))
+        signatures = array('Q', self.__signatures)
+        if sys.byteorder != "little":
+            signatures.byteswap()
+        signatures.tofile(index_file)
+        index_file.close()
+
+    @staticmethod
+    def read_from_file(index_filename, probe_radius=1):
+        '''
+        @param
+            index_filename: string      File written by write_to_file
+            probe_radius: int           0 or 1, see the constructor
+        @return RandomHyperplaneLshIndex, with its buckets rebuilt (call set_vectors before querying)
+        '''
+        index_file = open(index_filename, "rb")
+        magic, dim, num_vectors, num_tables, num_bits, seed = struct.unpack(RandomHyperplaneLshIndex.HEADER_FORMAT, \
+            index_file.read(struct.calcsize(RandomHyperplaneLshIndex.HEADER_FORMAT)))
+        assert magic == RandomHyperplaneLshIndex.MAGIC
+
+        index = RandomHyperplaneLshIndex(dim, num_tables, num_bits, seed, probe_radius)
+        index.__signatures.fromfile(index_file, num_vectors * num_tables)
+        if sys.byteorder != "little":
+            index.__signatures.byteswap()
+        index_file.close()
+
+        index.__build_buckets()
+        return index
+
+    def __build_buckets(self):
+        self.__buckets = [{} for _ in range(self.__num_tables)]
+        for ind, signature in enumerate(self.__signatures):
+            self.__buckets[ind % self.__num_tables].setdefault(signature, []).append(ind // self.__num_tables)
+
+    def __generate_hyperplanes(self):
+        rand = random.Random(self.__seed)
+        return [[[rand.gauss(0, 1) for _ in range(self.__dim)] for _ in range(self.__num_bits)] \
+            for _ in range(self.__num_tables)]
+
+def find_exact_neighbors(normalized_vectors, vector_id, k):
+    '''
+    Exact top k scan, used to validate the index
+
+    @return list(int), k vector ids sorted in decreasing similarity (the query vector included)
+    '''
+    query_vector = normalized_vectors[vector_id]
+    similarities = [(compute_normalized_cosine_similarity(query_vector, vector), -ind) \
+        for ind, vector in enumerate(normalized_vectors)]
+    similarities.sort(reverse=True)
+    return [-negated_id for _, negated_id in similarities[ : k]]
+
+def compute_recall(index, normalized_vectors, k):
+    '''
+    Computes the average recall@k of index.query against the exact scan, querying every indexed vector
+
+    @param
+        index: RandomHyperplaneLshIndex         Index to evaluate
+        normalized_vectors: list(list(float))   Vectors the index was built over
+        k: int                                  Number of neighbors per query
+    @return float, average fraction of the exact top k found by the index
+    '''
+    total_recall = 0
+    for vector_id in range(len(normalized_vectors)):
+        exact_neighbors = find_exact_neighbors(normalized_vectors, vector_id, k)
+        approximate_neighbors = set(index.query(vector_id, k))
+        total_recall += len(approximate_neighbors.intersection(exact_neighbors)) / len(exact_neighbors)
+    return total_recall / len(normalized_vectors)
+
+if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    num_tables = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    num_bits = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    for pattern_type, patterns, index_filename in [
+        (MutualInformationManager.PatternType.AUTHOR_AUTHOR, parse_author_file_into_patterns("data/frequent_author_patterns.txt"), \
+            RandomHyperplaneLshIndex.AUTHOR_AUTHOR_INDEX_FILENAME),
+        (MutualInformationManager.PatternType.TITLE_TITLE, parse_sequential_title_file_into_patterns("data/minimal_title_term_patterns.txt"), \
+            RandomHyperplaneLshIndex.TITLE_TITLE_INDEX_FILENAME)]:
+
+        mutual_info = MutualInformationManager(pattern_type)
+        mutual_info.read_mutual_information_from_file()
+        normalized_vectors = [normalize_vector(mutual_info.get_mutual_information_vector(ind, len(patterns))) \
+            for ind in range(len(patterns))]
+
+        index = RandomHyperplaneLshIndex(len(patterns), num_tables, num_bits)
+        index.build(normalized_vectors)
+        index.write_to_file(index_filename)
+
+        recall = compute_recall(index, normalized_vectors, k)
+        print("%s: %d vectors, recall@%d = %f" % (index_filename, len(patterns), k, recall))
@@ -1,8 +1,22 @@
-from math import log2
+from math import log2, sqrt
+from functools import lru_cache
 import transactions_manager
-from parse_patterns import parse_author_file_into_patterns, parse_sequential_title_file_into_patterns
+import instrumentation
+from transaction_id_set import TransactionIdSet
+from parse_patterns import parse_pattern_file_into_records, get_sequential_title_pattern, get_records_transaction_ids
 
 import os
+import sys
+import json
+import mmap
+import time
+import heapq
+import struct
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from multiprocessing import shared_memory, resource_tracker
 
 '''
 Usage:
@@ -23,6 +37,96 @@ where index1 = author index and index2 = title index for auth-title or title-aut
      mutual_info.read_mutual_information_from_file()
      mutual_info.get_mutual_information(1, 2) # to get mutual info for patterns 1 and 2
 
+* To only keep the top K MI values per pattern (memory and disk grow as O(P * K) rather than O(P^2)),
+  build the top K files once from the full MI files, then read them with the TOP_K storage mode
+     MutualInformationManager.build_top_k_mutual_information_files(MutualInformationManager.PatternType.X, 50)
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.X, \
+        storage_mode=MutualInformationManager.StorageMode.TOP_K)
+     mutual_info.read_mutual_information_from_file()
+     mutual_info.get_top_k_mutual_information(1, 5) # to get the 5 (index, MI) pairs with the highest MI for pattern 1
+
+Top K file format (binary, little endian), one file per orientation (author-title and title-author are separate
+files because their rows are different patterns):
+    b"MITK" pattern_type num_rows num_cols k        (uint32 x 4)
+    num_rows row norms                              (float64, L2 norm of each row's full MI vector)
+    num_rows * k column indices                     (int32, row major, -1 pads rows with < k entries)
+    num_rows * k MI values                          (float64, row major, each row sorted in descending MI)
+
+* To share one read-only copy of an MI matrix between processes, convert the full MI files to dense binary
+  matrices once, then either mmap the binary file in every process (pages are shared through the page cache)
+  or publish it to shared memory once and attach to it by name in every worker. get_mutual_information and
+  get_mutual_information_vector work unchanged on attached managers.
+     MutualInformationManager.build_dense_mutual_information_file(MutualInformationManager.PatternType.X)
+
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.X, \
+        storage_mode=MutualInformationManager.StorageMode.DENSE)
+     mutual_info.read_mutual_information_from_file() # mmaps the binary file, no copy
+
+     shm = MutualInformationManager.publish_mutual_information_to_shared_memory(MutualInformationManager.PatternType.X)
+     ... in each worker:
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.X, \
+        storage_mode=MutualInformationManager.StorageMode.DENSE)
+     mutual_info.attach_to_shared_memory(shm.name)
+     ... once every worker is done:
+     shm.close()
+     shm.unlink()
+
+  When even one copy of a matrix doesn't fit in memory, compute it out of core straight into the dense file, in
+  tiles sized so that about memory_budget bytes are in use at a time (see __compute_tiled_mutual_information):
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.X, transactions)
+     mutual_info.compute_mutual_information(title_patterns, memory_budget=512 * 1024 * 1024)
+
+Dense file format (binary, little endian), author-title and title-author share the author-title file:
+    b"MIDM" pattern_type num_rows num_cols      (uint32 x 3)
+    num_rows * num_cols MI values               (float64, row major, both halves of symmetric matrices)
+
+* To keep a full matrix in 2 (or 1) bytes per value instead of 8, quantize the full MI files once and read
+  them with the QUANTIZED storage mode. Every row is stored as integers times a per-row scale
+  (scale = max |MI| of the row / 32767 for 16 bit values, / 127 for 8 bit values) and values are rounded to the
+  nearest integer, so the maximum absolute error of every value of a row is scale / 2, ie:
+      16 bits: |error| <= max |MI| of the row / 65534     (~0.0015% of the row's largest value)
+       8 bits: |error| <= max |MI| of the row / 254       (~0.39% of the row's largest value)
+  on top of the 5e-7 rounding error of the text files. get_max_quantization_error returns the bound. Author-title
+  rows all share the scale of the whole matrix, so that title-author vectors (its columns) keep their order.
+  Use pattern_annotators/validate_quantized_mutual_info.py to compare annotator results against the full files.
+     MutualInformationManager.build_quantized_mutual_information_file(MutualInformationManager.PatternType.X, 16)
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.X, \
+        storage_mode=MutualInformationManager.StorageMode.QUANTIZED)
+     mutual_info.read_mutual_information_from_file()
+
+Quantized file format (binary, little endian), author-title and title-author share the author-title file:
+    b"MIQM" pattern_type num_rows num_cols bits     (uint32 x 4)
+    num_rows row scales                             (float64)
+    num_rows * num_cols quantized MI values         (int16 or int8, row major, both halves of symmetric matrices)
+
+* To only compute the MI values that are actually queried, pass the transactions and the pattern lists to a
+  LAZY storage mode manager. Missing values (or whole rows, for get_mutual_information_vector) are computed on
+  first access and cached in an LRU of at most max_cached_rows rows. With persist=True, computed values are also
+  appended to a lazy MI file (same format as the full MI files) that read_mutual_information_from_file reads back
+  in the next run, so values are only ever computed once.
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_TITLE, transactions, \
+        storage_mode=MutualInformationManager.StorageMode.LAZY, patterns=author_patterns, \
+        secondary_patterns=title_patterns, persist=True)
+     mutual_info.read_mutual_information_from_file() # reads the values persisted by earlier runs (if any)
+     mutual_info.get_mutual_information_vector(3, len(title_patterns)) # computes (only) row 3
+
+* For a quick first pass over very large corpora, an APPROXIMATE storage mode manager works like a LAZY one but
+  estimates supports and joint supports from a uniform sample of sample_size transactions, so computing a row costs
+  one scan of the sample per pattern instead of one scan of the corpus. get_mutual_information_bounds returns
+  confidence bounds on every value and refine_rows recomputes chosen rows exactly (from the whole corpus).
+     mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, transactions, \
+        storage_mode=MutualInformationManager.StorageMode.APPROXIMATE, patterns=author_patterns, sample_size=10000)
+     mutual_info.get_mutual_information(1, 2)          # estimate
+     mutual_info.get_mutual_information_bounds(1, 2)   # (lower bound, upper bound)
+     mutual_info.refine_rows([1])                      # row 1 is exact from now on
+
+  Bounds: every probability the MI is computed from (support of x, support of y, joint support) gets a Wilson score
+  interval (APPROXIMATE_CONFIDENCE_Z = 1.96, ie 95% per probability, with a finite population correction), and the
+  bounds are the min and max of the MI over the end points and estimates of the support intervals and, for every
+  pair of supports, the end points of the joint support interval and its point closest to independence (where the
+  MI is minimal). MI isn't monotonic in the supports, so this is a heuristic rather than a guaranteed (joint)
+  confidence interval, but it's wide whenever the sample saw too few transactions of either pattern to tell.
+
 Note: We're storing one MI value per pair of AUTHOR pattern indices.
 '''
 class MutualInformationManager:
@@ -33,16 +137,91 @@ class MutualInformationManager:
         TITLE_AUTHOR = 2
         TITLE_TITLE = 3
 
+    class StorageMode:
+        FULL = 0        # Every MI value, keyed by pattern index pair
+        TOP_K = 1       # Only the top K MI values per row, plus every row's norm
+        DENSE = 2       # Read-only row major matrix attached from a mmapped binary file or from shared memory
+        QUANTIZED = 3   # Row major matrix of 16 or 8 bit integers with one scale per row
+        LAZY = 4        # Values computed on first access, cached in an LRU of rows
+        APPROXIMATE = 5 # Like LAZY, but values are estimated from a uniform sample of the transactions
+
     AUTHOR_AUTHOR_MUTUAL_INFO_FILENAME = os.path.join("data", "author_author_mutual_info_patterns.txt")
     AUTHOR_TITLE_MUTUAL_INFO_FILENAME = os.path.join("data", "author_title_mutual_info_patterns.txt")
     TITLE_TITLE_MUTUAL_INFO_FILENAME = os.path.join("data", "title_title_mutual_info_patterns.txt")
 
-    def __init__(self, pattern_type, transactions=None, write_to_file_during_computation=False):
+    TOP_K_MUTUAL_INFO_FILENAMES = {
+        PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_author_top_k_mutual_info.bin"),
+        PatternType.AUTHOR_TITLE: os.path.join("data", "author_title_top_k_mutual_info.bin"),
+        PatternType.TITLE_AUTHOR: os.path.join("data", "title_author_top_k_mutual_info.bin"),
+        PatternType.TITLE_TITLE: os.path.join("data", "title_title_top_k_mutual_info.bin")
+    }
+    TOP_K_MAGIC = b"MITK"
+    TOP_K_HEADER_FORMAT = "<4sIIII"
+
+    DENSE_MUTUAL_INFO_FILENAMES = {
+        PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_author_mutual_info_matrix.bin"),
+        PatternType.AUTHOR_TITLE: os.path.join("data", "author_title_mutual_info_matrix.bin"),
+        PatternType.TITLE_AUTHOR: os.path.join("data", "author_title_mutual_info_matrix.bin"),
+        PatternType.TITLE_TITLE: os.path.join("data", "title_title_mutual_info_matrix.bin")
+    }
+    DENSE_MAGIC = b"MIDM"
+    # 16 bytes, so the matrix that follows it stays 8 byte aligned
+    DENSE_HEADER_FORMAT = "<4sIII"
+
+    QUANTIZED_MUTUAL_INFO_FILENAMES = {
+        PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_author_quantized_mutual_info.bin"),
+        PatternType.AUTHOR_TITLE: os.path.join("data", "author_title_quantized_mutual_info.bin"),
+        PatternType.TITLE_AUTHOR: os.path.join("data", "author_title_quantized_mutual_info.bin"),
+        PatternType.TITLE_TITLE: os.path.join("data", "title_title_quantized_mutual_info.bin")
+    }
+    QUANTIZED_MAGIC = b"MIQM"
+    QUANTIZED_HEADER_FORMAT = "<4sIIII"
+    # array typecode of each supported number of bits per quantized value
+    QUANTIZED_TYPECODES = {8: 'b', 16: 'h'}
+
+    LAZY_MUTUAL_INFO_FILENAMES = {
+        PatternType.AUTHOR_AUTHOR: os.path.join("data", "author_author_lazy_mutual_info_patterns.txt"),
+        PatternType.AUTHOR_TITLE: os.path.join("data", "author_title_lazy_mutual_info_patterns.txt"),
+        PatternType.TITLE_AUTHOR: os.path.join("data", "author_title_lazy_mutual_info_patterns.txt"),
+        PatternType.TITLE_TITLE: os.path.join("data", "title_title_lazy_mutual_info_patterns.txt")
+    }
+    DEFAULT_MAX_CACHED_ROWS = 1024
+
+    DEFAULT_SAMPLE_SIZE = 10000
+    APPROXIMATE_CONFIDENCE_Z = 1.96
+
+    # Approximate memory footprint of a TransactionIdSet besides its bitmap (object, offset and int headers), used to
+    # size the tiles of compute_mutual_information(..., memory_budget=...)
+    TRANSACTION_ID_SET_BYTES = 128
+
+    # Max number of (support x, support y, joint support, number of transactions) count tuples whose MI is cached,
+    # see compute_mutual_information_from_counts
+    MUTUAL_INFORMATION_CACHE_SIZE = 1 << 18
+
+    # Rows computed between two checkpoints of an MI file written during computation
+    DEFAULT_CHECKPOINT_ROWS = 64
+    PROGRESS_MANIFEST_SUFFIX = ".progress.json"
+
+    def __init__(self, pattern_type, transactions=None, write_to_file_during_computation=False, \
+        storage_mode=StorageMode.FULL, patterns=None, secondary_patterns=None, \
+        max_cached_rows=DEFAULT_MAX_CACHED_ROWS, persist=False, sample_size=DEFAULT_SAMPLE_SIZE, seed=0):
         '''
         @param
             pattern_type: PatternType               type of pattern pairs to compute MI for
             transactions: TransactionManager        transaction manager storing parsed paper data
             write_to_file_during_computation: bool  true to write to MI file when computing MIs, else false
+            storage_mode: StorageMode               FULL to store every MI value, TOP_K to only read in the top K
+                MI values per row (see build_top_k_mutual_information_files), DENSE to attach to a read-only
+                binary matrix (see build_dense_mutual_information_file), QUANTIZED to read in a quantized matrix
+                (see build_quantized_mutual_information_file), LAZY to compute values on first access, APPROXIMATE
+                to estimate values from a sample of the transactions on first access
+            patterns: list(list(int))?              LAZY/APPROXIMATE only, same as in compute_mutual_information
+            secondary_patterns: list(list(int))?    LAZY/APPROXIMATE only, same as in compute_mutual_information (title
+                patterns if pattern type is AUTHOR_TITLE or TITLE_AUTHOR)
+            max_cached_rows: int                    LAZY/APPROXIMATE only, max number of rows kept in the LRU cache
+            persist: bool                           LAZY only, true to append computed values to the lazy MI file
+            sample_size: int                        APPROXIMATE only, number of transactions sampled
+            seed: int                               APPROXIMATE only, seed of the sample
         '''
         # Dictionary of (pattern index a, pattern index b) pairs where
         # a <= b (aka a triangular matrix)
@@ -50,6 +229,47 @@ class MutualInformationManager:
         self.__pattern_type = pattern_type
         self.__transactions = transactions
         self.__write_to_file_during_computation = write_to_file_during_computation
+        self.__storage_mode = storage_mode
+
+        # TOP_K storage: row r's entries are at [r * top_k, (r + 1) * top_k) in both arrays, see TOP_K_HEADER_FORMAT
+        self.__top_k = 0
+        self.__top_k_num_cols = 0
+        self.__top_k_row_norms = array('d')
+        self.__top_k_indices = array('i')
+        self.__top_k_vals = array('d')
+
+        # DENSE storage: flat read-only memoryview of doubles (row major), backed by a mmap or shared memory.
+        # The view is declared first so that it's released before its buffer when this manager is collected
+        self.__dense_vals = None
+        self.__dense_buffer = None
+        self.__dense_num_rows = 0
+        self.__dense_num_cols = 0
+
+        # QUANTIZED storage: the value at (r, c) is quantized_vals[r * num_cols + c] * quantized_scales[r]
+        self.__quantized_scales = array('d')
+        self.__quantized_vals = array('h')
+        self.__quantized_num_rows = 0
+        self.__quantized_num_cols = 0
+
+        # LAZY storage: LRU of rows (row index -> dict(column index, MI)) and the rows whose every column was
+        # computed. Values persisted by earlier runs are kept in __mutual_info_vals, like in FULL mode. Transaction
+        # ids of every pattern looked up so far are cached too, keyed by (is title pattern, pattern index, is sampled)
+        self.__lazy_patterns = patterns
+        self.__lazy_secondary_patterns = secondary_patterns
+        self.__lazy_rows = OrderedDict()
+        self.__lazy_complete_rows = set()
+        self.__lazy_max_cached_rows = max_cached_rows
+        self.__lazy_persist = persist
+        self.__lazy_transaction_ids = {}
+        # Queries may come from several threads (ex: the annotation server)
+        self.__lazy_lock = threading.RLock()
+
+        # APPROXIMATE storage: ids of the sampled transactions and the rows computed from every transaction since
+        self.__approximate_sample_size = sample_size
+        self.__approximate_seed = seed
+        self.__approximate_sample = None
+        self.__approximate_sample_ids = None
+        self.__approximate_refined_rows = set()
 
         if pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR:
             self.__filename =  MutualInformationManager.AUTHOR_AUTHOR_MUTUAL_INFO_FILENAME
@@ -65,12 +285,55 @@ class MutualInformationManager:
             print("ERROR: Invalid pattern type")
             assert False
 
+        if storage_mode == MutualInformationManager.StorageMode.LAZY \
+            or storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            is_symmetric = pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+                or pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+            if not transactions or patterns is None or (secondary_patterns is None) != is_symmetric \
+                or max_cached_rows < 1:
+                print("ERROR: Lazy managers need transactions, patterns, (only if the pattern type is AUTHOR_TITLE " \
+                    "or TITLE_AUTHOR) secondary patterns and room for at least one cached row")
+                assert False
+            # Values persisted by earlier runs are read from (and new ones appended to) the lazy MI file
+            self.__filename = MutualInformationManager.LAZY_MUTUAL_INFO_FILENAMES[pattern_type]
+
+        if storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            if persist:
+                print("ERROR: Approximate MI values can't be persisted")
+                assert False
+            self.__approximate_sample = transactions.sample_transaction_ids(sample_size, seed)
+            self.__approximate_sample_ids = TransactionIdSet(self.__approximate_sample)
+
+    @instrumentation.instrumented_stage("mutual_information.read")
     def read_mutual_information_from_file(self):
         '''
         Reads mutual information from file and populates the mutual information triangular matrix this
         class stores. Note that it assumes that the first pattern index is <= the second pattern index
         (aka that it was generated using this file)
+
+        In TOP_K storage mode, reads the top K file of this manager's pattern type instead. In DENSE storage mode,
+        mmaps the dense binary file read-only instead (without copying it). In QUANTIZED storage mode, reads the
+        quantized file instead. In LAZY storage mode, reads the values persisted by earlier runs (if any)
         '''
+        if self.__storage_mode == MutualInformationManager.StorageMode.TOP_K:
+            self.__read_top_k_mutual_information_from_file()
+            return
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED:
+            self.__read_quantized_mutual_information_from_file()
+            return
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.DENSE:
+            dense_file = open(MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[self.__pattern_type], "rb")
+            # The mapping stays valid after the file is closed
+            self.__attach_dense_buffer(mmap.mmap(dense_file.fileno(), 0, access=mmap.ACCESS_READ))
+            dense_file.close()
+            return
+
+        if (self.__storage_mode == MutualInformationManager.StorageMode.LAZY and not os.path.exists(self.__filename)) \
+            or self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            return
+
         mutual_info_file = open(self.__filename, "r")
         is_first = True
         for line in mutual_info_file:
@@ -100,6 +363,7 @@ class MutualInformationManager:
             self.__mutual_info_vals[(ind_x, ind_y)] = float(mutual_info_lst[2])
         mutual_info_file.close()
 
+    @instrumentation.instrumented_stage("mutual_information.write")
     def write_mutual_information_to_file(self):
         '''
         Writes mutual information computed to a file. Assumes that mutual info has already been computed
@@ -109,7 +373,7 @@ class MutualInformationManager:
             return
 
         # Format: pattern_ind_1 pattern_ind_2 MI
-        mutual_info_file = open(self.__pattern_type, "w")
+        mutual_info_file = open(self.__filename, "w")
         mutual_info_file.write("%d\n" % self.__pattern_type)
 
         for pattern_ind_x, pattern_ind_y in self.__mutual_info_vals:
@@ -117,7 +381,9 @@ class MutualInformationManager:
                 self.__mutual_info_vals[(pattern_ind_x, pattern_ind_y)]))
         mutual_info_file.close()
 
-    def compute_mutual_information(self, patterns, secondary_patterns=None):
+    @instrumentation.instrumented_stage("mutual_information.compute")
+    def compute_mutual_information(self, patterns, secondary_patterns=None, num_processes=1, transaction_ids=None, \
+        secondary_transaction_ids=None, memory_budget=None, resume=False, checkpoint_rows=DEFAULT_CHECKPOINT_ROWS):
         '''
         Computes mutual information for pattern indices (a, b) given that a <= b. In other words, it
         computes a triangular matrix of mutual information values bc MI is symmetric
@@ -129,6 +395,34 @@ class MutualInformationManager:
             secondary_patterns: list(list(int))?    List of secondary patterns to compute MI over if 
                     patterns != secondary patterns (then, we'd compute the MI for each (pattern, secondary pattern)
                     pair). MUST be title patterns if pattern type is AUTHOR_TITLE or TITLE_AUTHOR
+
+            num_processes: int?                     Number of processes the transactions of every pattern are found
+                    with (scanning one shard per process, see TransactionsManager.find_patterns_transactions_ids_in_parallel),
+                    defaults to 1, None for the cpu count
+
+            transaction_ids: list(set(int))?        Ids of the transactions containing each pattern, as found by SPMF
+                    (see PatternRecord), so that they aren't found again by scanning every transaction
+
+            secondary_transaction_ids: list(set(int))?  Same as transaction_ids, for the secondary patterns
+
+            memory_budget: int?                     If set, computes the matrix out of core, in tiles sized so that
+                    about memory_budget bytes are used at a time, straight into the dense MI file (see
+                    build_dense_mutual_information_file) instead of this manager and the MI text file
+
+            resume: bool                            True to continue the computation of a previous run that was
+                    interrupted from its last checkpoint (see below) instead of starting over, if it was computing MI
+                    for the same patterns and transactions
+
+            checkpoint_rows: int                    Number of rows between two checkpoints
+
+        When writing to the MI file during computation (or computing out of core), the rows written so far are
+        committed every checkpoint_rows rows (every row block, out of core): the file is flushed to disk, then a
+        progress manifest (the MI file name + PROGRESS_MANIFEST_SUFFIX) recording the committed rows and the size
+        and hash of the committed part of the file is atomically replaced. Resuming validates the committed part
+        against the manifest (its values are read back into this manager), drops anything written after it and
+        continues from the next row. The manifest is deleted once the whole matrix is written and validated.
+        Progress and an ETA are printed at every checkpoint (in-memory computations are neither checkpointed nor
+        reported).
         '''
         if not self.__transactions:
             print("ERROR: You can't compute mutual information with a null transactions manager")
@@ -140,12 +434,66 @@ class MutualInformationManager:
                     or self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR)):
             print("ERROR: You must and can only pass in a secondary pattern list if the Pattern Type is AUTHOR_TITLE")
             exit(1)
+
+        if resume and not self.__write_to_file_during_computation and memory_budget is None:
+            print("ERROR: Only computations writing to the MI file (or out of core) can be resumed")
+            exit(1)
+        if checkpoint_rows < 1:
+            print("ERROR: checkpoint_rows must be positive")
+            exit(1)
+
+        kernel_misses = MutualInformationManager.__get_kernel_cache_misses()
+        if memory_budget is not None:
+            self.__compute_tiled_mutual_information(patterns, secondary_patterns, num_processes, transaction_ids, \
+                secondary_transaction_ids, memory_budget, resume)
+            MutualInformationManager.__report_kernel_evaluations(kernel_misses)
+            return
         
+        # Transactions of every pattern are found once (in one pass over every shard) rather than once per pair
+        # Important: title patterns are sequential, see find_title_pattern_transactions_ids
+        num_transactions = self.__transactions.get_number_of_transactions()
+        if transaction_ids is not None:
+            x_paper_inds = self.__restrict_transaction_ids(transaction_ids, patterns)
+        else:
+            x_paper_inds = self.__transactions.find_patterns_transactions_ids_in_parallel(patterns, \
+                self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE, num_processes)
+        if not secondary_patterns:
+            y_paper_inds = x_paper_inds
+        elif secondary_transaction_ids is not None:
+            y_paper_inds = self.__restrict_transaction_ids(secondary_transaction_ids, secondary_patterns)
+        else:
+            y_paper_inds = self.__transactions.find_patterns_transactions_ids_in_parallel(secondary_patterns, True, \
+                num_processes)
+
+        def get_num_row_pairs(ind_x):
+            return len(secondary_patterns) if secondary_patterns else len(patterns) - ind_x
+
+        first_row = 0
         if self.__write_to_file_during_computation:
-            mutual_info_file = open(self.__filename, "w")
-            mutual_info_file.write("%d\n" % self.__pattern_type)
+            progress_filename = self.__filename + MutualInformationManager.PROGRESS_MANIFEST_SUFFIX
+            fingerprint = self.__get_computation_fingerprint(patterns, secondary_patterns, num_transactions)
+            progress = MutualInformationManager.__read_progress_manifest(progress_filename, fingerprint) if resume \
+                else None
+            if progress is not None:
+                first_row = self.__read_committed_mutual_information(progress)
+            # Written in binary so that file offsets are byte offsets
+            if first_row > 0:
+                print("Resuming mutual information computation from row %d" % first_row)
+                mutual_info_file = open(self.__filename, "r+b")
+                mutual_info_file.truncate(progress["committed_bytes"])
+                committed_hash = hashlib.sha256(mutual_info_file.read())
+            else:
+                mutual_info_file = open(self.__filename, "w+b")
+                mutual_info_file.write(("%d\n" % self.__pattern_type).encode())
+                committed_hash = hashlib.sha256(("%d\n" % self.__pattern_type).encode())
+            block_lines = []
+
+        total_pairs = sum(get_num_row_pairs(ind_x) for ind_x in range(len(patterns)))
+        done_pairs = sum(get_num_row_pairs(ind_x) for ind_x in range(first_row))
+        start_time = time.time()
+        start_pairs = done_pairs
 
-        for ind_x, pattern_x in enumerate(patterns):
+        for ind_x in range(first_row, len(patterns)):
             if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE \
                 or self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
                 pattern_itr = range(len(secondary_patterns))
@@ -154,14 +502,338 @@ class MutualInformationManager:
 
             for ind_y in pattern_itr:
                 self.__mutual_info_vals[(ind_x, ind_y)] = \
-                    MutualInformationManager.compute_mutual_information_for_pattern_pair(self.__transactions, \
-                        self.__pattern_type, pattern_x, patterns[ind_y])
+                    MutualInformationManager.compute_mutual_information_for_transaction_ids(x_paper_inds[ind_x], \
+                        y_paper_inds[ind_y], num_transactions)
 
                 if self.__write_to_file_during_computation:
-                    mutual_info_file.write("%d %d %f\n" % (ind_x, ind_y, \
-                        self.__mutual_info_vals[(ind_x, ind_y)]))
+                    block_lines.append("%d %d %f\n" % (ind_x, ind_y, self.__mutual_info_vals[(ind_x, ind_y)]))
+            instrumentation.increment("pair_mi_evaluations", get_num_row_pairs(ind_x))
+            done_pairs += get_num_row_pairs(ind_x)
+
+            if (ind_x + 1) % checkpoint_rows != 0 and ind_x + 1 != len(patterns):
+                continue
+            if self.__write_to_file_during_computation:
+                block = ''.join(block_lines).encode()
+                block_lines = []
+                mutual_info_file.write(block)
+                committed_hash.update(block)
+                MutualInformationManager.__commit_progress_manifest(mutual_info_file, progress_filename, {
+                    "fingerprint": fingerprint,
+                    "num_rows": len(patterns),
+                    "committed_rows": ind_x + 1,
+                    "committed_bytes": mutual_info_file.tell(),
+                    "committed_sha256": committed_hash.hexdigest()
+                })
+                MutualInformationManager.__report_progress("rows", ind_x + 1, len(patterns), done_pairs, total_pairs, \
+                    start_pairs, start_time)
+
         if self.__write_to_file_during_computation:
             mutual_info_file.close()
+            # Every pair of the matrix was written exactly once
+            num_lines = sum(1 for _ in open(self.__filename, "r")) - 1
+            if num_lines != total_pairs:
+                print("ERROR: %s has %d MI values, expected %d" % (self.__filename, num_lines, total_pairs))
+                exit(1)
+            if os.path.exists(progress_filename):
+                os.remove(progress_filename)
+        MutualInformationManager.__report_kernel_evaluations(kernel_misses)
+
+    def __get_computation_fingerprint(self, patterns, secondary_patterns, num_transactions, *args):
+        '''
+        @return string, hash identifying the inputs of an MI computation (a resumed computation must have the same)
+        '''
+        # Patterns may be a PatternStore (see pattern_store.py), which is hashed like the list of its patterns
+        patterns = [list(pattern) for pattern in patterns]
+        if secondary_patterns is not None:
+            secondary_patterns = [list(pattern) for pattern in secondary_patterns]
+        return hashlib.sha256(json.dumps([self.__pattern_type, patterns, secondary_patterns, num_transactions] + \
+            list(args)).encode()).hexdigest()
+
+    @staticmethod
+    def __read_progress_manifest(progress_filename, fingerprint):
+        '''
+        @return dict?, progress manifest of the interrupted computation, None if there's none to resume
+        '''
+        if not os.path.exists(progress_filename):
+            print("No progress manifest found (%s), starting from scratch" % progress_filename)
+            return None
+        progress_file = open(progress_filename, "r")
+        progress = json.load(progress_file)
+        progress_file.close()
+        if progress["fingerprint"] != fingerprint:
+            print("Warning: %s was written for other patterns or transactions, starting from scratch" % progress_filename)
+            return None
+        return progress
+
+    @staticmethod
+    def __commit_progress_manifest(output_file, progress_filename, progress):
+        '''
+        Commits everything written to output_file so far: flushes it to disk, then atomically replaces the manifest
+        '''
+        output_file.flush()
+        os.fsync(output_file.fileno())
+        temp_progress_filename = progress_filename + ".tmp"
+        progress_file = open(temp_progress_filename, "w")
+        json.dump(progress, progress_file, indent=4)
+        progress_file.flush()
+        os.fsync(progress_file.fileno())
+        progress_file.close()
+        os.replace(temp_progress_filename, progress_filename)
+
+    @staticmethod
+    def __report_progress(unit, done, total, done_pairs, total_pairs, start_pairs, start_time):
+        '''
+        Prints the progress of a computation and its ETA (from the pairs computed by this run so far)
+        '''
+        elapsed = time.time() - start_time
+        computed_pairs = done_pairs - start_pairs
+        eta = elapsed / computed_pairs * (total_pairs - done_pairs) if computed_pairs else 0.0
+        print("Mutual information: %d/%d %s (%.1f%% of pairs), %.0fs elapsed, ETA %.0fs" % (done, total, unit, \
+            100.0 * done_pairs / total_pairs if total_pairs else 100.0, elapsed, eta))
+
+    def __read_committed_mutual_information(self, progress):
+        '''
+        Validates the committed part of the MI file against its progress manifest, and reads its values
+
+        @return int, number of committed rows (0 if the file doesn't match its manifest)
+        '''
+        if not os.path.exists(self.__filename) or os.path.getsize(self.__filename) < progress["committed_bytes"]:
+            print("Warning: %s is shorter than its last checkpoint, starting from scratch" % self.__filename)
+            return 0
+        mutual_info_file = open(self.__filename, "rb")
+        committed = mutual_info_file.read(progress["committed_bytes"])
+        mutual_info_file.close()
+        if hashlib.sha256(committed).hexdigest() != progress["committed_sha256"]:
+            print("Warning: %s doesn't match its last checkpoint, starting from scratch" % self.__filename)
+            return 0
+
+        lines = committed.decode().splitlines()
+        for line in lines[1 : ]:
+            mutual_info_lst = line.split()
+            self.__mutual_info_vals[(int(mutual_info_lst[0]), int(mutual_info_lst[1]))] = float(mutual_info_lst[2])
+        return progress["committed_rows"]
+
+    @instrumentation.instrumented_stage("mutual_information.compute_tiled")
+    def __compute_tiled_mutual_information(self, patterns, secondary_patterns, num_processes, transaction_ids, \
+        secondary_transaction_ids, memory_budget, resume=False):
+        '''
+        Out of core version of compute_mutual_information (see its parameters), writing the dense MI file of this
+        manager's pattern type (read it back with the DENSE storage mode).
+
+        Rows and columns are split into blocks of consecutive patterns, and the matrix is computed one (row block,
+        column block) tile at a time: only the transactions of the tile's row and column patterns (about a quarter
+        of the budget each) and the tile itself (and its mirror, for symmetric matrices, half of the budget) are
+        held in memory, and every tile is written to the file as soon as it's computed. Unless transaction ids are
+        given, the transactions of a block are found again by scanning every transaction for each tile they're
+        part of (only for the block's patterns), which trades scans for memory. Blocks are sized for the largest
+        possible bitmaps (a bit per transaction, see TransactionIdSet), so no pass is needed to size them.
+        '''
+        # Values are written in native byte order so that they can be attached to without a copy
+        assert sys.byteorder == "little"
+        if memory_budget <= 0:
+            print("ERROR: The memory budget must be positive")
+            exit(1)
+
+        is_symmetric = not secondary_patterns
+        col_patterns = secondary_patterns or patterns
+        col_transaction_ids = transaction_ids if is_symmetric else secondary_transaction_ids
+        is_row_title = self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        is_col_title = is_row_title or not is_symmetric
+        num_rows = len(patterns)
+        num_cols = len(col_patterns)
+        num_transactions = self.__transactions.get_number_of_transactions()
+
+        def get_block_transaction_ids(block, block_patterns, block_transaction_ids, is_title):
+            first, last = block
+            if block_transaction_ids is not None:
+                return self.__restrict_transaction_ids(block_transaction_ids[first : last], block_patterns[first : last])
+            return self.__transactions.find_patterns_transactions_ids_in_parallel(block_patterns[first : last], \
+                is_title, num_processes)
+
+        # A tile and its mirror are 2 * 8 * tile_size^2 bytes
+        max_tile_size = max(1, int(sqrt(memory_budget / 2 / 16)))
+        pattern_bytes = MutualInformationManager.TRANSACTION_ID_SET_BYTES + (num_transactions + 7) // 8
+        max_block_size = max(1, min(max_tile_size, int(memory_budget / 4 / pattern_bytes)))
+        row_blocks = MutualInformationManager.__partition_into_blocks(num_rows, max_block_size)
+        col_blocks = row_blocks if is_symmetric else MutualInformationManager.__partition_into_blocks(num_cols, \
+            max_block_size)
+
+        # The author-title file is shared with title-author managers
+        file_pattern_type = MutualInformationManager.PatternType.AUTHOR_TITLE if not is_symmetric \
+            else self.__pattern_type
+        header_size = struct.calcsize(MutualInformationManager.DENSE_HEADER_FORMAT)
+        dense_filename = MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[self.__pattern_type]
+
+        def get_tile_regions(row_block_ind):
+            '''
+            @return list((int, int, int, int)), (first row, first col, number of rows, number of cols) of every tile
+                (and mirrored tile) of a row block, in the order they're written
+            '''
+            first_row, last_row = row_blocks[row_block_ind]
+            regions = []
+            for col_block_ind in range(row_block_ind if is_symmetric else 0, len(col_blocks)):
+                first_col, last_col = col_blocks[col_block_ind]
+                regions.append((first_row, first_col, last_row - first_row, last_col - first_col))
+                if is_symmetric and col_block_ind != row_block_ind:
+                    regions.append((first_col, first_row, last_col - first_col, last_row - first_row))
+            return regions
+
+        # Row blocks are committed one at a time (with the mirrors of their tiles), along with the hash of the header
+        # and of every tile written so far, in write order. Blocks depend on the budget, so a resumed computation
+        # must use the same one
+        progress_filename = dense_filename + MutualInformationManager.PROGRESS_MANIFEST_SUFFIX
+        fingerprint = self.__get_computation_fingerprint(patterns, secondary_patterns, \
+            self.__transactions.get_number_of_transactions(), row_blocks, col_blocks)
+        progress = MutualInformationManager.__read_progress_manifest(progress_filename, fingerprint) if resume \
+            else None
+        header = struct.pack(MutualInformationManager.DENSE_HEADER_FORMAT, MutualInformationManager.DENSE_MAGIC, \
+            file_pattern_type, num_rows, num_cols)
+        committed_hash = hashlib.sha256(header)
+        first_row_block = 0
+        if progress is not None and os.path.exists(dense_filename) \
+            and os.path.getsize(dense_filename) == header_size + 8 * num_rows * num_cols:
+            # Validate the committed tiles against the manifest before trusting them
+            dense_file = open(dense_filename, "r+b")
+            committed_hash = hashlib.sha256(dense_file.read(header_size))
+            for row_block_ind in range(progress["committed_row_blocks"]):
+                for first_row, first_col, tile_num_rows, tile_num_cols in get_tile_regions(row_block_ind):
+                    for row in range(first_row, first_row + tile_num_rows):
+                        dense_file.seek(header_size + 8 * (row * num_cols + first_col))
+                        committed_hash.update(dense_file.read(8 * tile_num_cols))
+            if committed_hash.hexdigest() == progress["committed_sha256"]:
+                first_row_block = progress["committed_row_blocks"]
+                print("Resuming mutual information computation from row block %d" % first_row_block)
+            else:
+                print("Warning: %s doesn't match its last checkpoint, starting from scratch" % dense_filename)
+                dense_file.close()
+                committed_hash = hashlib.sha256(header)
+        if first_row_block == 0:
+            dense_file = open(dense_filename, "w+b")
+            dense_file.write(header)
+            dense_file.truncate(header_size + 8 * num_rows * num_cols)
+
+        def get_num_block_pairs(row_block_ind):
+            first_row, last_row = row_blocks[row_block_ind]
+            if not is_symmetric:
+                return (last_row - first_row) * num_cols
+            return sum(num_cols - row for row in range(first_row, last_row))
+
+        total_pairs = sum(get_num_block_pairs(row_block_ind) for row_block_ind in range(len(row_blocks)))
+        done_pairs = sum(get_num_block_pairs(row_block_ind) for row_block_ind in range(first_row_block))
+        start_time = time.time()
+        start_pairs = done_pairs
+
+        def write_tile(tile, first_row, first_col, tile_num_rows, tile_num_cols):
+            for tile_row in range(tile_num_rows):
+                row_bytes = tile[tile_row * tile_num_cols : (tile_row + 1) * tile_num_cols].tobytes()
+                dense_file.seek(header_size + 8 * ((first_row + tile_row) * num_cols + first_col))
+                dense_file.write(row_bytes)
+                committed_hash.update(row_bytes)
+
+        for row_block_ind in range(first_row_block, len(row_blocks)):
+            row_block = row_blocks[row_block_ind]
+            row_paper_inds = get_block_transaction_ids(row_block, patterns, transaction_ids, is_row_title)
+            first_row, last_row = row_block
+            tile_num_rows = last_row - first_row
+
+            # Symmetric matrices only compute the tiles on and above the diagonal, and mirror them
+            for col_block_ind in range(row_block_ind if is_symmetric else 0, len(col_blocks)):
+                is_diagonal = is_symmetric and col_block_ind == row_block_ind
+                first_col, last_col = col_blocks[col_block_ind]
+                tile_num_cols = last_col - first_col
+                col_paper_inds = row_paper_inds if is_diagonal else get_block_transaction_ids(col_blocks[col_block_ind], \
+                    col_patterns, col_transaction_ids, is_col_title)
+
+                tile = array('d', [0.0]) * (tile_num_rows * tile_num_cols)
+                mirrored_tile = None
+                if is_symmetric and not is_diagonal:
+                    mirrored_tile = array('d', [0.0]) * (tile_num_rows * tile_num_cols)
+                for tile_row in range(tile_num_rows):
+                    for tile_col in range(tile_row if is_diagonal else 0, tile_num_cols):
+                        mutual_info = MutualInformationManager.compute_mutual_information_for_transaction_ids( \
+                            row_paper_inds[tile_row], col_paper_inds[tile_col], num_transactions)
+                        tile[tile_row * tile_num_cols + tile_col] = mutual_info
+                        if is_diagonal:
+                            tile[tile_col * tile_num_cols + tile_row] = mutual_info
+                        elif mirrored_tile is not None:
+                            mirrored_tile[tile_col * tile_num_rows + tile_row] = mutual_info
+
+                write_tile(tile, first_row, first_col, tile_num_rows, tile_num_cols)
+                if mirrored_tile is not None:
+                    write_tile(mirrored_tile, first_col, first_row, tile_num_cols, tile_num_rows)
+                instrumentation.increment("mutual_information_tiles")
+                # Diagonal tiles are square, and only computed on and above the diagonal
+                instrumentation.increment("pair_mi_evaluations", tile_num_rows * (tile_num_rows + 1) // 2 \
+                    if is_diagonal else tile_num_rows * tile_num_cols)
+                # Drop the column block before the next one is loaded
+                del col_paper_inds
+
+            done_pairs += get_num_block_pairs(row_block_ind)
+            MutualInformationManager.__commit_progress_manifest(dense_file, progress_filename, {
+                "fingerprint": fingerprint,
+                "num_row_blocks": len(row_blocks),
+                "committed_row_blocks": row_block_ind + 1,
+                "committed_sha256": committed_hash.hexdigest()
+            })
+            MutualInformationManager.__report_progress("row blocks", row_block_ind + 1, len(row_blocks), done_pairs, \
+                total_pairs, start_pairs, start_time)
+        dense_file.close()
+
+        if os.path.getsize(dense_filename) != header_size + 8 * num_rows * num_cols:
+            print("ERROR: %s doesn't have the size of a %d x %d matrix" % (dense_filename, num_rows, num_cols))
+            exit(1)
+        if os.path.exists(progress_filename):
+            os.remove(progress_filename)
+
+    @staticmethod
+    def __partition_into_blocks(num_patterns, max_block_size):
+        '''
+        Splits patterns into blocks of at most max_block_size consecutive patterns
+
+        @return list((int, int)), (first pattern index, last pattern index + 1) of every block
+        '''
+        return [(first, min(first + max_block_size, num_patterns)) for first in range(0, num_patterns, max_block_size)]
+
+    def get_transposed_manager(self):
+        '''
+        Creates a manager of the opposite author-title orientation (AUTHOR_TITLE <-> TITLE_AUTHOR) that shares
+        this manager's MI values rather than copying them, so that the author-title file only has to be read
+        once to answer queries in both orientations
+
+        @return MutualInformationManager, sharing this manager's MI values
+        '''
+        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE:
+            transposed_pattern_type = MutualInformationManager.PatternType.TITLE_AUTHOR
+        elif self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+            transposed_pattern_type = MutualInformationManager.PatternType.AUTHOR_TITLE
+        else:
+            print("ERROR: Only author-title and title-author managers can be transposed")
+            assert False
+
+        transposed_manager = MutualInformationManager(transposed_pattern_type, self.__transactions, \
+            storage_mode=self.__storage_mode, patterns=self.__lazy_patterns, \
+            secondary_patterns=self.__lazy_secondary_patterns, max_cached_rows=self.__lazy_max_cached_rows, \
+            persist=self.__lazy_persist, sample_size=self.__approximate_sample_size, seed=self.__approximate_seed)
+        if self.__storage_mode == MutualInformationManager.StorageMode.TOP_K:
+            # Rows of the two orientations are different patterns, so they're stored in separate top K files
+            transposed_manager.read_mutual_information_from_file()
+        elif self.__storage_mode == MutualInformationManager.StorageMode.DENSE:
+            transposed_manager.__attach_dense_buffer(self.__dense_buffer)
+        elif self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED:
+            transposed_manager.__quantized_scales = self.__quantized_scales
+            transposed_manager.__quantized_vals = self.__quantized_vals
+            transposed_manager.__quantized_num_rows = self.__quantized_num_rows
+            transposed_manager.__quantized_num_cols = self.__quantized_num_cols
+        elif self.__storage_mode == MutualInformationManager.StorageMode.LAZY \
+            or self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            # Rows of the two orientations are different patterns, so only the persisted values, the transaction ids
+            # and the lock (which guards both) are shared
+            transposed_manager.__mutual_info_vals = self.__mutual_info_vals
+            transposed_manager.__lazy_transaction_ids = self.__lazy_transaction_ids
+            transposed_manager.__lazy_lock = self.__lazy_lock
+        else:
+            transposed_manager.__mutual_info_vals = self.__mutual_info_vals
+        return transposed_manager
 
     def get_mutual_information_vector(self, pattern_ind, context_model_dim):
         '''
@@ -173,8 +845,39 @@ class MutualInformationManager:
             BE TITLE
             context_model_dim: int        Dimension of context vector
 
+        In TOP_K storage mode, the vector is the sparse top K approximation of the row (every value outside
+        the row's top K is 0)
+
         @return mutual information val, which is represented as list(float)
         '''
+        if self.__storage_mode == MutualInformationManager.StorageMode.TOP_K:
+            mi_vec = [0.0] * context_model_dim
+            for other_pattern_ind, mutual_info in self.get_top_k_mutual_information(pattern_ind, self.__top_k):
+                if other_pattern_ind < context_model_dim:
+                    mi_vec[other_pattern_ind] = mutual_info
+            return mi_vec
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.DENSE:
+            if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+                # Title-author vectors are columns of the author-title matrix
+                return self.__dense_vals[pattern_ind : : self.__dense_num_cols][ : context_model_dim].tolist()
+            row_start = pattern_ind * self.__dense_num_cols
+            return self.__dense_vals[row_start : row_start + context_model_dim].tolist()
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED:
+            num_cols = self.__quantized_num_cols
+            if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+                # Title-author vectors are columns of the author-title matrix, every value has its own row's scale
+                return [val * scale for val, scale in \
+                    zip(self.__quantized_vals[pattern_ind : : num_cols][ : context_model_dim], self.__quantized_scales)]
+            scale = self.__quantized_scales[pattern_ind]
+            row_start = pattern_ind * num_cols
+            return [val * scale for val in self.__quantized_vals[row_start : row_start + context_model_dim]]
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.LAZY \
+            or self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            return self.__get_lazy_row(pattern_ind, context_model_dim)
+
         mi_vec = []
 
         for other_pattern_ind in range(context_model_dim):
@@ -199,8 +902,32 @@ class MutualInformationManager:
             pattern_index_x: int        Pattern index to find MI for
             pattern_index_y: int        Pattern index to find MI for
 
+        In TOP_K storage mode, only values within the top K of either pattern's row can be found (raises
+        KeyError otherwise, like a missing pair in FULL mode)
+
         @return mutual information val, which is represented as a float
         '''
+        if self.__storage_mode == MutualInformationManager.StorageMode.TOP_K:
+            return self.__get_top_k_mutual_information_val(pattern_index_x, pattern_index_y)
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.DENSE:
+            if pattern_index_x >= self.__dense_num_rows or pattern_index_y >= self.__dense_num_cols:
+                raise KeyError((pattern_index_x, pattern_index_y))
+            return self.__dense_vals[pattern_index_x * self.__dense_num_cols + pattern_index_y]
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED:
+            if pattern_index_x >= self.__quantized_num_rows or pattern_index_y >= self.__quantized_num_cols:
+                raise KeyError((pattern_index_x, pattern_index_y))
+            return self.__quantized_vals[pattern_index_x * self.__quantized_num_cols + pattern_index_y] \
+                * self.__quantized_scales[pattern_index_x]
+
+        if self.__storage_mode == MutualInformationManager.StorageMode.LAZY \
+            or self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE:
+            # Rows are titles for TITLE_AUTHOR, but x is always the author index
+            if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+                return self.__get_lazy_mutual_information_val(pattern_index_y, pattern_index_x)
+            return self.__get_lazy_mutual_information_val(pattern_index_x, pattern_index_y)
+
         if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
             or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
             if pattern_index_x <= pattern_index_y:
@@ -211,6 +938,677 @@ class MutualInformationManager:
             ind_tup = (pattern_index_x, pattern_index_y)
         return self.__mutual_info_vals[ind_tup]
 
+    def get_storage_mode(self):
+        return self.__storage_mode
+
+    def get_mutual_information_filename(self):
+        '''
+        @return string?, the file read_mutual_information_from_file reads in this manager's storage mode, None for
+            LAZY and APPROXIMATE managers (whose values are computed from the transactions)
+        '''
+        if self.__storage_mode == MutualInformationManager.StorageMode.TOP_K:
+            return MutualInformationManager.TOP_K_MUTUAL_INFO_FILENAMES[self.__pattern_type]
+        if self.__storage_mode == MutualInformationManager.StorageMode.DENSE:
+            return MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[self.__pattern_type]
+        if self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED:
+            return MutualInformationManager.QUANTIZED_MUTUAL_INFO_FILENAMES[self.__pattern_type]
+        if self.__storage_mode == MutualInformationManager.StorageMode.FULL:
+            return self.__filename
+        return None
+
+    def get_top_k(self):
+        '''
+        @return int, the number of MI values stored per row in TOP_K storage mode
+        '''
+        return self.__top_k
+
+    def get_top_k_mutual_information(self, pattern_ind, k):
+        '''
+        Gets the k highest MI values of a pattern's row without touching the rest of the row. Only available
+        in TOP_K storage mode and for k <= get_top_k().
+
+        @param
+            pattern_ind: int        Pattern index of the row. IF AUTHOR-TITLE, MUST BE AUTHOR. IF TITLE-AUTHOR, MUST
+                BE TITLE
+            k: int                  Number of values to get
+
+        @return list((int, float)), up to k (other pattern index, MI) pairs sorted in descending MI
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.TOP_K
+        if k > self.__top_k:
+            print("ERROR: Only the top %d MI values per row were stored, can't get the top %d" % (self.__top_k, k))
+            assert False
+
+        row_start = pattern_ind * self.__top_k
+        indices = self.__top_k_indices[row_start : row_start + k]
+        # Rows with < k entries are padded with -1
+        if -1 in indices:
+            indices = indices[ : indices.index(-1)]
+        return list(zip(indices, self.__top_k_vals[row_start : row_start + len(indices)]))
+
+    def get_row_norm(self, pattern_ind):
+        '''
+        @return float, L2 norm of a pattern's full MI vector (TOP_K storage mode only)
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.TOP_K
+        return self.__top_k_row_norms[pattern_ind]
+
+    def __get_lazy_row(self, row, context_model_dim):
+        with self.__lazy_lock:
+            if row in self.__lazy_complete_rows:
+                self.__lazy_rows.move_to_end(row)
+                row_vals = self.__lazy_rows[row]
+            else:
+                num_cols = len(self.__get_lazy_patterns()[1])
+                if row < 0 or row >= len(self.__get_lazy_patterns()[0]):
+                    raise KeyError(row)
+                row_vals = self.__cache_lazy_row(row)
+                self.__compute_lazy_mutual_information_vals(row, [col for col in range(num_cols) \
+                    if col not in row_vals])
+                self.__lazy_complete_rows.add(row)
+            return [row_vals[col] for col in range(context_model_dim)]
+
+    def __get_lazy_mutual_information_val(self, row, col):
+        with self.__lazy_lock:
+            row_patterns, col_patterns = self.__get_lazy_patterns()
+            if row < 0 or row >= len(row_patterns) or col < 0 or col >= len(col_patterns):
+                raise KeyError((row, col))
+            row_vals = self.__cache_lazy_row(row)
+            if col not in row_vals:
+                self.__compute_lazy_mutual_information_vals(row, [col])
+            return row_vals[col]
+
+    def __get_lazy_patterns(self):
+        '''
+        @return (list(list(int)), list(list(int))), patterns of the rows and patterns of the columns
+        '''
+        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE:
+            return self.__lazy_patterns, self.__lazy_secondary_patterns
+        if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+            return self.__lazy_secondary_patterns, self.__lazy_patterns
+        return self.__lazy_patterns, self.__lazy_patterns
+
+    def __cache_lazy_row(self, row):
+        '''
+        @return dict(int, float), the LRU's (possibly partial) row, which is added (and the least recently used
+            row evicted if the cache is full) if it wasn't cached
+        '''
+        if row in self.__lazy_rows:
+            self.__lazy_rows.move_to_end(row)
+            return self.__lazy_rows[row]
+
+        row_vals = self.__lazy_rows[row] = {}
+        if len(self.__lazy_rows) > self.__lazy_max_cached_rows:
+            evicted_row, _ = self.__lazy_rows.popitem(last=False)
+            self.__lazy_complete_rows.discard(evicted_row)
+        return row_vals
+
+    def __compute_lazy_mutual_information_vals(self, row, cols):
+        '''
+        Fills in the cached row's values of cols, from (in order) the other cached rows of symmetric matrices, the
+        persisted values or the transactions (or their sample, for unrefined rows of APPROXIMATE managers)
+        '''
+        is_symmetric = self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        is_row_sampled = self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE \
+            and row not in self.__approximate_refined_rows
+        row_vals = self.__lazy_rows[row]
+        computed_vals = []
+        kernel_misses = MutualInformationManager.__get_kernel_cache_misses()
+        for col in cols:
+            is_sampled = is_row_sampled
+            # Persisted values are keyed like in FULL mode: smaller index first if symmetric, else author first
+            if is_symmetric:
+                ind_tup = (min(row, col), max(row, col))
+                # Pairs of a refined row are exact in both directions (see refine_rows), so the cached value of the
+                # mirrored pair is exact exactly when this one has to be
+                is_sampled = is_sampled and col not in self.__approximate_refined_rows
+                if col in self.__lazy_rows and row in self.__lazy_rows[col]:
+                    row_vals[col] = self.__lazy_rows[col][row]
+                    continue
+            elif self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+                ind_tup = (col, row)
+            else:
+                ind_tup = (row, col)
+
+            if ind_tup in self.__mutual_info_vals:
+                row_vals[col] = self.__mutual_info_vals[ind_tup]
+                continue
+
+            if is_sampled:
+                row_vals[col] = self.__estimate_mutual_information(ind_tup)[0]
+                continue
+
+            row_vals[col] = MutualInformationManager.compute_mutual_information_for_transaction_ids( \
+                self.__get_lazy_transaction_ids(ind_tup[0], False), self.__get_lazy_transaction_ids(ind_tup[1], True), \
+                self.__transactions.get_number_of_transactions())
+            computed_vals.append((ind_tup, row_vals[col]))
+
+        instrumentation.increment("pair_mi_evaluations", len(computed_vals))
+        MutualInformationManager.__report_kernel_evaluations(kernel_misses)
+        if self.__lazy_persist and computed_vals:
+            # Persisted values are kept in memory, so that they're only appended to the file once
+            is_new_file = not os.path.exists(self.__filename)
+            mutual_info_file = open(self.__filename, "a")
+            if is_new_file:
+                mutual_info_file.write("%d\n" % (self.__pattern_type if is_symmetric \
+                    else MutualInformationManager.PatternType.AUTHOR_TITLE))
+            for (ind_x, ind_y), mutual_info in computed_vals:
+                mutual_info_file.write("%d %d %f\n" % (ind_x, ind_y, mutual_info))
+                self.__mutual_info_vals[(ind_x, ind_y)] = mutual_info
+            mutual_info_file.close()
+
+    def __restrict_transaction_ids(self, transaction_ids, patterns):
+        '''
+        @param
+            transaction_ids: list(set(int))     Transactions of every pattern, as found by SPMF over all of data.csv
+            patterns: list(list(int))           Patterns the transactions belong to
+        @return list(TransactionIdSet), transactions of every pattern among the transactions read in (see
+            maximum_line_count)
+        '''
+        if len(transaction_ids) != len(patterns):
+            print("ERROR: Got transaction ids for %d patterns, but there are %d patterns" % (len(transaction_ids), \
+                len(patterns)))
+            exit(1)
+        num_transactions = self.__transactions.get_number_of_transactions()
+        return [(paper_inds if isinstance(paper_inds, TransactionIdSet) else TransactionIdSet(paper_inds)) \
+            .truncate(num_transactions) for paper_inds in transaction_ids]
+
+    def seed_transaction_ids(self, transaction_ids, secondary_transaction_ids=None):
+        '''
+        Seeds the transactions of every pattern with the ones SPMF found while mining them (LAZY/APPROXIMATE storage
+        mode only), so they aren't found again by scanning every transaction. Sampled transactions of seeded patterns
+        are taken from the seeded ones too.
+
+        @param
+            transaction_ids: list(set(int))             Transactions of every pattern (author patterns if author-title
+                or title-author), see compute_mutual_information
+            secondary_transaction_ids: list(set(int))?  Transactions of every secondary (title) pattern
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.LAZY \
+            or self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE
+        patterns, secondary_patterns = self.__lazy_patterns, self.__lazy_secondary_patterns
+        with self.__lazy_lock:
+            is_title = self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+            for pattern_ind, paper_inds in enumerate(self.__restrict_transaction_ids(transaction_ids, patterns)):
+                self.__lazy_transaction_ids[(is_title, pattern_ind, False)] = paper_inds
+            if secondary_transaction_ids is not None and secondary_patterns:
+                for pattern_ind, paper_inds in enumerate(self.__restrict_transaction_ids(secondary_transaction_ids, \
+                    secondary_patterns)):
+                    self.__lazy_transaction_ids[(True, pattern_ind, False)] = paper_inds
+
+    def __get_lazy_transaction_ids(self, pattern_ind, is_y, is_sampled=False):
+        '''
+        @param
+            pattern_ind: int    Index of the pattern, first (x, author if author-title) or second (y) of a pair
+            is_y: bool          True if it's the second pattern of the pair
+            is_sampled: bool    True to only look for the pattern in the sampled transactions
+        @return TransactionIdSet, ids of the (sampled) transactions containing the pattern
+        '''
+        is_title = self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE \
+            or (is_y and self.__pattern_type != MutualInformationManager.PatternType.AUTHOR_AUTHOR)
+        key = (is_title, pattern_ind, is_sampled)
+        if key not in self.__lazy_transaction_ids and is_sampled and (is_title, pattern_ind, False) \
+            in self.__lazy_transaction_ids:
+            self.__lazy_transaction_ids[key] = self.__lazy_transaction_ids[(is_title, pattern_ind, False)] \
+                .intersection(self.__approximate_sample_ids)
+        if key not in self.__lazy_transaction_ids:
+            transaction_ids = self.__approximate_sample if is_sampled else None
+            # Important: Don't use sets when finding title pattern transaction ids because title patterns are
+            # sequential
+            if is_title:
+                pattern = (self.__lazy_secondary_patterns or self.__lazy_patterns)[pattern_ind]
+                self.__lazy_transaction_ids[key] = self.__transactions.find_title_pattern_transactions_ids(pattern, \
+                    transaction_ids)
+            else:
+                self.__lazy_transaction_ids[key] = self.__transactions.find_author_pattern_transactions_ids( \
+                    set(self.__lazy_patterns[pattern_ind]), transaction_ids)
+        return self.__lazy_transaction_ids[key]
+
+    def __estimate_mutual_information(self, ind_tup):
+        '''
+        Estimates the MI of a pair from the sampled transactions
+
+        @param ind_tup: (int, int)     Pair, keyed like persisted values (x is the author if author-title)
+        @return (float, float, float), (estimate, lower bound, upper bound), see APPROXIMATE_CONFIDENCE_Z
+        '''
+        x_paper_inds = self.__get_lazy_transaction_ids(ind_tup[0], False, True)
+        y_paper_inds = self.__get_lazy_transaction_ids(ind_tup[1], True, True)
+        sample_size = len(self.__approximate_sample)
+        num_transactions = self.__transactions.get_number_of_transactions()
+
+        # Supports are scaled up to the whole corpus so that smoothing is the same as for exact values
+        def compute_mutual_information(p_x, p_y, p_x_y):
+            # Keep the joint probability consistent with the marginals
+            p_x_y = min(max(p_x_y, p_x + p_y - 1, 0.0), p_x, p_y)
+            # Scaled counts are fractional and rarely repeat, so they bypass the cache
+            return MutualInformationManager.__compute_mutual_information_kernel(p_x * num_transactions, \
+                p_y * num_transactions, p_x_y * num_transactions, num_transactions)
+
+        z = MutualInformationManager.APPROXIMATE_CONFIDENCE_Z
+        # The sample is drawn without replacement, so its effective size grows to infinity (and intervals shrink to
+        # the estimate) as it gets close to the whole corpus (finite population correction)
+        if sample_size >= num_transactions:
+            effective_sample_size = float("inf")
+        else:
+            effective_sample_size = sample_size * (num_transactions - 1) / (num_transactions - sample_size)
+        def get_wilson_interval(count):
+            p = count / sample_size
+            if effective_sample_size == float("inf"):
+                return (p, p, p)
+            denom = 1 + z ** 2 / effective_sample_size
+            center = (p + z ** 2 / (2 * effective_sample_size)) / denom
+            half_width = z * sqrt(p * (1 - p) / effective_sample_size + z ** 2 / (4 * effective_sample_size ** 2)) / denom
+            return (max(center - half_width, 0.0), p, min(center + half_width, 1.0))
+
+        p_x_interval = get_wilson_interval(len(x_paper_inds))
+        p_y_interval = get_wilson_interval(len(y_paper_inds))
+        p_x_y_interval = get_wilson_interval(x_paper_inds.intersection_cardinality(y_paper_inds))
+
+        estimate = compute_mutual_information(p_x_interval[1], p_y_interval[1], p_x_y_interval[1])
+        candidates = [estimate]
+        for p_x in p_x_interval:
+            for p_y in p_y_interval:
+                # For fixed supports, MI is convex in the joint support and minimal at independence, so the lowest
+                # value within the interval is as close to independence as it gets
+                joint_supports = list(p_x_y_interval) + [min(max(p_x * p_y, p_x_y_interval[0]), p_x_y_interval[2])]
+                candidates.extend(compute_mutual_information(p_x, p_y, p_x_y) for p_x_y in joint_supports)
+        return estimate, min(candidates), max(candidates)
+
+    def get_mutual_information_bounds(self, pattern_index_x, pattern_index_y):
+        '''
+        Gets confidence bounds on an MI value (APPROXIMATE storage mode only), see APPROXIMATE_CONFIDENCE_Z. Takes
+        indices in the same order as get_mutual_information. Values of refined rows are exact, so their bounds are
+        the value itself.
+
+        @return (float, float), (lower bound, upper bound)
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE
+        mutual_info = self.get_mutual_information(pattern_index_x, pattern_index_y)
+        # Rows are titles for TITLE_AUTHOR, but x is always the author index
+        row = pattern_index_y if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR \
+            else pattern_index_x
+        if row in self.__approximate_refined_rows:
+            return mutual_info, mutual_info
+
+        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
+            if pattern_index_y in self.__approximate_refined_rows:
+                return mutual_info, mutual_info
+            ind_tup = (min(pattern_index_x, pattern_index_y), max(pattern_index_x, pattern_index_y))
+        else:
+            ind_tup = (pattern_index_x, pattern_index_y)
+        with self.__lazy_lock:
+            _, lower_bound, upper_bound = self.__estimate_mutual_information(ind_tup)
+        return lower_bound, upper_bound
+
+    def refine_rows(self, rows):
+        '''
+        Recomputes rows exactly, from every transaction (APPROXIMATE storage mode only). Refined rows stay exact
+        even after they're evicted from the cache. If the matrix is symmetric, the refined rows' columns are exact too.
+
+        @param rows: list(int)      Rows to refine. IF AUTHOR-TITLE, MUST BE AUTHORS. IF TITLE-AUTHOR, MUST BE TITLES
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.APPROXIMATE
+        is_symmetric = self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        num_cols = len(self.__get_lazy_patterns()[1])
+        with self.__lazy_lock:
+            for row in rows:
+                self.__approximate_refined_rows.add(row)
+                self.__lazy_rows.pop(row, None)
+                self.__lazy_complete_rows.discard(row)
+                # The other cached rows' estimates of the refined column are dropped before the row is recomputed
+                # (so that it doesn't reuse them), then replaced with its exact values
+                mirrored_rows = []
+                if is_symmetric:
+                    for other_row, other_row_vals in self.__lazy_rows.items():
+                        if other_row_vals.pop(row, None) is not None:
+                            mirrored_rows.append(other_row)
+                row_vals = self.__get_lazy_row(row, num_cols)
+                for other_row in mirrored_rows:
+                    if other_row in self.__lazy_rows:
+                        self.__lazy_rows[other_row][row] = row_vals[other_row]
+
+    def get_max_quantization_error(self, pattern_ind=None):
+        '''
+        Gets the maximum absolute difference between a quantized MI value and the (text file) MI value it was
+        quantized from. Only available in QUANTIZED storage mode.
+
+        @param pattern_ind: int (optional)      Row to get the bound of (of the author-title matrix for both
+            author-title and title-author managers), defaults to the bound over every row
+        @return float, the error bound
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.QUANTIZED
+        if pattern_ind is not None:
+            return self.__quantized_scales[pattern_ind] / 2
+        return max(self.__quantized_scales, default=0.0) / 2
+
+    @staticmethod
+    @instrumentation.instrumented_stage("mutual_information.build_quantized")
+    def build_quantized_mutual_information_file(pattern_type, bits=16):
+        '''
+        Converts a full MI (text) file into a quantized binary matrix file, in two passes over the text file (the
+        first one finds the matrix dimensions and every row's scale). Only the quantized matrix is held in memory.
+
+        @param
+            pattern_type: PatternType       AUTHOR_AUTHOR, AUTHOR_TITLE (or TITLE_AUTHOR) or TITLE_TITLE
+            bits: int                       16 or 8 bits per quantized value
+        '''
+        assert bits in MutualInformationManager.QUANTIZED_TYPECODES
+        max_quantized_val = 2 ** (bits - 1) - 1
+        is_symmetric = pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        full_filename = MutualInformationManager(pattern_type).__filename
+
+        # First pass finds the matrix dimensions and the largest absolute value of every row
+        row_max_abs = {}
+        num_rows = 0
+        num_cols = 0
+        mutual_info_file = open(full_filename, "r")
+        file_pattern_type = int(mutual_info_file.readline())
+        for line in mutual_info_file:
+            mutual_info_lst = line.split()
+            ind_x = int(mutual_info_lst[0])
+            ind_y = int(mutual_info_lst[1])
+            abs_mutual_info = abs(float(mutual_info_lst[2]))
+            num_rows = max(num_rows, ind_x + 1)
+            num_cols = max(num_cols, ind_y + 1)
+            row_max_abs[ind_x] = max(row_max_abs.get(ind_x, 0.0), abs_mutual_info)
+            if is_symmetric:
+                row_max_abs[ind_y] = max(row_max_abs.get(ind_y, 0.0), abs_mutual_info)
+        if is_symmetric:
+            num_rows = num_cols = max(num_rows, num_cols)
+        else:
+            # Title-author vectors are columns of the author-title matrix, so all of its rows share one scale to
+            # keep the order of the values within a column (equal values stay equal once quantized)
+            matrix_max_abs = max(row_max_abs.values(), default=0.0)
+            row_max_abs = dict.fromkeys(row_max_abs, matrix_max_abs)
+        scales = array('d', [row_max_abs.get(row, 0.0) / max_quantized_val for row in range(num_rows)])
+
+        def quantize(row, mutual_info):
+            scale = scales[row]
+            return round(mutual_info / scale) if scale else 0
+
+        # Second pass quantizes the matrix
+        quantized_vals = array(MutualInformationManager.QUANTIZED_TYPECODES[bits], [0]) * (num_rows * num_cols)
+        mutual_info_file.seek(0)
+        mutual_info_file.readline()
+        for line in mutual_info_file:
+            mutual_info_lst = line.split()
+            ind_x = int(mutual_info_lst[0])
+            ind_y = int(mutual_info_lst[1])
+            mutual_info = float(mutual_info_lst[2])
+            quantized_vals[ind_x * num_cols + ind_y] = quantize(ind_x, mutual_info)
+            if is_symmetric:
+                quantized_vals[ind_y * num_cols + ind_x] = quantize(ind_y, mutual_info)
+        mutual_info_file.close()
+
+        quantized_file = open(MutualInformationManager.QUANTIZED_MUTUAL_INFO_FILENAMES[pattern_type], "wb")
+        quantized_file.write(struct.pack(MutualInformationManager.QUANTIZED_HEADER_FORMAT, \
+            MutualInformationManager.QUANTIZED_MAGIC, file_pattern_type, num_rows, num_cols, bits))
+        for arr in (scales, quantized_vals):
+            if sys.byteorder != "little":
+                arr.byteswap()
+            arr.tofile(quantized_file)
+        quantized_file.close()
+
+    def __read_quantized_mutual_information_from_file(self):
+        quantized_file = open(MutualInformationManager.QUANTIZED_MUTUAL_INFO_FILENAMES[self.__pattern_type], "rb")
+        magic, pattern_type, num_rows, num_cols, bits = struct.unpack(MutualInformationManager.QUANTIZED_HEADER_FORMAT, \
+            quantized_file.read(struct.calcsize(MutualInformationManager.QUANTIZED_HEADER_FORMAT)))
+        assert magic == MutualInformationManager.QUANTIZED_MAGIC
+        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
+            assert pattern_type == self.__pattern_type
+        else:
+            assert pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE
+
+        self.__quantized_num_rows = num_rows
+        self.__quantized_num_cols = num_cols
+        self.__quantized_scales = array('d')
+        self.__quantized_scales.fromfile(quantized_file, num_rows)
+        self.__quantized_vals = array(MutualInformationManager.QUANTIZED_TYPECODES[bits])
+        self.__quantized_vals.fromfile(quantized_file, num_rows * num_cols)
+        if sys.byteorder != "little":
+            for arr in (self.__quantized_scales, self.__quantized_vals):
+                arr.byteswap()
+        quantized_file.close()
+
+    @staticmethod
+    @instrumentation.instrumented_stage("mutual_information.build_dense")
+    def build_dense_mutual_information_file(pattern_type):
+        '''
+        Converts a full MI (text) file into a dense binary matrix file. Values are written straight into a
+        writable mmap of the output file, so no MI values are held in memory.
+
+        @param pattern_type: PatternType       AUTHOR_AUTHOR, AUTHOR_TITLE (or TITLE_AUTHOR) or TITLE_TITLE
+        '''
+        # Values are written in native byte order so that they can be attached to without a copy
+        assert sys.byteorder == "little"
+        is_symmetric = pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        full_filename = MutualInformationManager(pattern_type).__filename
+
+        # First pass finds the matrix dimensions
+        num_rows = 0
+        num_cols = 0
+        mutual_info_file = open(full_filename, "r")
+        file_pattern_type = int(mutual_info_file.readline())
+        for line in mutual_info_file:
+            mutual_info_lst = line.split()
+            num_rows = max(num_rows, int(mutual_info_lst[0]) + 1)
+            num_cols = max(num_cols, int(mutual_info_lst[1]) + 1)
+        if is_symmetric:
+            num_rows = num_cols = max(num_rows, num_cols)
+
+        header_size = struct.calcsize(MutualInformationManager.DENSE_HEADER_FORMAT)
+        dense_file = open(MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[pattern_type], "w+b")
+        dense_file.write(struct.pack(MutualInformationManager.DENSE_HEADER_FORMAT, MutualInformationManager.DENSE_MAGIC, \
+            file_pattern_type, num_rows, num_cols))
+        dense_file.truncate(header_size + 8 * num_rows * num_cols)
+        dense_buffer = mmap.mmap(dense_file.fileno(), 0)
+        dense_vals = memoryview(dense_buffer)[header_size : ].cast('d')
+
+        # Second pass fills in the matrix
+        mutual_info_file.seek(0)
+        mutual_info_file.readline()
+        for line in mutual_info_file:
+            mutual_info_lst = line.split()
+            ind_x = int(mutual_info_lst[0])
+            ind_y = int(mutual_info_lst[1])
+            mutual_info = float(mutual_info_lst[2])
+            dense_vals[ind_x * num_cols + ind_y] = mutual_info
+            if is_symmetric:
+                dense_vals[ind_y * num_cols + ind_x] = mutual_info
+        mutual_info_file.close()
+
+        dense_vals.release()
+        dense_buffer.close()
+        dense_file.close()
+
+    @staticmethod
+    def publish_mutual_information_to_shared_memory(pattern_type, name=None):
+        '''
+        Copies a dense binary MI file into a new shared memory block that worker processes can attach to (see
+        attach_to_shared_memory). The caller owns the block: keep it alive while workers use it, then close() and
+        unlink() it.
+
+        @param
+            pattern_type: PatternType       Pattern type whose dense file to publish
+            name: string (optional)         Name of the shared memory block (a unique name is generated otherwise)
+        @return SharedMemory, the published block (its name is shm.name)
+        '''
+        dense_filename = MutualInformationManager.DENSE_MUTUAL_INFO_FILENAMES[pattern_type]
+        shm = shared_memory.SharedMemory(name=name, create=True, size=os.path.getsize(dense_filename))
+        dense_file = open(dense_filename, "rb")
+        dense_file.readinto(shm.buf)
+        dense_file.close()
+        return shm
+
+    def attach_to_shared_memory(self, name, untrack=False):
+        '''
+        Attaches this (DENSE storage mode) manager to a matrix published with
+        publish_mutual_information_to_shared_memory, read-only and without copying it
+
+        @param
+            name: string        Name of the shared memory block
+            untrack: bool       True if this process wasn't started by the publisher (ex: a separate service). Such a
+                process has its own resource tracker, which would unlink the block when this process exits even
+                though the publisher owns it. Workers started by the publisher share its tracker and must keep False
+        '''
+        assert self.__storage_mode == MutualInformationManager.StorageMode.DENSE
+        shm = shared_memory.SharedMemory(name=name)
+        if untrack:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        self.__attach_dense_buffer(shm)
+
+    def close(self):
+        '''
+        Detaches a DENSE storage mode manager from its mmap or shared memory block (doesn't unlink shared memory).
+        Managers created from this one with get_transposed_manager share the block and must be closed first.
+        '''
+        if self.__dense_vals is not None:
+            self.__dense_vals.release()
+            self.__dense_vals = None
+            self.__dense_buffer.close()
+            self.__dense_buffer = None
+
+    def __attach_dense_buffer(self, dense_buffer):
+        '''
+        @param dense_buffer: mmap or SharedMemory     Buffer holding a dense file (header + matrix)
+        '''
+        buf = dense_buffer.buf if isinstance(dense_buffer, shared_memory.SharedMemory) else dense_buffer
+        header_size = struct.calcsize(MutualInformationManager.DENSE_HEADER_FORMAT)
+        magic, pattern_type, num_rows, num_cols = struct.unpack(MutualInformationManager.DENSE_HEADER_FORMAT, \
+            buf[ : header_size])
+        assert magic == MutualInformationManager.DENSE_MAGIC
+        if self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE:
+            assert pattern_type == self.__pattern_type
+        else:
+            assert pattern_type == MutualInformationManager.PatternType.AUTHOR_TITLE
+        # Matrices are stored little endian (see build_dense_mutual_information_file)
+        assert sys.byteorder == "little"
+
+        self.__dense_buffer = dense_buffer
+        self.__dense_vals = memoryview(buf)[header_size : header_size + 8 * num_rows * num_cols].toreadonly().cast('d')
+        self.__dense_num_rows = num_rows
+        self.__dense_num_cols = num_cols
+
+    @staticmethod
+    @instrumentation.instrumented_stage("mutual_information.build_top_k")
+    def build_top_k_mutual_information_files(pattern_type, k):
+        '''
+        Streams a full MI file and writes the top K file(s) built from it. Only O(P * K) values are held in
+        memory at a time (one bounded heap per row). Reading the author-title file writes both the author-title
+        and the title-author top K files.
+
+        @param
+            pattern_type: PatternType       AUTHOR_AUTHOR, AUTHOR_TITLE (or TITLE_AUTHOR) or TITLE_TITLE
+            k: int                          Number of MI values to keep per row
+        '''
+        is_symmetric = pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+        full_filename = MutualInformationManager(pattern_type).__filename
+
+        # Min heaps of (MI, -column index) so that ties are broken in favor of the smaller index
+        row_heaps = {}
+        row_square_sums = {}
+        col_heaps = {}
+        col_square_sums = {}
+        def push(heaps, square_sums, row, col, mutual_info):
+            heap = heaps.setdefault(row, [])
+            if len(heap) < k:
+                heapq.heappush(heap, (mutual_info, -col))
+            else:
+                heapq.heappushpop(heap, (mutual_info, -col))
+            square_sums[row] = square_sums.get(row, 0) + mutual_info ** 2
+
+        mutual_info_file = open(full_filename, "r")
+        mutual_info_file.readline() # Skip the pattern type
+        for line in mutual_info_file:
+            mutual_info_lst = line.split()
+            ind_x = int(mutual_info_lst[0])
+            ind_y = int(mutual_info_lst[1])
+            mutual_info = float(mutual_info_lst[2])
+
+            push(row_heaps, row_square_sums, ind_x, ind_y, mutual_info)
+            if is_symmetric:
+                if ind_x != ind_y:
+                    push(row_heaps, row_square_sums, ind_y, ind_x, mutual_info)
+            else:
+                push(col_heaps, col_square_sums, ind_y, ind_x, mutual_info)
+        mutual_info_file.close()
+
+        num_rows = max(row_heaps) + 1 if row_heaps else 0
+        if is_symmetric:
+            MutualInformationManager.__write_top_k_file(pattern_type, k, row_heaps, row_square_sums, num_rows)
+        else:
+            num_cols = max(col_heaps) + 1 if col_heaps else 0
+            MutualInformationManager.__write_top_k_file(MutualInformationManager.PatternType.AUTHOR_TITLE, k, \
+                row_heaps, row_square_sums, num_cols)
+            MutualInformationManager.__write_top_k_file(MutualInformationManager.PatternType.TITLE_AUTHOR, k, \
+                col_heaps, col_square_sums, num_rows)
+
+    @staticmethod
+    def __write_top_k_file(pattern_type, k, row_heaps, row_square_sums, num_cols):
+        num_rows = max(row_heaps) + 1 if row_heaps else 0
+        row_norms = array('d', [row_square_sums.get(row, 0) ** 0.5 for row in range(num_rows)])
+        indices = array('i', [-1] * (num_rows * k))
+        vals = array('d', [0.0] * (num_rows * k))
+
+        for row, heap in row_heaps.items():
+            for ind, (mutual_info, negated_col) in enumerate(sorted(heap, reverse=True)):
+                indices[row * k + ind] = -negated_col
+                vals[row * k + ind] = mutual_info
+
+        top_k_file = open(MutualInformationManager.TOP_K_MUTUAL_INFO_FILENAMES[pattern_type], "wb")
+        top_k_file.write(struct.pack(MutualInformationManager.TOP_K_HEADER_FORMAT, MutualInformationManager.TOP_K_MAGIC, \
+            pattern_type, num_rows, num_cols, k))
+        for arr in (row_norms, indices, vals):
+            if sys.byteorder != "little":
+                arr.byteswap()
+            arr.tofile(top_k_file)
+        top_k_file.close()
+
+    def __read_top_k_mutual_information_from_file(self):
+        top_k_file = open(MutualInformationManager.TOP_K_MUTUAL_INFO_FILENAMES[self.__pattern_type], "rb")
+        magic, pattern_type, num_rows, num_cols, k = struct.unpack(MutualInformationManager.TOP_K_HEADER_FORMAT, \
+            top_k_file.read(struct.calcsize(MutualInformationManager.TOP_K_HEADER_FORMAT)))
+        assert magic == MutualInformationManager.TOP_K_MAGIC
+        assert pattern_type == self.__pattern_type
+
+        self.__top_k = k
+        self.__top_k_num_cols = num_cols
+        self.__top_k_row_norms = array('d')
+        self.__top_k_row_norms.fromfile(top_k_file, num_rows)
+        self.__top_k_indices = array('i')
+        self.__top_k_indices.fromfile(top_k_file, num_rows * k)
+        self.__top_k_vals = array('d')
+        self.__top_k_vals.fromfile(top_k_file, num_rows * k)
+        if sys.byteorder != "little":
+            for arr in (self.__top_k_row_norms, self.__top_k_indices, self.__top_k_vals):
+                arr.byteswap()
+        top_k_file.close()
+
+    def __get_top_k_mutual_information_val(self, pattern_index_x, pattern_index_y):
+        # Rows are authors for AUTHOR_TITLE and titles for TITLE_AUTHOR, but x is always the author index
+        if self.__pattern_type == MutualInformationManager.PatternType.TITLE_AUTHOR:
+            pattern_index_x, pattern_index_y = pattern_index_y, pattern_index_x
+        is_symmetric = self.__pattern_type == MutualInformationManager.PatternType.AUTHOR_AUTHOR \
+            or self.__pattern_type == MutualInformationManager.PatternType.TITLE_TITLE
+
+        lookups = [(pattern_index_x, pattern_index_y)]
+        if is_symmetric:
+            lookups.append((pattern_index_y, pattern_index_x))
+        for row, col in lookups:
+            row_start = row * self.__top_k
+            for ind in range(row_start, row_start + self.__top_k):
+                if self.__top_k_indices[ind] == col:
+                    return self.__top_k_vals[ind]
+        raise KeyError((pattern_index_x, pattern_index_y))
+
     @staticmethod
     def compute_mutual_information_for_pattern_pair(transaction_manager, pattern_type, pattern_x, pattern_y):
         '''
@@ -247,13 +1645,77 @@ class MutualInformationManager:
             x_paper_inds = transaction_manager.find_title_pattern_transactions_ids(pattern_x)
             y_paper_inds = transaction_manager.find_title_pattern_transactions_ids(pattern_y)
 
-        x_support = len(x_paper_inds)
-        y_support = len(y_paper_inds)
+        return MutualInformationManager.compute_mutual_information_for_transaction_ids(x_paper_inds, y_paper_inds, \
+            transaction_manager.get_number_of_transactions())
+
+    @staticmethod
+    def compute_mutual_information_for_transaction_ids(x_paper_inds, y_paper_inds, num_transactions):
+        '''
+        Computes mutual information value given the ids of the transactions containing each pattern
+
+        @param
+            x_paper_inds: TransactionIdSet  Ids of the transactions containing pattern x
+            y_paper_inds: TransactionIdSet  Ids of the transactions containing pattern y
+            num_transactions: int           Total number of transactions
+
+        @return mutual information val, which is represented as a float
+        '''
+        # Only the size of the intersection is needed, which the bitmaps give without building it
+        return MutualInformationManager.compute_mutual_information_from_counts(len(x_paper_inds), len(y_paper_inds), \
+            x_paper_inds.intersection_cardinality(y_paper_inds), num_transactions)
+
+    @staticmethod
+    def compute_mutual_information_from_counts(x_support, y_support, x_y_intersection_len, num_transactions):
+        '''
+        Computes mutual information value given the supports of both patterns and their joint support
+
+        @param
+            x_support: int                  Number of transactions containing pattern x
+            y_support: int                  Number of transactions containing pattern y
+            x_y_intersection_len: int       Number of transactions containing both patterns
+            num_transactions: int           Total number of transactions
+
+        @return mutual information val, which is represented as a float
+
+        MI only depends on the counts, and most pairs share their counts with many others (most pairs don't
+        co-occur and supports are heavily skewed), so values are cached by counts rather than recomputed per pair
+        '''
+        return MutualInformationManager.__compute_cached_mutual_information(x_support, y_support, \
+            x_y_intersection_len, num_transactions)
+
+    @staticmethod
+    @lru_cache(maxsize=MUTUAL_INFORMATION_CACHE_SIZE)
+    def __compute_cached_mutual_information(x_support, y_support, x_y_intersection_len, num_transactions):
+        return MutualInformationManager.__compute_mutual_information_kernel(x_support, y_support, \
+            x_y_intersection_len, num_transactions)
 
-        x_y_intersection_len = len(x_paper_inds.intersection(y_paper_inds))
-        x_y_union_len = len(x_paper_inds.union(y_paper_inds))
+    @staticmethod
+    def __get_kernel_cache_misses():
+        '''
+        @return int?, the number of MI kernel evaluations (cache misses) so far, None if instrumentation is disabled
+        '''
+        if not instrumentation.is_enabled():
+            return None
+        return MutualInformationManager.__compute_cached_mutual_information.cache_info().misses
+
+    @staticmethod
+    def __report_kernel_evaluations(kernel_misses):
+        '''
+        Adds the MI kernel evaluations since __get_kernel_cache_misses returned kernel_misses to the
+        mi_kernel_evaluations counter. The cache counts its misses anyway, so the kernel itself isn't instrumented
+        (the cache is shared, so concurrent computations count each other's misses)
+        '''
+        if kernel_misses is not None:
+            instrumentation.increment("mi_kernel_evaluations", \
+                MutualInformationManager.__get_kernel_cache_misses() - kernel_misses)
 
-        num_transactions = transaction_manager.get_number_of_transactions()
+    @staticmethod
+    def __compute_mutual_information_kernel(x_support, y_support, x_y_intersection_len, num_transactions):
+        '''
+        Pure MI computation behind compute_mutual_information_from_counts (counts may be fractional, see
+        __estimate_mutual_information)
+        '''
+        x_y_union_len = x_support + y_support - x_y_intersection_len
 
         SMOOTHING_FACTOR = 0.01
         def get_smoothed_probability(num, denom):
@@ -281,21 +1743,79 @@ class MutualInformationManager:
         return mi_x_1_y_1 + mi_x_1_y_0 + mi_x_0_y_1 + mi_x_0_y_0
 
 if __name__ == "__main__":
-    transactions = transactions_manager.TransactionsManager("data/data.csv", "data/author_id_mappings.txt", "data/title_term_id_mappings.txt")    
-    author_patterns = parse_author_file_into_patterns("data/frequent_author_patterns.txt")
-    title_patterns = parse_sequential_title_file_into_patterns("data/minimal_title_term_patterns.txt")
+    '''
+    Usage: py utils/mutual_information_manager.py [--resume]    (computes every full MI file, --resume continues
+                                                                 from the last checkpoints of an interrupted run)
+           py utils/mutual_information_manager.py top_k [K]     (builds the top K files from the full MI files)
+           py utils/mutual_information_manager.py dense         (builds the dense binary files from the full MI files)
+           py utils/mutual_information_manager.py quantize [BITS]
+                                                                (builds the 16 (or 8) bit quantized files from the full MI files)
+           py utils/mutual_information_manager.py tiled BUDGET_MB
+                                                                (computes the dense files out of core, in tiles fitting the budget)
+    '''
+    instrumentation.configure_from_argv(sys.argv)
+    resume = "--resume" in sys.argv
+    if resume:
+        sys.argv.remove("--resume")
+    if len(sys.argv) > 1 and sys.argv[1] == "quantize":
+        bits = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+        for pattern_type in [MutualInformationManager.PatternType.AUTHOR_AUTHOR, \
+            MutualInformationManager.PatternType.AUTHOR_TITLE, MutualInformationManager.PatternType.TITLE_TITLE]:
+            MutualInformationManager.build_quantized_mutual_information_file(pattern_type, bits)
+        exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "dense":
+        for pattern_type in [MutualInformationManager.PatternType.AUTHOR_AUTHOR, \
+            MutualInformationManager.PatternType.AUTHOR_TITLE, MutualInformationManager.PatternType.TITLE_TITLE]:
+            MutualInformationManager.build_dense_mutual_information_file(pattern_type)
+        exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "top_k":
+        top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        for pattern_type in [MutualInformationManager.PatternType.AUTHOR_AUTHOR, \
+            MutualInformationManager.PatternType.AUTHOR_TITLE, MutualInformationManager.PatternType.TITLE_TITLE]:
+            MutualInformationManager.build_top_k_mutual_information_files(pattern_type, top_k)
+        exit(0)
+
+    # Shards hold the same papers as data.csv, in the same order, and are scanned in parallel
+    papers_file_name = "data/shards/manifest.json" if os.path.exists("data/shards/manifest.json") else "data/data.csv"
+    transactions = transactions_manager.TransactionsManager(papers_file_name, "data/author_id_mappings.txt", "data/title_term_id_mappings.txt")    
+    author_records = parse_pattern_file_into_records("data/frequent_author_patterns.txt")
+    title_records = parse_pattern_file_into_records("data/minimal_title_term_patterns.txt")
+    author_patterns = [record.items for record in author_records]
+    title_patterns = [get_sequential_title_pattern(record) for record in title_records]
+    # Reuse the transaction ids SPMF found while mining (if the files have them) instead of scanning for them again
+    author_transaction_ids = get_records_transaction_ids(author_records)
+    title_transaction_ids = get_records_transaction_ids(title_records)
+
+    if len(sys.argv) > 2 and sys.argv[1] == "tiled":
+        memory_budget = int(float(sys.argv[2]) * 1024 * 1024)
+        for pattern_type, patterns, secondary_patterns, transaction_ids, secondary_transaction_ids in [
+            (MutualInformationManager.PatternType.AUTHOR_AUTHOR, author_patterns, None, author_transaction_ids, None),
+            (MutualInformationManager.PatternType.AUTHOR_TITLE, author_patterns, title_patterns, author_transaction_ids, \
+                title_transaction_ids),
+            (MutualInformationManager.PatternType.TITLE_TITLE, title_patterns, None, title_transaction_ids, None)]:
+            MutualInformationManager(pattern_type, transactions).compute_mutual_information(patterns, secondary_patterns, \
+                None, transaction_ids, secondary_transaction_ids, memory_budget, resume)
+        exit(0)
 
     print("Author author")
-    mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, transactions, True)
-    mutual_info.compute_mutual_information(author_patterns)
+    with instrumentation.stage("mutual_information.build_author_author"):
+        mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_AUTHOR, transactions, True)
+        mutual_info.compute_mutual_information(author_patterns, num_processes=None, \
+            transaction_ids=author_transaction_ids, resume=resume)
 
     print("Author title")
-    mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_TITLE, transactions, True)
-    mutual_info.compute_mutual_information(author_patterns, title_patterns)
+    with instrumentation.stage("mutual_information.build_author_title"):
+        mutual_info = MutualInformationManager(MutualInformationManager.PatternType.AUTHOR_TITLE, transactions, True)
+        mutual_info.compute_mutual_information(author_patterns, title_patterns, num_processes=None, \
+            transaction_ids=author_transaction_ids, secondary_transaction_ids=title_transaction_ids, resume=resume)
 
     print("Title title")
-    mutual_info = MutualInformationManager(MutualInformationManager.PatternType.TITLE_TITLE, transactions, True)
-    mutual_info.compute_mutual_information(title_patterns)
+    with instrumentation.stage("mutual_information.build_title_title"):
+        mutual_info = MutualInformationManager(MutualInformationManager.PatternType.TITLE_TITLE, transactions, True)
+        mutual_info.compute_mutual_information(title_patterns, num_processes=None, \
+            transaction_ids=title_transaction_ids, resume=resume)
 
     #mutual_info = MutualInformationManager()
     #mutual_info.read_mutual_information_from_file()
@@ -1,57 +1,115 @@
-def parse_author_file_into_patterns(pattern_file_name):
+class PatternRecord:
     '''
-    Parse an author file generated via build_frequent_patterns.py into a list of patterns
-    
+    Represents a single mined pattern, along with what SPMF found out about it while mining it
+    '''
+    def __init__(self, items, support=None, transaction_ids=None):
+        '''
+        @param
+            items: list(int)                    Item ids of the pattern (title patterns keep their -1 itemset separators)
+            support: int?                       Number of transactions containing the pattern (#SUP), if known
+            transaction_ids: set(int)?          Ids of the transactions containing the pattern (#TID or #SID), if known.
+                Transaction ids are line numbers of data.csv (from 0), like TransactionsManager paper ids
+        '''
+        self.items = items
+        self.support = support
+        self.transaction_ids = transaction_ids
+
+def parse_pattern_file_into_records(pattern_file_name):
+    '''
+    Parse a pattern file generated via build_frequent_patterns.py (or write_pattern_records_to_file) into
+    pattern records
+
     @param pattern_file_name: string    Input file name
-        Format assumption: item_id_1 item_id_2 item_id_3 #SUP support
+        Format assumption: item_id_1 item_id_2 item_id_3 [#SUP: support] [#TID: tid_1 tid_2 ... | #SID: sid_1 ...]
         One pattern/line
-    @return list(list(int)), representing all patterns parsed from file where each inner list
-        is a pattern of item ids (recall that words are being mapped to integer ids)
+    @return list(PatternRecord), representing all patterns parsed from file, in file order
     '''
+    if pattern_file_name.endswith(".bin"):
+        return open_pattern_store(pattern_file_name).to_records()
+
     pattern_file = open(pattern_file_name, "r")
-    
-    patterns = []
+
+    records = []
     for line in pattern_file:
-        sup_ind = line.rfind("#") # Ignore the comment telling us what the support is
-        assert sup_ind != -1
-        pattern_lst = line[ : sup_ind].split()
-        patterns.append([int(item) for item in pattern_lst])
+        comment_ind = line.find("#")
+        if comment_ind == -1:
+            comment_ind = len(line)
+        record = PatternRecord([int(item) for item in line[ : comment_ind].split()])
+
+        # Comments are "#SUP: support", "#TID: tids" (FPClose) or "#SID: sids" (CloSpan), in that order
+        for comment in line[comment_ind : ].split("#")[1 : ]:
+            name, _, values = comment.partition(":")
+            if name == "SUP":
+                record.support = int(values)
+            elif name == "TID" or name == "SID":
+                record.transaction_ids = set(int(tid) for tid in values.split())
+        records.append(record)
 
     pattern_file.close()
-    return patterns
+    return records
+
+def parse_author_file_into_patterns(pattern_file_name):
+    '''
+    Parse an author file generated via build_frequent_patterns.py into a list of patterns
+
+    @param pattern_file_name: string    Input file name
+        Format assumption: item_id_1 item_id_2 item_id_3 #SUP support
+        One pattern/line
+    @return list(list(int)), representing all patterns parsed from file where each inner list
+        is a pattern of item ids (recall that words are being mapped to integer ids). A mapped PatternStore for
+        a pattern store (.bin) file
+    '''
+    if pattern_file_name.endswith(".bin"):
+        return open_pattern_store(pattern_file_name)
+    return [record.items for record in parse_pattern_file_into_records(pattern_file_name)]
 
 def parse_sequential_title_file_into_patterns(pattern_file_name):
     '''
     Parse a title file generated via build_frequent_patterns.py into a list of patterns
-    
+
     @param pattern_file_name: string    Input file name
         Format assumption: item_id_1 item_id_2 item_id_3 #SUP support
         One pattern/line
     @return list(list(int)), representing all patterns parsed from file where each inner list
-        is a pattern of item ids (recall that words are being mapped to integer ids)
+        is a pattern of item ids (recall that words are being mapped to integer ids). A mapped PatternStore for
+        a pattern store (.bin) file
     '''
-    pattern_file = open(pattern_file_name, "r")
-    
-    patterns = []
-    for line in pattern_file:
-        pattern_lst = line.split()
-        pattern = []        
+    if pattern_file_name.endswith(".bin"):
+        return open_pattern_store(pattern_file_name)
+    return [get_sequential_title_pattern(record) for record in parse_pattern_file_into_records(pattern_file_name)]
+
+def open_pattern_store(pattern_store_file_name):
+    '''
+    @param pattern_store_file_name: string  Pattern store written by pattern_store.py
+    @return PatternStore, the mapped store
+    '''
+    # pattern_store.py imports PatternRecord from this module
+    from pattern_store import PatternStore
+    return PatternStore(pattern_store_file_name)
 
-        for item in pattern_lst:
-            item = int(item)
-            if item != -1:
-                pattern.append(item)
-        patterns.append(pattern)
+def get_sequential_title_pattern(record):
+    '''
+    @param record: PatternRecord    Title pattern record
+    @return list(int), title term ids of the pattern (without the itemset separators)
+    '''
+    return [item for item in record.items if item != -1]
 
-    pattern_file.close()
-    return patterns
+def get_records_transaction_ids(records):
+    '''
+    @param records: list(PatternRecord)     Pattern records
+    @return list(set(int))?, transaction ids of every record, None if any record doesn't have them (ex: file mined
+        without display_transaction_nums)
+    '''
+    if any(record.transaction_ids is None for record in records):
+        return None
+    return [record.transaction_ids for record in records]
 
 def write_patterns_to_file(pattern_file_name, patterns):
     '''
     Write a given list of patterns to a file
     Format: item_id_1 item_id_2 item_id_3
         One pattern/line
-    
+
     @param pattern_file_name: string    Output file name
     @param patterns: list(list(int))    All patterns parsed, where each inner list
         is a pattern of integers
@@ -60,3 +118,22 @@ def write_patterns_to_file(pattern_file_name, patterns):
     for pattern in patterns:
         pattern_file.write("%s\n" % ' ' .join([str(item) for item in pattern]))
     pattern_file.close()
+
+def write_pattern_records_to_file(pattern_file_name, records):
+    '''
+    Write a given list of pattern records to a file, keeping their supports and transaction ids
+    Format: item_id_1 item_id_2 item_id_3 [#SUP: support] [#TID: tid_1 tid_2 ...]
+        One pattern/line
+
+    @param pattern_file_name: string        Output file name
+    @param records: list(PatternRecord)     Pattern records to write
+    '''
+    pattern_file = open(pattern_file_name, "w")
+    for record in records:
+        line = ' '.join([str(item) for item in record.items])
+        if record.support is not None:
+            line += " #SUP: %d" % record.support
+        if record.transaction_ids is not None:
+            line += " #TID: %s" % ' '.join([str(tid) for tid in sorted(record.transaction_ids)])
+        pattern_file.write("%s\n" % line)
+    pattern_file.close()
@@ -0,0 +1,253 @@
+import os
+import sys
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+
+from parse_patterns import PatternRecord
+
+'''
+Compact binary store of a pattern file: the items of every pattern in one flat array with offsets, the supports,
+optionally the transaction ids SPMF found, and optionally a hash index from pattern to pattern id.
+
+A PatternStore is mmapped rather than parsed, so loading is instant whatever the number of patterns, and it's a
+read-only sequence of patterns (store[pattern_id] is the list of item ids of the pattern), so it can be passed
+anywhere a list(list(int)) of patterns is expected: the MI manager, the redundancy remover and the extractors.
+parse_author_file_into_patterns, parse_sequential_title_file_into_patterns and parse_pattern_file_into_records
+(see parse_patterns.py) open a store when given a .bin file.
+
+Title patterns are sequences of 1-itemsets (see FrequentPatternBuilder), so they're stored without their -1 itemset
+separators, which to_records puts back.
+
+On-disk format (little endian, uint32):
+    b"PATS" flags num_patterns num_items num_transaction_ids hash_table_size
+    item offsets (num_patterns + 1), items (num_items)
+    SUPPORTS only: supports (num_patterns)
+    TRANSACTION_IDS only: transaction id offsets (num_patterns + 1), transaction ids (num_transaction_ids)
+    hash table (hash_table_size): linear probing table of pattern id + 1 (0 if empty), indexed by
+        get_pattern_hash(pattern) % hash_table_size
+
+Usage (writes data/<pattern file>.bin next to every pattern file that exists):
+    py utils/pattern_store.py
+'''
+
+MAGIC = b"PATS"
+HEADER_FORMAT = "<4sIIIII"
+
+SEQUENTIAL_TITLE = 1
+SUPPORTS = 2
+TRANSACTION_IDS = 4
+
+# Title patterns are kept in order, author patterns (itemsets) are sorted
+PATTERN_FILENAMES = {
+    os.path.join("data", "frequent_author_patterns.txt"): False,
+    os.path.join("data", "frequent_title_term_patterns.txt"): True,
+    os.path.join("data", "minimal_title_term_patterns.txt"): True
+}
+
+def get_pattern_store_filename(pattern_file_name):
+    '''
+    @return string, the store of a pattern file, ex: data/frequent_author_patterns.bin
+    '''
+    return "%s.bin" % os.path.splitext(pattern_file_name)[0]
+
+def get_pattern_hash(pattern):
+    '''
+    @param pattern: Iterable(int)   Pattern key (sorted items for author patterns)
+    @return int, 32 bit FNV-1a hash of the items (stable across processes, unlike hash())
+    '''
+    pattern_hash = 2166136261
+    for item in pattern:
+        pattern_hash = ((pattern_hash ^ item) * 16777619) & 0xFFFFFFFF
+    return pattern_hash
+
+def write_pattern_store(store_file_name, records, is_sequential_title, build_index=True):
+    '''
+    @param
+        store_file_name: string         File to write the store to
+        records: list(PatternRecord)    Pattern records, ex: parse_pattern_file_into_records(...)
+        is_sequential_title: bool       True for title pattern records (with -1 itemset separators)
+        build_index: bool               True to write the pattern -> id hash index
+    '''
+    num_patterns = len(records)
+    flags = SEQUENTIAL_TITLE if is_sequential_title else 0
+    has_supports = all(record.support is not None for record in records)
+    has_transaction_ids = all(record.transaction_ids is not None for record in records)
+    flags |= (SUPPORTS if has_supports else 0) | (TRANSACTION_IDS if has_transaction_ids else 0)
+
+    offsets = array('I', [0])
+    items = array('I')
+    transaction_id_offsets = array('I', [0])
+    transaction_ids = array('I')
+    for record in records:
+        items.extend([item for item in record.items if item != -1] if is_sequential_title else record.items)
+        offsets.append(len(items))
+        if has_transaction_ids:
+            transaction_ids.extend(sorted(record.transaction_ids))
+            transaction_id_offsets.append(len(transaction_ids))
+
+    hash_table = array('I')
+    if build_index:
+        hash_table_size = 1
+        while hash_table_size < 2 * num_patterns:
+            hash_table_size *= 2
+        hash_table = array('I', [0]) * hash_table_size
+        for pattern_id in range(num_patterns):
+            pattern = items[offsets[pattern_id] : offsets[pattern_id + 1]]
+            slot = get_pattern_hash(pattern if is_sequential_title else sorted(pattern)) % hash_table_size
+            while hash_table[slot]:
+                slot = (slot + 1) % hash_table_size
+            hash_table[slot] = pattern_id + 1
+
+    sections = [offsets, items]
+    if has_supports:
+        sections.append(array('I', [record.support for record in records]))
+    if has_transaction_ids:
+        sections.extend([transaction_id_offsets, transaction_ids])
+    sections.append(hash_table)
+
+    store_file = open(store_file_name, "wb")
+    store_file.write(struct.pack(HEADER_FORMAT, MAGIC, flags, num_patterns, len(items), len(transaction_ids), \
+        len(hash_table)))
+    for values in sections:
+        if sys.byteorder != "little":
+            values.byteswap()
+        values.tofile(store_file)
+    store_file.close()
+
+class PatternStore(Sequence):
+    def __init__(self, store_file_name):
+        '''
+        Maps a store written by write_pattern_store (nothing is parsed or copied)
+
+        @param store_file_name: string      Store file name
+        '''
+        store_file = open(store_file_name, "rb")
+        header_size = struct.calcsize(HEADER_FORMAT)
+        magic, self.__flags, self.__num_patterns, num_items, num_transaction_ids, hash_table_size = \
+            struct.unpack(HEADER_FORMAT, store_file.read(header_size))
+        assert magic == MAGIC
+
+        if sys.byteorder == "little":
+            self.__mmap = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ)
+            values = memoryview(self.__mmap)[header_size : ].cast('I')
+        else:
+            self.__mmap = None
+            values = array('I')
+            values.frombytes(store_file.read())
+            values.byteswap()
+        store_file.close()
+
+        def take(num_values):
+            nonlocal values
+            section, values = values[ : num_values], values[num_values : ]
+            return section
+
+        num_offsets = self.__num_patterns + 1
+        self.__offsets = take(num_offsets)
+        self.__items = take(num_items)
+        self.__supports = take(self.__num_patterns) if self.__flags & SUPPORTS else None
+        self.__transaction_id_offsets = take(num_offsets) if self.__flags & TRANSACTION_IDS else None
+        self.__transaction_ids = take(num_transaction_ids) if self.__flags & TRANSACTION_IDS else None
+        self.__hash_table = take(hash_table_size)
+
+    def __len__(self):
+        return self.__num_patterns
+
+    def __getitem__(self, pattern_id):
+        '''
+        @return list(int), the item ids of the pattern (list(list(int)) for a slice)
+        '''
+        if isinstance(pattern_id, slice):
+            return [self[ind] for ind in range(*pattern_id.indices(self.__num_patterns))]
+        if pattern_id < 0:
+            pattern_id += self.__num_patterns
+        if pattern_id < 0 or pattern_id >= self.__num_patterns:
+            raise IndexError(pattern_id)
+        return self.__items[self.__offsets[pattern_id] : self.__offsets[pattern_id + 1]].tolist()
+
+    def __iter__(self):
+        for pattern_id in range(self.__num_patterns):
+            yield self.__items[self.__offsets[pattern_id] : self.__offsets[pattern_id + 1]].tolist()
+
+    def __reduce__(self):
+        # Pickled (ex: sent to worker processes) as the list of patterns, the mapping can't be
+        return (list, (self[ : ],))
+
+    def is_sequential_title(self):
+        return bool(self.__flags & SEQUENTIAL_TITLE)
+
+    def get_support(self, pattern_id):
+        '''
+        @return int?, the support of the pattern, None if the pattern file didn't have supports
+        '''
+        return self.__supports[pattern_id] if self.__supports is not None else None
+
+    def get_transaction_ids(self, pattern_id):
+        '''
+        @return set(int)?, the transaction ids of the pattern, None if the pattern file didn't have them
+        '''
+        if self.__transaction_ids is None:
+            return None
+        return set(self.__transaction_ids[self.__transaction_id_offsets[pattern_id] : \
+            self.__transaction_id_offsets[pattern_id + 1]].tolist())
+
+    def find(self, pattern):
+        '''
+        @param pattern: list(int)   Items of a pattern (in any order for author patterns)
+        @return int?, the id of the pattern, None if it isn't in the store
+        '''
+        if not self.is_sequential_title():
+            pattern = sorted(pattern)
+        pattern = list(pattern)
+        hash_table_size = len(self.__hash_table)
+        if hash_table_size == 0:
+            # Stores written without an index are scanned
+            for pattern_id, stored_pattern in enumerate(self):
+                if (stored_pattern if self.is_sequential_title() else sorted(stored_pattern)) == pattern:
+                    return pattern_id
+            return None
+
+        slot = get_pattern_hash(pattern) % hash_table_size
+        while self.__hash_table[slot]:
+            pattern_id = self.__hash_table[slot] - 1
+            stored_pattern = self[pattern_id]
+            if (stored_pattern if self.is_sequential_title() else sorted(stored_pattern)) == pattern:
+                return pattern_id
+            slot = (slot + 1) % hash_table_size
+        return None
+
+    def to_records(self):
+        '''
+        @return list(PatternRecord), the records of the pattern file the store was written from (title patterns
+            with their -1 itemset separators)
+        '''
+        records = []
+        for pattern_id, pattern in enumerate(self):
+            if self.is_sequential_title():
+                pattern = [item for term_id in pattern for item in (term_id, -1)]
+            records.append(PatternRecord(pattern, self.get_support(pattern_id), self.get_transaction_ids(pattern_id)))
+        return records
+
+    def close(self):
+        '''
+        Unmaps the store (patterns returned so far stay valid)
+        '''
+        self.__offsets = self.__items = self.__supports = None
+        self.__transaction_id_offsets = self.__transaction_ids = self.__hash_table = None
+        if self.__mmap is not None:
+            self.__mmap.close()
+            self.__mmap = None
+
+if __name__ == "__main__":
+    from parse_patterns import parse_pattern_file_into_records
+
+    for pattern_file_name, is_sequential_title in PATTERN_FILENAMES.items():
+        if not os.path.exists(pattern_file_name):
+            continue
+        store_file_name = get_pattern_store_filename(pattern_file_name)
+        records = parse_pattern_file_into_records(pattern_file_name)
+        write_pattern_store(store_file_name, records, is_sequential_title)
+        print("%s: %d patterns, %d bytes -> %s: %d bytes" % (pattern_file_name, len(records), \
+            os.path.getsize(pattern_file_name), store_file_name, os.path.getsize(store_file_name)))
@@ -3,7 +3,8 @@ import os
 sys.path.insert(1, os.path.join('utils', 'frequent_pattern_mining'))
 
 from build_frequent_patterns import FrequentPatternBuilder
-from parse_patterns import parse_author_file_into_patterns, write_patterns_to_file
+from parse_patterns import parse_pattern_file_into_records, write_pattern_records_to_file
+import instrumentation
 
 '''
 Utility methods for 
@@ -30,6 +31,7 @@ def calculate_jaccard_distance(pattern_1, pattern_2):
     union_len = len(pattern_1_set.union(pattern_2_set))
     return 1 - intersection_len / union_len
 
+@instrumentation.instrumented_stage("redundancy_removal.jaccard_distance_matrix")
 def compute_jaccard_distance_matrix(patterns):
     '''
     Computes a triangular matrix of Jaccard distances
@@ -87,6 +89,7 @@ def compute_representative_patterns_from_clusters(patterns, clusters, jaccard_di
         min_intra_dist_patterns.append(patterns[min_intra_cluster_pattern_id])
     return min_intra_dist_patterns
 
+@instrumentation.instrumented_stage("redundancy_removal.hierarchical_microclustering")
 def find_hierarchical_microclustering_patterns(patterns, dist_thresh = 0.7):
     '''
     Computes a list of non-redundant patterns using the hierarchical microclustering
@@ -145,6 +148,7 @@ def find_hierarchical_microclustering_patterns(patterns, dist_thresh = 0.7):
     print(min_intra_dist_patterns)
     return min_intra_dist_patterns
 
+@instrumentation.instrumented_stage("redundancy_removal.one_pass_microclustering")
 def find_one_pass_microclustering_patterns(patterns, dist_thresh = 0.9):
     '''
     Computes a list of non-redundant patterns using the one-pass microclustering
@@ -185,6 +189,11 @@ def find_one_pass_microclustering_patterns(patterns, dist_thresh = 0.9):
     return min_intra_dist_patterns
 
 if __name__ == "__main__":
-    title_patterns = parse_author_file_into_patterns(FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH)
-    minimal_patterns = find_one_pass_microclustering_patterns(title_patterns, 0.6)
-    write_patterns_to_file(MINIMAL_TITLE_TERMS_FILENAME, minimal_patterns)
+    instrumentation.configure_from_argv(sys.argv)
+    title_records = parse_pattern_file_into_records(FrequentPatternBuilder.TITLE_TERMS_OUTPUT_FILE_PATH)
+    minimal_patterns = find_one_pass_microclustering_patterns([record.items for record in title_records], 0.6)
+
+    # Keep the supports and transaction ids SPMF found for the representative patterns
+    records_by_items = {tuple(record.items): record for record in title_records}
+    write_pattern_records_to_file(MINIMAL_TITLE_TERMS_FILENAME, \
+        [records_by_items[tuple(pattern)] for pattern in minimal_patterns])
@@ -0,0 +1,158 @@
+'''
+Compact set of transaction ids, used for the transactions of every pattern (see TransactionsManager) instead of
+Python sets.
+
+Ids are stored as a bitmap in a Python int (bit i is set iff id offset + i is in the set), so a set takes about
+(largest id - offset) / 8 bytes whatever its number of ids (a Python set takes ~64 bytes per id), and never more than
+a bit per transaction. The offset is 0, unless the set's ids are all in the second half of [0, largest id] (ex:
+papers of a single conference shard), in which case it's the smallest id: bitmaps are at most twice as large as
+they'd be starting at the smallest id, and most sets (whose ids are spread over data.csv) share offset 0.
+
+The size of the intersection of 2 sets (the joint support of 2 patterns) is the number of bits set in the AND of
+their bitmaps, computed without building a set of the common ids. Bitmaps with the same offset are and-ed
+directly, others are shifted first, which about doubles the cost.
+'''
+
+# int.bit_count is only available from Python 3.10 on
+if hasattr(int, "bit_count"):
+    _bit_count = int.bit_count
+else:
+    def _bit_count(bits):
+        return bin(bits).count("1")
+
+class TransactionIdSet:
+    '''
+    Immutable set of transaction ids. The offset only depends on the smallest and largest ids, so equal sets have
+    equal offsets and bitmaps.
+    '''
+    __slots__ = ("__offset", "__bits", "__len")
+
+    def __init__(self, ids=()):
+        '''
+        @param ids: Iterable(int)   Non-negative transaction ids (duplicates are ignored)
+        '''
+        ids = ids if isinstance(ids, (list, tuple, set, frozenset)) else list(ids)
+        if not ids:
+            self.__set_bits(0, 0)
+            return
+        smallest_id = min(ids)
+        offset = smallest_id if 2 * smallest_id > max(ids) else 0
+        # Setting bits of a bytearray is linear, while or-ing ints one bit at a time would be quadratic
+        bitmap = bytearray(((max(ids) - offset) >> 3) + 1)
+        for transaction_id in ids:
+            transaction_id -= offset
+            bitmap[transaction_id >> 3] |= 1 << (transaction_id & 7)
+        self.__set_bits(offset, int.from_bytes(bitmap, "little"))
+
+    @staticmethod
+    def __from_bits(offset, bits):
+        transaction_ids = TransactionIdSet.__new__(TransactionIdSet)
+        transaction_ids.__set_bits(offset, bits)
+        return transaction_ids
+
+    def __set_bits(self, offset, bits):
+        if bits:
+            smallest_id = offset + (bits & -bits).bit_length() - 1
+            largest_id = offset + bits.bit_length() - 1
+            canonical_offset = smallest_id if 2 * smallest_id > largest_id else 0
+            if canonical_offset > offset:
+                bits >>= canonical_offset - offset
+            elif canonical_offset < offset:
+                bits <<= offset - canonical_offset
+            offset = canonical_offset
+        else:
+            offset = 0
+        self.__offset = offset
+        self.__bits = bits
+        self.__len = _bit_count(bits)
+
+    def __align(self, other):
+        '''
+        @return (int, int, int), (offset, bitmap of self, bitmap of other) with both bitmaps starting at offset
+        '''
+        if self.__offset <= other.__offset:
+            return self.__offset, self.__bits, other.__bits << (other.__offset - self.__offset)
+        return other.__offset, self.__bits << (self.__offset - other.__offset), other.__bits
+
+    def intersection_cardinality(self, other):
+        '''
+        @param other: TransactionIdSet
+        @return int, number of ids in both sets (without building their intersection)
+        '''
+        if not self.__bits or not other.__bits:
+            return 0
+        if self.__offset == other.__offset:
+            return _bit_count(self.__bits & other.__bits)
+        # Only the overlapping part of the bitmaps is and-ed
+        if self.__offset < other.__offset:
+            return _bit_count((self.__bits >> (other.__offset - self.__offset)) & other.__bits)
+        return _bit_count(self.__bits & (other.__bits >> (self.__offset - other.__offset)))
+
+    def intersection(self, other):
+        '''
+        @param other: TransactionIdSet
+        @return TransactionIdSet, ids in both sets
+        '''
+        if not self.__bits or not other.__bits:
+            return TransactionIdSet()
+        offset, bits, other_bits = self.__align(other)
+        return TransactionIdSet.__from_bits(offset, bits & other_bits)
+
+    def union(self, other):
+        '''
+        @param other: TransactionIdSet
+        @return TransactionIdSet, ids in either set
+        '''
+        if not self.__bits:
+            return other
+        if not other.__bits:
+            return self
+        offset, bits, other_bits = self.__align(other)
+        return TransactionIdSet.__from_bits(offset, bits | other_bits)
+
+    def truncate(self, num_transactions):
+        '''
+        @param num_transactions: int    Number of transactions
+        @return TransactionIdSet, ids smaller than num_transactions
+        '''
+        if self.__offset + self.__bits.bit_length() <= num_transactions:
+            return self
+        if self.__offset >= num_transactions:
+            return TransactionIdSet()
+        return TransactionIdSet.__from_bits(self.__offset, \
+            self.__bits & ((1 << (num_transactions - self.__offset)) - 1))
+
+    def __len__(self):
+        return self.__len
+
+    def __iter__(self):
+        '''
+        @return iterator(int), ids in ascending order
+        '''
+        bitmap = self.__bits.to_bytes((self.__bits.bit_length() + 7) >> 3, "little")
+        for byte_ind, byte in enumerate(bitmap):
+            while byte:
+                low_bit = byte & -byte
+                yield self.__offset + (byte_ind << 3) + low_bit.bit_length() - 1
+                byte ^= low_bit
+
+    def __contains__(self, transaction_id):
+        transaction_id -= self.__offset
+        return transaction_id >= 0 and (self.__bits >> transaction_id) & 1 == 1
+
+    def __eq__(self, other):
+        if not isinstance(other, TransactionIdSet):
+            return NotImplemented
+        return self.__offset == other.__offset and self.__bits == other.__bits
+
+    def __hash__(self):
+        return hash((self.__offset, self.__bits))
+
+    def __getstate__(self):
+        return (self.__offset, self.__bits)
+
+    def __setstate__(self, state):
+        self.__set_bits(*state)
+
+    def __repr__(self):
+        return "TransactionIdSet(%s)" % list(self)
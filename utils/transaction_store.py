@@ -0,0 +1,82 @@
+import os
+import sys
+import struct
+from array import array
+
+'''
+Binary store of the id mapped transactions (the author ids and title term ids of every paper of data.csv), written by
+StreamingIngestPipeline while it writes data.csv and the id mapping files, so that TransactionsManager can load the
+papers without splitting data.csv and looking every word up again.
+
+Papers are appended one at a time (the number of papers is written to the header when the store is closed), so
+writing it takes constant memory.
+
+On-disk format (little endian, uint32):
+    b"TXNS" num_papers
+    then, for every paper in data.csv order:
+        num_authors num_title_terms author_id ... title_term_id ...
+Author ids are sorted, title term ids are in title order.
+'''
+
+MAGIC = b"TXNS"
+HEADER_FORMAT = "<4sI"
+
+TRANSACTION_STORE_FILENAME = os.path.join("data", "transactions.bin")
+
+class TransactionStoreWriter:
+    def __init__(self, store_filename=TRANSACTION_STORE_FILENAME):
+        '''
+        @param store_filename: string   File to write the store to (overwritten)
+        '''
+        self.__store_file = open(store_filename, "wb")
+        self.__num_papers = 0
+        self.__write_header()
+
+    def write_paper(self, author_ids, title_term_ids):
+        '''
+        @param
+            author_ids: list(int)           Sorted author ids of the paper
+            title_term_ids: list(int)       Title term ids of the paper, in title order
+        '''
+        values = array('I', [len(author_ids), len(title_term_ids)])
+        values.extend(author_ids)
+        values.extend(title_term_ids)
+        if sys.byteorder != "little":
+            values.byteswap()
+        values.tofile(self.__store_file)
+        self.__num_papers += 1
+
+    def close(self):
+        self.__store_file.seek(0)
+        self.__write_header()
+        self.__store_file.close()
+
+    def __write_header(self):
+        self.__store_file.write(struct.pack(HEADER_FORMAT, MAGIC, self.__num_papers))
+
+def read_transaction_store(store_filename, maximum_line_count=None):
+    '''
+    @param
+        store_filename: string              File written by TransactionStoreWriter
+        maximum_line_count: int (optional)  Cutoff for number of papers to read
+    @return iterator((list(int), list(int))), (sorted author ids, title term ids) of every paper, in data.csv order
+    '''
+    store_file = open(store_filename, "rb")
+    magic, num_papers = struct.unpack(HEADER_FORMAT, store_file.read(struct.calcsize(HEADER_FORMAT)))
+    assert magic == MAGIC
+    values = array('I')
+    values.frombytes(store_file.read())
+    store_file.close()
+    if sys.byteorder != "little":
+        values.byteswap()
+
+    if maximum_line_count is not None:
+        num_papers = min(num_papers, maximum_line_count)
+    pos = 0
+    for _ in range(num_papers):
+        num_authors = values[pos]
+        num_title_terms = values[pos + 1]
+        pos += 2
+        yield values[pos : pos + num_authors].tolist(), \
+            values[pos + num_authors : pos + num_authors + num_title_terms].tolist()
+        pos += num_authors + num_title_terms
@@ -1,8 +1,40 @@
+import sys
+import os
+import json
+import random
+import multiprocessing
+
 import mutual_information_manager
+import instrumentation
+from transaction_id_set import TransactionIdSet
+from transaction_store import read_transaction_store
 
 '''
-Encapsulates all papers (aka data.csv) and provides utility methods
+Encapsulates all papers (aka data.csv, the conference shards listed in a shard manifest, see
+DataSetBuilder, or the binary transaction store written by StreamingIngestPipeline) and provides utility methods
+
+Papers are numbered in file order. Shards are read in manifest order, which is also the order of data.csv, so
+transaction ids are the same whichever one is read.
 '''
+
+# Transactions scanned by the worker processes of find_patterns_transactions_ids_in_parallel. Set by the parent
+# while the pool runs, so that forked workers inherit it (spawned workers load their own copy instead)
+_transactions = None
+# Patterns every worker looks for, sent once per worker rather than with every range of papers
+_patterns = None
+_is_title = None
+
+def _init_worker(transactions_args, patterns, is_title):
+    global _transactions, _patterns, _is_title
+    if _transactions is None:
+        _transactions = TransactionsManager(*transactions_args)
+    _patterns = patterns
+    _is_title = is_title
+
+def _find_partition_patterns_transactions_ids(paper_range):
+    first_paper, last_paper = paper_range
+    return _transactions.find_patterns_transactions_ids(_patterns, _is_title, first_paper, last_paper)
+
 class TransactionsManager:
 
     '''
@@ -21,6 +53,7 @@ class TransactionsManager:
             self.authors = authors
             self.title = title
 
+    @instrumentation.instrumented_stage("transactions.load")
     def __init__(self, papers_file_name, authors_mapping_filename, \
                 title_terms_mapping_filename, maximum_line_count=None):
         '''
@@ -28,13 +61,14 @@ class TransactionsManager:
         a list of all papers
 
         @param
-            papers_file_name: string                data.csv file path
+            papers_file_name: string                data.csv file path, shard manifest (.json) file path, or
+                transaction store (.bin, see transaction_store.py) file path
             authors_mapping_filename: string        file path to author-id mapping file
             title_terms_mapping_filename: string    file path to title term-id mapping file
             maximum_line_count: int (optional)      cutoff for number of lines to read in for each paper
         '''
-        papers_file = open(papers_file_name, "r", encoding='utf-8')
-
+        self.__constructor_args = (papers_file_name, authors_mapping_filename, title_terms_mapping_filename, \
+            maximum_line_count)
         self.__authors_id_mapping = {}
         self.__id_authors_mapping = {}
         TransactionsManager.__parse_mapping(authors_mapping_filename, \
@@ -46,8 +80,37 @@ class TransactionsManager:
             self.__title_terms_id_mapping, self.__id_title_terms_mapping)
 
         self.__papers = []
+        # (first paper id, last paper id + 1) of every shard
+        self.__partitions = []
+
+        if papers_file_name.endswith(".bin"):
+            # Papers are already id mapped
+            for author_ids, title_term_ids in read_transaction_store(papers_file_name, maximum_line_count):
+                self.__papers.append(TransactionsManager.Paper(set(author_ids), title_term_ids))
+            self.__partitions.append((0, len(self.__papers)))
+            return
+
+        if papers_file_name.endswith(".json"):
+            manifest_file = open(papers_file_name, "r", encoding='utf-8')
+            manifest = json.load(manifest_file)
+            manifest_file.close()
+            shard_file_names = [os.path.join(os.path.dirname(papers_file_name), shard["filename"]) \
+                for shard in manifest["shards"]]
+        else:
+            shard_file_names = [papers_file_name]
+
+        for shard_file_name in shard_file_names:
+            first_paper = len(self.__papers)
+            self.__parse_papers(shard_file_name, maximum_line_count)
+            self.__partitions.append((first_paper, len(self.__papers)))
+
+    def __parse_papers(self, papers_file_name, maximum_line_count):
+        '''
+        Parses and appends the papers of a data.csv formatted file, until there are maximum_line_count papers
+        '''
+        papers_file = open(papers_file_name, "r", encoding='utf-8')
 
-        line_counter = 0
+        line_counter = len(self.__papers)
         for line in papers_file:
             if line_counter == maximum_line_count:
                 break
@@ -68,6 +131,7 @@ class TransactionsManager:
 
         papers_file.close()
 
+    @instrumentation.instrumented_stage("transactions.compute_title_context_models")
     def compute_title_context_models(self, patterns):
         '''
         Computes context models for each paper's title terms against title patterns
@@ -89,10 +153,12 @@ class TransactionsManager:
                         mutual_information_manager.MutualInformationManager.PatternType.TITLE_TITLE, \
                              pattern, paper_titles)
                 paper_context_model.append(mutual_info)
+            instrumentation.increment("pair_mi_evaluations", len(patterns))
 
             context_models.append(paper_context_model)
         return context_models
 
+    @instrumentation.instrumented_stage("transactions.compute_author_context_models")
     def compute_author_context_models(self, patterns):
         '''
         Computes context models for each paper's authors against author patterns
@@ -114,42 +180,141 @@ class TransactionsManager:
                         mutual_information_manager.MutualInformationManager.PatternType.AUTHOR_AUTHOR, \
                              pattern, paper_authors)
                 paper_context_model.append(mutual_info)
+            instrumentation.increment("pair_mi_evaluations", len(patterns))
 
             context_models.append(paper_context_model)
         return context_models
 
-    def find_title_pattern_transactions_ids(self, title_pattern):
+    def find_title_pattern_transactions_ids(self, title_pattern, transaction_ids=None):
         '''
         Find transactions that have title pattern as a subset
 
         @param:
-            title_pattern: list(int)     Ordered list of title ids
+            title_pattern: list(int)                Ordered list of title ids
+            transaction_ids: list(int) (optional)   Only look for the pattern in these transactions (ex: a sample)
+        @return TransactionIdSet, ids of the transactions containing the pattern
         '''
         # https://stackoverflow.com/questions/24017363/how-to-test-if-one-string-is-a-subsequence-of-another
         def is_subseq(x, y):
             it = iter(y)
             return all(any(c == ch for c in it) for ch in x)
 
-        title_transactions = set()
-        for ind, paper in enumerate(self.__papers):
+        instrumentation.increment("support_scans")
+        title_transactions = []
+        for ind, paper in self.__iterate_papers(transaction_ids):
             # Title patterns are sequential so we need to ensure that the order is there
             # Check that the title is a subsequence of paper.title
             if is_subseq(title_pattern, paper.title):
-                title_transactions.add(ind)
-        return title_transactions
+                title_transactions.append(ind)
+        return TransactionIdSet(title_transactions)
 
-    def find_author_pattern_transactions_ids(self, author_pattern):
+    def find_author_pattern_transactions_ids(self, author_pattern, transaction_ids=None):
         '''
         Find transactions that have author pattern as a subset
 
         @param:
-            author_pattern: Collection(int)     Collection of author ids
+            author_pattern: Collection(int)         Collection of author ids
+            transaction_ids: list(int) (optional)   Only look for the pattern in these transactions (ex: a sample)
+        @return TransactionIdSet, ids of the transactions containing the pattern
         '''
-        author_transactions = set()
-        for ind, paper in enumerate(self.__papers):
+        instrumentation.increment("support_scans")
+        author_transactions = []
+        for ind, paper in self.__iterate_papers(transaction_ids):
             if author_pattern.issubset(paper.authors):
-                author_transactions.add(ind)
-        return author_transactions
+                author_transactions.append(ind)
+        return TransactionIdSet(author_transactions)
+
+    def __iterate_papers(self, transaction_ids):
+        '''
+        @return iterator((int, Paper)), (id, paper) of every paper, or only of transaction_ids if it's not None
+        '''
+        if transaction_ids is None:
+            return enumerate(self.__papers)
+        return ((ind, self.__papers[ind]) for ind in transaction_ids)
+
+    def sample_transaction_ids(self, sample_size, seed=0):
+        '''
+        @param
+            sample_size: int    Number of transactions to sample (every transaction if there are fewer)
+            seed: int           Seed of the sample
+        @return list(int), sorted ids of a uniform sample (without replacement) of the transactions
+        '''
+        if sample_size >= len(self.__papers):
+            return list(range(len(self.__papers)))
+        return sorted(random.Random(seed).sample(range(len(self.__papers)), sample_size))
+
+    def find_patterns_transactions_ids(self, patterns, is_title, first_paper=0, last_paper=None):
+        '''
+        Finds the transactions of every pattern within a range of papers, in one pass over the range
+
+        @param
+            patterns: list(list(int))       Title patterns (ordered) or author patterns
+            is_title: bool                  True if patterns are title patterns
+            first_paper: int                Id of the first paper of the range
+            last_paper: int (optional)      Id of the last paper of the range + 1, defaults to the number of papers
+        @return list(TransactionIdSet), ids of the transactions of the range containing each pattern
+        '''
+        # https://stackoverflow.com/questions/24017363/how-to-test-if-one-string-is-a-subsequence-of-another
+        def is_subseq(x, y):
+            it = iter(y)
+            return all(any(c == ch for c in it) for ch in x)
+
+        if last_paper is None:
+            last_paper = len(self.__papers)
+        # Patterns are looked up once per paper, so a PatternStore (see pattern_store.py) is read only once
+        patterns = list(patterns)
+        pattern_sets = None if is_title else [set(pattern) for pattern in patterns]
+        patterns_transactions = [[] for _ in patterns]
+        for ind in range(first_paper, last_paper):
+            paper = self.__papers[ind]
+            for pattern_ind, pattern_transactions in enumerate(patterns_transactions):
+                if is_title:
+                    if is_subseq(patterns[pattern_ind], paper.title):
+                        pattern_transactions.append(ind)
+                elif pattern_sets[pattern_ind].issubset(paper.authors):
+                    pattern_transactions.append(ind)
+        return [TransactionIdSet(pattern_transactions) for pattern_transactions in patterns_transactions]
+
+    @instrumentation.instrumented_stage("transactions.find_patterns_transactions_ids_in_parallel")
+    def find_patterns_transactions_ids_in_parallel(self, patterns, is_title, num_processes=None):
+        '''
+        Finds the transactions of every pattern by scanning every shard (shards larger than a fair share of the papers
+        are split into smaller ranges to balance the load) in a separate process and merging the results
+
+        @param
+            patterns: list(list(int))       Title patterns (ordered) or author patterns
+            is_title: bool                  True if patterns are title patterns
+            num_processes: int (optional)   Number of worker processes (defaults to the cpu count), 1 to scan in
+                this process
+        @return list(TransactionIdSet), ids of the transactions containing each pattern
+        '''
+        instrumentation.increment("support_scans", len(patterns))
+        if num_processes == 1:
+            return self.find_patterns_transactions_ids(patterns, is_title)
+
+        num_processes = num_processes or os.cpu_count()
+        max_range_size = max(1, -(-len(self.__papers) // (4 * num_processes)))
+        paper_ranges = []
+        for first_paper, last_paper in self.__partitions:
+            for range_start in range(first_paper, last_paper, max_range_size):
+                paper_ranges.append((range_start, min(range_start + max_range_size, last_paper)))
+
+        global _transactions
+        _transactions = self
+        patterns_transactions = [TransactionIdSet() for _ in patterns]
+        try:
+            with multiprocessing.Pool(num_processes, initializer=_init_worker, \
+                initargs=(self.__constructor_args, patterns, is_title)) as pool:
+                for range_patterns_transactions in pool.imap_unordered(_find_partition_patterns_transactions_ids, \
+                    paper_ranges):
+                    # Ranges don't overlap, so merging only ors the bitmaps
+                    patterns_transactions = [pattern_transactions.union(range_pattern_transactions) for \
+                        pattern_transactions, range_pattern_transactions in zip(patterns_transactions, \
+                            range_patterns_transactions)]
+        finally:
+            # Don't keep the transactions alive (or hand them to the workers of later calls)
+            _transactions = None
+        return patterns_transactions
 
     def get_author_name(self, author_id):
         return self.__id_authors_mapping[author_id]
@@ -193,4 +358,5 @@ class TransactionsManager:
         mapping_file.close()
 
 if __name__ == "__main__":
+    instrumentation.configure_from_argv(sys.argv)
     transactions = TransactionsManager("data/data.csv", "data/author_id_mappings.txt", "data/title_term_id_mappings.txt")
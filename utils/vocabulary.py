@@ -0,0 +1,44 @@
+'''
+Resolves author and title term ids to words from the id mapping files alone, for code that only needs to print
+patterns (ex: pattern_annotators/annotate.py) and shouldn't have to parse data.csv through a TransactionsManager.
+
+Both mappings are only parsed the first time one of their ids is looked up. Vocabulary implements the name lookups
+of TransactionsManager (get_author_name, get_title_term), so it can be passed to the extractors' pretty printers
+instead of one.
+'''
+
+class Vocabulary:
+    def __init__(self, authors_mapping_filename, title_terms_mapping_filename):
+        '''
+        @param
+            authors_mapping_filename: string        file path to author-id mapping file
+            title_terms_mapping_filename: string    file path to title term-id mapping file
+        '''
+        self.__authors_mapping_filename = authors_mapping_filename
+        self.__title_terms_mapping_filename = title_terms_mapping_filename
+        self.__id_authors_mapping = None
+        self.__id_title_terms_mapping = None
+
+    def get_author_name(self, author_id):
+        if self.__id_authors_mapping is None:
+            self.__id_authors_mapping = Vocabulary.__parse_mapping(self.__authors_mapping_filename)
+        return self.__id_authors_mapping[author_id]
+
+    def get_title_term(self, title_id):
+        if self.__id_title_terms_mapping is None:
+            self.__id_title_terms_mapping = Vocabulary.__parse_mapping(self.__title_terms_mapping_filename)
+        return self.__id_title_terms_mapping[title_id]
+
+    @staticmethod
+    def __parse_mapping(mapping_filename):
+        '''
+        @param mapping_filename: string     Filename containing id-word mapping (format: id word, one per line)
+        @return dict(int, string), mapping from id to word
+        '''
+        id_word_mapping = {}
+        mapping_file = open(mapping_filename, "r", encoding='utf-8')
+        for line in mapping_file:
+            word_id, word = line.split()
+            id_word_mapping[int(word_id)] = word
+        mapping_file.close()
+        return id_word_mapping